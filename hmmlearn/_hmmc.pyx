@@ -8,6 +8,7 @@ np.import_array()
 ctypedef np.float64_t dtype_t
 
 cdef dtype_t _NINF = -np.inf
+cdef dtype_t _ZEROLOGPROB = -1e200
 
 @cython.boundscheck(False)
 cdef dtype_t _max(dtype_t[:] values):
@@ -36,12 +37,15 @@ def _forward(int n_observations, int n_components,
         np.ndarray[dtype_t, ndim=1] log_startprob,
         np.ndarray[dtype_t, ndim=2] log_transmat,
         np.ndarray[dtype_t, ndim=2] framelogprob,
-        np.ndarray[dtype_t, ndim=2] fwdlattice):
+        np.ndarray[dtype_t, ndim=2] fwdlattice,
+        np.ndarray[dtype_t, ndim=1] work_buffer=None):
 
+    # work_buffer is scratch space of at least n_components values, pass
+    # one in to avoid allocating it on every call.
     cdef int t, i, j
-    cdef double logprob
-    cdef np.ndarray[dtype_t, ndim = 1] work_buffer
-    work_buffer = np.zeros(n_components)
+    if work_buffer is None:
+        work_buffer = np.zeros(n_components)
+    cdef dtype_t[:] work = work_buffer[:n_components]
 
     for i in range(n_components):
         fwdlattice[0, i] = log_startprob[i] + framelogprob[0, i]
@@ -49,8 +53,13 @@ def _forward(int n_observations, int n_components,
     for t in range(1, n_observations):
         for j in range(n_components):
             for i in range(n_components):
-                work_buffer[i] = fwdlattice[t - 1, i] + log_transmat[i, j]
-            fwdlattice[t, j] = _logsum(work_buffer) + framelogprob[t, j]
+                work[i] = fwdlattice[t - 1, i] + log_transmat[i, j]
+            fwdlattice[t, j] = _logsum(work) + framelogprob[t, j]
+
+    for t in range(n_observations):
+        for i in range(n_components):
+            if fwdlattice[t, i] <= _ZEROLOGPROB:
+                fwdlattice[t, i] = _NINF
 
 
 @cython.boundscheck(False)
@@ -58,12 +67,13 @@ def _backward(int n_observations, int n_components,
         np.ndarray[dtype_t, ndim=1] log_startprob,
         np.ndarray[dtype_t, ndim=2] log_transmat,
         np.ndarray[dtype_t, ndim=2] framelogprob,
-        np.ndarray[dtype_t, ndim=2] bwdlattice):
+        np.ndarray[dtype_t, ndim=2] bwdlattice,
+        np.ndarray[dtype_t, ndim=1] work_buffer=None):
 
     cdef int t, i, j
-    cdef double logprob
-    cdef np.ndarray[dtype_t, ndim = 1] work_buffer
-    work_buffer = np.zeros(n_components)
+    if work_buffer is None:
+        work_buffer = np.zeros(n_components)
+    cdef dtype_t[:] work = work_buffer[:n_components]
 
     for i in range(n_components):
         bwdlattice[n_observations - 1, i] = 0.0
@@ -71,9 +81,187 @@ def _backward(int n_observations, int n_components,
     for t in range(n_observations - 2, -1, -1):
         for i in range(n_components):
             for j in range(n_components):
-                work_buffer[j] = log_transmat[i, j] + framelogprob[t + 1, j] \
+                work[j] = log_transmat[i, j] + framelogprob[t + 1, j] \
                     + bwdlattice[t + 1, j]
-            bwdlattice[t, i] = _logsum(work_buffer)
+            bwdlattice[t, i] = _logsum(work)
+
+    for t in range(n_observations):
+        for i in range(n_components):
+            if bwdlattice[t, i] <= _ZEROLOGPROB:
+                bwdlattice[t, i] = _NINF
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _forward_stacked(int n_observations, int n_components, int n_hmms,
+        dtype_t[:, ::1] log_startprob,
+        dtype_t[:, :, ::1] log_transmat,
+        dtype_t[:, :, ::1] framelogprob,
+        dtype_t[:, :, ::1] fwdlattice,
+        np.ndarray[dtype_t, ndim=1] work_buffer=None):
+
+    # Forward recursions of n_hmms HMMs of n_components states each over
+    # the same frames, in a single time loop. The HMM index is the last,
+    # contiguous axis of all the arrays: log_startprob is (n_components,
+    # n_hmms), log_transmat (n_components, n_components, n_hmms) and the
+    # lattices (n_observations, n_components, n_hmms), so that the inner
+    # loops run over it. work_buffer holds at least 2 * n_hmms values.
+    cdef int t, i, j, k
+    cdef dtype_t value
+    if work_buffer is None or work_buffer.shape[0] < 2 * n_hmms:
+        work_buffer = np.zeros(2 * n_hmms)
+    cdef dtype_t[:] vmax = work_buffer[:n_hmms]
+    cdef dtype_t[:] power_sum = work_buffer[n_hmms:2 * n_hmms]
+
+    with nogil:
+        for i in range(n_components):
+            for k in range(n_hmms):
+                fwdlattice[0, i, k] = log_startprob[i, k] \
+                    + framelogprob[0, i, k]
+
+        for t in range(1, n_observations):
+            for j in range(n_components):
+                for k in range(n_hmms):
+                    vmax[k] = _NINF
+                    power_sum[k] = 0.0
+                for i in range(n_components):
+                    for k in range(n_hmms):
+                        value = fwdlattice[t - 1, i, k] + log_transmat[i, j, k]
+                        if value > vmax[k]:
+                            vmax[k] = value
+                for i in range(n_components):
+                    for k in range(n_hmms):
+                        if vmax[k] != _NINF:
+                            power_sum[k] += exp(fwdlattice[t - 1, i, k]
+                                                + log_transmat[i, j, k]
+                                                - vmax[k])
+                for k in range(n_hmms):
+                    if vmax[k] == _NINF:
+                        fwdlattice[t, j, k] = _NINF
+                    else:
+                        fwdlattice[t, j, k] = log(power_sum[k]) + vmax[k] \
+                            + framelogprob[t, j, k]
+
+        for t in range(n_observations):
+            for i in range(n_components):
+                for k in range(n_hmms):
+                    if fwdlattice[t, i, k] <= _ZEROLOGPROB:
+                        fwdlattice[t, i, k] = _NINF
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _backward_stacked(int n_observations, int n_components, int n_hmms,
+        dtype_t[:, ::1] log_startprob,
+        dtype_t[:, :, ::1] log_transmat,
+        dtype_t[:, :, ::1] framelogprob,
+        dtype_t[:, :, ::1] bwdlattice,
+        np.ndarray[dtype_t, ndim=1] work_buffer=None):
+
+    # Backward counterpart of _forward_stacked, same layout.
+    cdef int t, i, j, k
+    cdef dtype_t value
+    if work_buffer is None or work_buffer.shape[0] < 2 * n_hmms:
+        work_buffer = np.zeros(2 * n_hmms)
+    cdef dtype_t[:] vmax = work_buffer[:n_hmms]
+    cdef dtype_t[:] power_sum = work_buffer[n_hmms:2 * n_hmms]
+
+    with nogil:
+        for i in range(n_components):
+            for k in range(n_hmms):
+                bwdlattice[n_observations - 1, i, k] = 0.0
+
+        for t in range(n_observations - 2, -1, -1):
+            for i in range(n_components):
+                for k in range(n_hmms):
+                    vmax[k] = _NINF
+                    power_sum[k] = 0.0
+                for j in range(n_components):
+                    for k in range(n_hmms):
+                        value = log_transmat[i, j, k] \
+                            + framelogprob[t + 1, j, k] \
+                            + bwdlattice[t + 1, j, k]
+                        if value > vmax[k]:
+                            vmax[k] = value
+                for j in range(n_components):
+                    for k in range(n_hmms):
+                        if vmax[k] != _NINF:
+                            power_sum[k] += exp(log_transmat[i, j, k]
+                                                + framelogprob[t + 1, j, k]
+                                                + bwdlattice[t + 1, j, k]
+                                                - vmax[k])
+                for k in range(n_hmms):
+                    if vmax[k] == _NINF:
+                        bwdlattice[t, i, k] = _NINF
+                    else:
+                        bwdlattice[t, i, k] = log(power_sum[k]) + vmax[k]
+
+        for t in range(n_observations):
+            for i in range(n_components):
+                for k in range(n_hmms):
+                    if bwdlattice[t, i, k] <= _ZEROLOGPROB:
+                        bwdlattice[t, i, k] = _NINF
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _compute_posteriors_stacked(int n_observations, int n_components,
+        int n_hmms,
+        dtype_t[:, :, ::1] fwdlattice,
+        dtype_t[:, :, ::1] bwdlattice,
+        dtype_t[:, :, ::1] posteriors,
+        np.ndarray[dtype_t, ndim=1] work_buffer=None):
+
+    # Stacked _compute_posteriors, posteriors may be fwdlattice itself.
+    cdef int t, i, k
+    if work_buffer is None or work_buffer.shape[0] < 2 * n_hmms:
+        work_buffer = np.zeros(2 * n_hmms)
+    cdef dtype_t[:] vmax = work_buffer[:n_hmms]
+    cdef dtype_t[:] norm = work_buffer[n_hmms:2 * n_hmms]
+
+    with nogil:
+        for t in range(n_observations):
+            for k in range(n_hmms):
+                vmax[k] = _NINF
+                norm[k] = 0.0
+            for i in range(n_components):
+                for k in range(n_hmms):
+                    posteriors[t, i, k] = fwdlattice[t, i, k] \
+                        + bwdlattice[t, i, k]
+                    if posteriors[t, i, k] > vmax[k]:
+                        vmax[k] = posteriors[t, i, k]
+            for i in range(n_components):
+                for k in range(n_hmms):
+                    posteriors[t, i, k] = exp(posteriors[t, i, k] - vmax[k])
+                    norm[k] += posteriors[t, i, k]
+            for i in range(n_components):
+                for k in range(n_hmms):
+                    posteriors[t, i, k] /= norm[k]
+
+
+@cython.boundscheck(False)
+def _compute_posteriors(int n_observations, int n_components,
+        np.ndarray[dtype_t, ndim=2] fwdlattice,
+        np.ndarray[dtype_t, ndim=2] bwdlattice,
+        np.ndarray[dtype_t, ndim=2] posteriors):
+
+    # posteriors may be the same array as fwdlattice or bwdlattice, each
+    # frame is read before it is overwritten.
+    cdef int t, i
+    cdef dtype_t vmax, norm
+
+    for t in range(n_observations):
+        vmax = _NINF
+        for i in range(n_components):
+            posteriors[t, i] = fwdlattice[t, i] + bwdlattice[t, i]
+            if posteriors[t, i] > vmax:
+                vmax = posteriors[t, i]
+        norm = 0.0
+        for i in range(n_components):
+            posteriors[t, i] = exp(posteriors[t, i] - vmax)
+            norm += posteriors[t, i]
+        for i in range(n_components):
+            posteriors[t, i] /= norm
 
 
 @cython.boundscheck(False)
@@ -93,6 +281,52 @@ def _compute_lneta(int n_observations, int n_components,
                     + framelogprob[t + 1, j] + bwdlattice[t + 1, j] - logprob
 
 
+@cython.boundscheck(False)
+def _compute_log_xi_sum(int n_observations, int n_components,
+        np.ndarray[dtype_t, ndim=2] fwdlattice,
+        np.ndarray[dtype_t, ndim=2] log_transmat,
+        np.ndarray[dtype_t, ndim=2] bwdlattice,
+        np.ndarray[dtype_t, ndim=2] framelogprob,
+        double logprob,
+        np.ndarray[dtype_t, ndim=2] log_xi_sum,
+        np.ndarray[dtype_t, ndim=2] work_buffer=None):
+
+    # Same as logsumexp(lneta, axis=0) for the lneta of _compute_lneta,
+    # without materializing the (n_observations - 1, n, n) array: a first
+    # pass finds the maximum over time, a second one sums the exponentials.
+    cdef int i, j, t
+    cdef dtype_t value
+    if work_buffer is None:
+        work_buffer = np.zeros((n_components, n_components))
+
+    for i in range(n_components):
+        for j in range(n_components):
+            log_xi_sum[i, j] = _NINF
+            work_buffer[i, j] = 0.0
+
+    for t in range(n_observations - 1):
+        for i in range(n_components):
+            for j in range(n_components):
+                value = fwdlattice[t, i] + log_transmat[i, j] \
+                    + framelogprob[t + 1, j] + bwdlattice[t + 1, j] - logprob
+                if value > log_xi_sum[i, j]:
+                    log_xi_sum[i, j] = value
+
+    for t in range(n_observations - 1):
+        for i in range(n_components):
+            for j in range(n_components):
+                if log_xi_sum[i, j] == _NINF:
+                    continue
+                value = fwdlattice[t, i] + log_transmat[i, j] \
+                    + framelogprob[t + 1, j] + bwdlattice[t + 1, j] - logprob
+                work_buffer[i, j] += exp(value - log_xi_sum[i, j])
+
+    for i in range(n_components):
+        for j in range(n_components):
+            if log_xi_sum[i, j] != _NINF:
+                log_xi_sum[i, j] += log(work_buffer[i, j])
+
+
 @cython.boundscheck(False)
 def _viterbi(int n_observations, int n_components,
         np.ndarray[dtype_t, ndim=1] log_startprob,
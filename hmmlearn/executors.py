@@ -0,0 +1,529 @@
+"""
+The :mod:`hmmlearn.executors` module implements the backends the estimators
+run their per-batch work on.
+
+An executor maps a function over an iterable of tasks and hands the results
+back in order. The estimators of :mod:`hmmlearn.hmm` and :mod:`hmmlearn.mixhmm`
+take one through their ``backend`` parameter. A SparkExecutor also runs them
+on the partitions of an RDD, which is how the estimators of
+:mod:`hmmlearn.hmmspark` and :mod:`hmmlearn.mixhmmspark` fit, and
+:class:`LocalContext` lets those run without a Spark cluster.
+"""
+
+import copy
+import math
+import random
+from contextlib import contextmanager
+from functools import reduce
+import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
+
+__all__ = ['Executor',
+           'SerialExecutor',
+           'ThreadExecutor',
+           'ProcessExecutor',
+           'SparkExecutor',
+           'LocalContext',
+           'LocalRDD',
+           'get_executor',
+           'executor_scope']
+
+
+class Executor(object):
+    """Base class for the execution backends.
+
+    Subclasses need only implement ``imap``. Executors are context
+    managers, their workers are released on exit.
+
+    Attributes
+    ----------
+    n_workers : int
+        Number of tasks run at the same time.
+
+    shared_memory : bool
+        Whether the tasks run in the caller's process, so that they can
+        write into its buffers.
+    """
+    n_workers = 1
+    shared_memory = True
+
+    def imap(self, func, iterable):
+        """Lazily apply ``func`` to each task, yielding results in order."""
+        raise NotImplementedError
+
+    def map(self, func, iterable):
+        """Apply ``func`` to each task and return the list of results."""
+        return list(self.imap(func, iterable))
+
+    def close(self):
+        """Release the workers of the executor."""
+        pass
+
+    def is_distributed(self, obs):
+        """Whether ``obs`` is a dataset held by the backend, such as an
+        RDD, rather than a list of sequences."""
+        return False
+
+    def aggregate_batches(self, func, model, obs, batch_size, zero, merge,
+                          args=()):
+        """Reduce the results of ``func`` over the batches of ``obs``.
+
+        Parameters
+        ----------
+        func : callable
+            Applied to ``(model, obs_batch) + args`` tasks.
+
+        model : estimator
+            Estimator the batches are processed with.
+
+        obs : list
+            Observation sequences, cut into batches of ``batch_size``.
+
+        zero : object
+            Result of no batch at all.
+
+        merge : callable
+            Merges two results. It must not depend on ``model``, as it may
+            run away from it.
+
+        Returns
+        -------
+        result : object
+            The results of all the batches, merged in order.
+        """
+        tasks = ((model, obs[i:i + batch_size]) + tuple(args)
+                 for i in range(0, len(obs), batch_size))
+        return reduce(merge, self.imap(func, tasks), zero)
+
+    @contextmanager
+    def sharing(self, model):
+        """Context in which the jobs on ``model`` may share its state
+        between the calls of ``aggregate_batches``, e.g. across the
+        iterations of a fit."""
+        yield
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __deepcopy__(self, memo):
+        # Estimators hold their executor as a parameter; a copy of the
+        # estimator runs on the same workers.
+        return self
+
+
+class SerialExecutor(Executor):
+    """Run the tasks one after the other in the caller's thread."""
+
+    def imap(self, func, iterable):
+        for task in iterable:
+            yield func(task)
+
+
+class _PoolExecutor(Executor):
+    """Run the tasks on a pool, created on first use."""
+    _pool_class = None
+
+    def __init__(self, n_jobs=None):
+        if n_jobs is not None and n_jobs < 1:
+            raise ValueError("n_jobs must be positive, got %r" % n_jobs)
+        self.n_jobs = n_jobs
+        self._pool = None
+
+    @property
+    def n_workers(self):
+        return self.n_jobs or mp.cpu_count()
+
+    def imap(self, func, iterable):
+        if self._pool is None:
+            self._pool = self._pool_class(processes=self.n_jobs)
+        return self._pool.imap(func, iterable)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def __getstate__(self):
+        # A pool does not travel to other processes, the copy makes its
+        # own when used.
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+
+class ThreadExecutor(_PoolExecutor):
+    """Run the tasks on a pool of ``n_jobs`` threads.
+
+    The tasks share the caller's memory. This pays off when the work is
+    spent in code that releases the GIL, such as the BLAS calls of the
+    emission densities.
+    """
+    _pool_class = ThreadPool
+
+
+class ProcessExecutor(_PoolExecutor):
+    """Run the tasks on a pool of ``n_jobs`` processes.
+
+    The function and the tasks are pickled to the workers, so ``func``
+    must be defined at module level.
+    """
+    _pool_class = mp.Pool
+    shared_memory = False
+
+
+class SparkExecutor(Executor):
+    """Run the tasks as the partitions of a Spark job.
+
+    Lists of sequences are cut into tasks like on the other executors.
+    Sequences given as an RDD (of sequences or of PackedSequences) stay
+    where they are: each partition is one task, and the results are
+    reduced with a ``treeAggregate``.
+
+    Parameters
+    ----------
+    sc : SparkContext
+        Context the job is submitted to.
+
+    n_partitions : int, optional
+        Number of partitions the tasks are spread over. Defaults to one
+        partition per task.
+
+    aggregation_depth : int, default: 2
+        Depth of the ``treeAggregate`` reducing the results of the
+        partitions of an RDD. Deeper trees merge more partial results on
+        the executors and send fewer of them to the driver.
+    """
+    shared_memory = False
+
+    def __init__(self, sc, n_partitions=None, aggregation_depth=2):
+        self.sc = sc
+        self.n_partitions = n_partitions
+        self.aggregation_depth = aggregation_depth
+        self._shared = None
+
+    @property
+    def n_workers(self):
+        return self.sc.defaultParallelism
+
+    def imap(self, func, iterable):
+        return iter(self.map(func, iterable))
+
+    def map(self, func, iterable):
+        tasks = list(iterable)
+        if not tasks:
+            return []
+        n_partitions = self.n_partitions or len(tasks)
+        return self.sc.parallelize(tasks, n_partitions).map(func).collect()
+
+    def is_distributed(self, obs):
+        return hasattr(obs, 'mapPartitions')
+
+    def aggregate_batches(self, func, model, obs, batch_size, zero, merge,
+                          args=()):
+        if not self.is_distributed(obs):
+            return super(SparkExecutor, self).aggregate_batches(
+                func, model, obs, batch_size, zero, merge, args)
+        args = tuple(args)
+        if self._shared is not None and self._shared[0] is model:
+            # The model is already on the executors, only its current
+            # parameters are sent.
+            modelBroadcast = self._shared[1]
+            paramsBroadcast = self.sc.broadcast(model._get_param_pack())
+            broadcasts = [paramsBroadcast]
+        else:
+            modelBroadcast = self.sc.broadcast(model)
+            paramsBroadcast = None
+            broadcasts = [modelBroadcast]
+
+        def run_partition(items):
+            items = list(items)
+            if not items:
+                return
+            local_model = modelBroadcast.value
+            if paramsBroadcast is not None:
+                local_model._set_param_pack(paramsBroadcast.value)
+            yield func((local_model, items) + args)
+
+        try:
+            return obs.mapPartitions(run_partition).treeAggregate(
+                zero, merge, merge, depth=self.aggregation_depth)
+        finally:
+            for broadcast in broadcasts:
+                broadcast.destroy()
+
+    @contextmanager
+    def sharing(self, model):
+        """Broadcast ``model`` once for the jobs run in the context, which
+        then only broadcast its parameters (see ``_get_param_pack``)."""
+        previous = self._shared
+        self._shared = (model, self.sc.broadcast(model))
+        try:
+            yield
+        finally:
+            self._shared[1].destroy()
+            self._shared = previous
+
+    def __getstate__(self):
+        # Estimators shipped to the executors carry their backend along,
+        # but the context only lives on the driver.
+        state = self.__dict__.copy()
+        state['sc'] = None
+        state['_shared'] = None
+        return state
+
+
+def get_executor(backend=None, n_jobs=1):
+    """Resolve the ``backend`` parameter of an estimator into an executor.
+
+    Parameters
+    ----------
+    backend : None, string or Executor
+        One of "serial", "thread" or "process", or an executor instance.
+        None runs serially when ``n_jobs == 1`` and on processes otherwise.
+
+    n_jobs : int
+        Number of workers of the thread and process backends.
+
+    Returns
+    -------
+    executor : Executor
+    """
+    if isinstance(backend, Executor):
+        return backend
+    if backend is None:
+        backend = "serial" if n_jobs == 1 else "process"
+    if backend == "serial":
+        return SerialExecutor()
+    if backend == "thread":
+        return ThreadExecutor(n_jobs)
+    if backend == "process":
+        return ProcessExecutor(n_jobs)
+    raise ValueError("backend must be one of 'serial', 'thread', 'process' "
+                     "or an Executor, got %r" % (backend,))
+
+
+@contextmanager
+def executor_scope(backend=None, n_jobs=1):
+    """Context manager yielding the executor of ``backend``.
+
+    An executor created from a backend name is closed on exit. An
+    executor instance passed as ``backend`` belongs to the caller and is
+    left open, so that it can serve several calls.
+
+    Parameters
+    ----------
+    backend : None, string or Executor
+        See :func:`get_executor`.
+
+    n_jobs : int
+        Number of workers of the thread and process backends.
+    """
+    executor = get_executor(backend, n_jobs)
+    if isinstance(backend, Executor):
+        yield executor
+    else:
+        with executor:
+            yield executor
+
+
+class LocalBroadcast(object):
+    """Stand-in for a Spark broadcast variable."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def unpersist(self, blocking=False):
+        pass
+
+    def destroy(self):
+        self.value = None
+
+
+class LocalContext(object):
+    """Stand-in for a SparkContext that runs in the caller's process.
+
+    It provides what the Spark estimators use, so that they can be fitted
+    and checked on a single machine.
+
+    Parameters
+    ----------
+    executor : Executor, optional
+        Runs the partitions of the RDDs. The functions given to the RDDs
+        are usually closures, so only the serial (default) and thread
+        executors apply.
+    """
+
+    def __init__(self, executor=None):
+        if executor is None:
+            executor = SerialExecutor()
+        if not executor.shared_memory:
+            raise ValueError("LocalContext needs an executor sharing the "
+                             "caller's memory")
+        self.executor = executor
+
+    @property
+    def defaultParallelism(self):
+        return self.executor.n_workers
+
+    def parallelize(self, c, numSlices=None):
+        """Distribute a local collection into a LocalRDD."""
+        c = list(c)
+        n = numSlices or self.defaultParallelism
+        size, extra = divmod(len(c), n)
+        partitions = []
+        start = 0
+        for i in range(n):
+            stop = start + size + (1 if i < extra else 0)
+            partitions.append(c[start:stop])
+            start = stop
+        return LocalRDD(self, partitions)
+
+    def broadcast(self, value):
+        # Tasks see a copy of the value, like on a cluster.
+        return LocalBroadcast(copy.deepcopy(value))
+
+    def setCheckpointDir(self, dirName):
+        pass
+
+
+def _fold_partition(task):
+    seq_op, zero_value, partition = task
+    return reduce(seq_op, partition, copy.deepcopy(zero_value))
+
+
+class LocalRDD(object):
+    """Stand-in for a Spark RDD holding its partitions as lists.
+
+    Transformations are applied eagerly, one executor task per partition.
+    """
+
+    def __init__(self, context, partitions):
+        self.context = context
+        self.partitions = [list(p) for p in partitions]
+
+    def _run(self, func, tasks):
+        return self.context.executor.map(func, tasks)
+
+    def mapPartitionsWithIndex(self, f, preservesPartitioning=False):
+        partitions = self._run(lambda task: list(f(task[0], iter(task[1]))),
+                               enumerate(self.partitions))
+        return LocalRDD(self.context, partitions)
+
+    def mapPartitions(self, f, preservesPartitioning=False):
+        return self.mapPartitionsWithIndex(
+            lambda index, iterator: f(iterator), preservesPartitioning)
+
+    def map(self, f, preservesPartitioning=False):
+        return self.mapPartitions(
+            lambda iterator: (f(x) for x in iterator), preservesPartitioning)
+
+    def flatMap(self, f, preservesPartitioning=False):
+        return self.mapPartitions(
+            lambda iterator: (y for x in iterator for y in f(x)),
+            preservesPartitioning)
+
+    def filter(self, f):
+        return self.mapPartitions(
+            lambda iterator: (x for x in iterator if f(x)), True)
+
+    def mapValues(self, f):
+        return self.map(lambda kv: (kv[0], f(kv[1])), True)
+
+    def keys(self):
+        return self.map(lambda kv: kv[0])
+
+    def values(self):
+        return self.map(lambda kv: kv[1])
+
+    def zipWithIndex(self):
+        start = 0
+        partitions = []
+        for p in self.partitions:
+            partitions.append([(x, start + i) for i, x in enumerate(p)])
+            start += len(p)
+        return LocalRDD(self.context, partitions)
+
+    def partitionBy(self, numPartitions, partitionFunc=hash):
+        partitions = [[] for _ in range(numPartitions)]
+        for kv in self.collect():
+            partitions[partitionFunc(kv[0]) % numPartitions].append(kv)
+        return LocalRDD(self.context, partitions)
+
+    def glom(self):
+        return LocalRDD(self.context, [[p] for p in self.partitions])
+
+    def repartition(self, numPartitions):
+        return self.context.parallelize(self.collect(), numPartitions)
+
+    def aggregate(self, zeroValue, seqOp, combOp):
+        folded = self._run(_fold_partition,
+                           [(seqOp, zeroValue, p) for p in self.partitions])
+        return reduce(combOp, folded, copy.deepcopy(zeroValue))
+
+    def treeAggregate(self, zeroValue, seqOp, combOp, depth=2):
+        # The partition results are combined in levels like on Spark, so
+        # that the merges see the same partial results.
+        if depth < 1:
+            raise ValueError("Depth cannot be smaller than 1 but got "
+                             "depth=%d" % depth)
+        partials = self._run(_fold_partition,
+                             [(seqOp, zeroValue, p) for p in self.partitions])
+        n_partials = len(partials)
+        scale = max(int(math.ceil(n_partials ** (1. / depth))), 2)
+        while n_partials > scale + n_partials / float(scale):
+            n_partials = int(n_partials / scale)
+            groups = [partials[i::n_partials] for i in range(n_partials)]
+            partials = [reduce(combOp, group) for group in groups]
+        return reduce(combOp, partials, copy.deepcopy(zeroValue))
+
+    def reduce(self, f):
+        values = self.collect()
+        if not values:
+            raise ValueError("Can not reduce() empty RDD")
+        return reduce(f, values)
+
+    def sum(self):
+        return sum(self.collect())
+
+    def min(self):
+        return min(self.collect())
+
+    def max(self):
+        return max(self.collect())
+
+    def count(self):
+        return sum(len(p) for p in self.partitions)
+
+    def collect(self):
+        return [x for p in self.partitions for x in p]
+
+    def take(self, num):
+        return self.collect()[:num]
+
+    def first(self):
+        return self.take(1)[0]
+
+    def takeSample(self, withReplacement, num, seed=None):
+        values = self.collect()
+        rng = random.Random(seed)
+        if withReplacement:
+            return [rng.choice(values) for _ in range(num)] if values else []
+        return rng.sample(values, min(num, len(values)))
+
+    def getNumPartitions(self):
+        return len(self.partitions)
+
+    def cache(self):
+        return self
+
+    def persist(self, storageLevel=None):
+        return self
+
+    def unpersist(self, blocking=False):
+        return self
+
+    def checkpoint(self):
+        pass
@@ -9,12 +9,14 @@
 The :mod:`hmmlearn.hmm` module implements hidden Markov models.
 """
 
+import copy
+import hashlib
+import operator
 import string
+from functools import reduce
 import _pickle as cPickle
 
 import numpy as np
-import multiprocessing as mp
-from numpy.random import multivariate_normal, normal
 
 from sklearn.utils import check_random_state
 from sklearn.utils.extmath import logsumexp
@@ -23,24 +25,35 @@ from sklearn.mixture import (
     GMM, sample_gaussian,
     distribute_covar_matrix_to_match_covariance_type, _validate_covars)
 from sklearn import cluster
+from scipy import linalg
 from scipy.stats import (poisson, expon)
-from copy import deepcopy
 
 from .utils.fixes import (log_multivariate_normal_density,
                           log_poisson_pmf, log_exponential_density)
 
 from . import _hmmc
+from .executors import SerialExecutor, executor_scope
 
 __all__ = ['GMMHMM',
            'GaussianHMM',
            'MultinomialHMM',
+           'PackedSequences',
            'decoder_algorithms',
+           'inference_outputs',
+           'init_strategies',
+           'training_algorithms',
+           'select_n_states',
            'normalize']
 
 ZEROLOGPROB = -1e200
 EPS = np.finfo(float).eps
 NEGINF = -np.inf
 decoder_algorithms = ("viterbi", "map")
+inference_outputs = ("logprob", "posteriors", "viterbi")
+training_algorithms = ("baum-welch", "viterbi")
+init_strategies = ("full", "reservoir", "minibatch")
+accelerations = ("squarem",)
+PACKED_BLOCK_FRAMES = 65536
 
 
 def batches(l, n):
@@ -54,27 +67,632 @@ def unwrap_self_estep(arg, **kwarg):
     return _BaseHMM._do_estep(*arg, **kwarg)
 
 
+def unwrap_self_viterbi_estep(arg, **kwarg):
+    return _BaseHMM._do_viterbi_estep(*arg, **kwarg)
+
+
+def unwrap_self_fit_restart(arg, **kwarg):
+    return _BaseHMM._fit_restart(*arg, **kwarg)
+
+
+def unwrap_self_fit_candidate(arg, **kwarg):
+    return arg[0]._fit_candidate(*arg[1:], **kwarg)
+
+
+def unwrap_self_summarize_symbols(arg, **kwarg):
+    return arg[0]._summarize_symbols(*arg[1:], **kwarg)
+
+
+def unwrap_self_count_frames(arg, **kwarg):
+    return arg[0]._count_frames(*arg[1:], **kwarg)
+
+
+def unwrap_self_count_sequences(arg, **kwarg):
+    return arg[0]._count_sequences(*arg[1:], **kwarg)
+
+
 def unwrap_self_score(arg, **kwarg):
     return _BaseHMM._score(*arg, **kwarg)
 
 
+def unwrap_self_score_per_sequence(arg, **kwarg):
+    return _BaseHMM._score_per_sequence(*arg, **kwarg)
+
+
+def unwrap_self_infer(arg, **kwarg):
+    return _BaseHMM._infer(*arg, **kwarg)
+
+
 def merge_sum(x, y):
-    D = {}
-    for k in x.keys():
-        if isinstance(x[k], list):
-            z = []
-            for i in range(len(x[k])):
-                z.append(x[k][i] + y[k][i])
-            D[k] = z
-        else:
-            D[k] = x[k] + y[k]
-    return D
+    """Sum two sufficient statistics, dicts of numbers, arrays, and lists
+    or dicts of those, such as the statistics of mixture components."""
+    if isinstance(x, dict):
+        return dict((k, merge_sum(x[k], y[k])) for k in x)
+    if isinstance(x, list):
+        return [merge_sum(a, b) for a, b in zip(x, y)]
+    return x + y
+
+
+def merge_estep_results(x, y):
+    """Merge two (stats, logprob) results of the E-step."""
+    return merge_sum(x[0], y[0]), x[1] + y[1]
+
+
+def load_batch(obs_batch, memory_safe):
+    """Return the sequences of a batch.
+
+    With ``memory_safe`` the batch holds paths of pickled lists of
+    sequences which are loaded here; sequences given in memory are
+    returned as they are.
+    """
+    if memory_safe and any(isinstance(item, str) for item in obs_batch):
+        return reduce(lambda x, y: x + y,
+                      [cPickle.load(open(filename, 'rb'))
+                       for filename in obs_batch],
+                      [])
+    return obs_batch
 
 
 def reduce_merge_sum(L):
     return reduce(lambda x, y: merge_sum(x, y), L)
 
 
+def data_key(obs):
+    """Key telling the training set of a fit apart from other data,
+    without a pass over the frames.
+
+    It holds the identity of the list of sequences with, in memory, their
+    number and total length, or with ``memory_safe`` the paths of the
+    files. Data changed in place keeps its key.
+    """
+    if any(isinstance(item, str) for item in obs):
+        return id(obs), tuple(obs)
+    return id(obs), len(obs), sum(len(seq) for seq in obs)
+
+
+def params_fingerprint(model):
+    """Fingerprint of the array attributes of a model, and of the models
+    it holds in lists such as the components of a mixture."""
+    digest = hashlib.sha1()
+    _update_params_digest(digest, model)
+    return digest.hexdigest()
+
+
+def _update_params_digest(digest, model):
+    for name, value in sorted(vars(model).items()):
+        if isinstance(value, np.ndarray):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, list) and value and \
+                isinstance(value[0], BaseEstimator):
+            for submodel in value:
+                _update_params_digest(digest, submodel)
+
+
+class PackedSequences(object):
+    """Sequences stored as one contiguous array of frames.
+
+    The frames of sequence ``i`` are ``frames[offsets[i]:offsets[i + 1]]``.
+    A batch packed this way is serialized as two large arrays instead of
+    one object per sequence, and the emissions of many sequences are
+    computed in a single call. Batches of sequences may hold
+    PackedSequences in place of sequences.
+
+    Parameters
+    ----------
+    frames : array_like, shape (n_frames, n_features) or (n_frames,)
+        Frames of all the sequences, one after the other.
+
+    offsets : array_like, shape (n_sequences + 1,)
+        Index of the first frame of each sequence, followed by n_frames.
+
+    ids : list, optional
+        Key of each sequence, e.g. the sequence id it was packed from.
+    """
+
+    def __init__(self, frames, offsets, ids=None):
+        self.frames = np.asarray(frames)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.ids = ids
+
+    @classmethod
+    def from_sequences(cls, seqs, ids=None, dtype=None):
+        """Pack a list of sequences."""
+        seqs = [np.asarray(seq, dtype=dtype) for seq in seqs]
+        offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+        np.cumsum([len(seq) for seq in seqs], out=offsets[1:])
+        if seqs:
+            frames = np.concatenate(seqs)
+        else:
+            frames = np.zeros(0, dtype=dtype)
+        return cls(frames, offsets, ids)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.frames[self.offsets[i]:self.offsets[i + 1]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def blocks(self, max_frames=PACKED_BLOCK_FRAMES):
+        """Yield (start, stop) ranges of consecutive sequences holding at
+        most ``max_frames`` frames, or a single longer sequence."""
+        start = 0
+        while start < len(self):
+            stop = np.searchsorted(self.offsets,
+                                   self.offsets[start] + max_frames,
+                                   side='right') - 1
+            stop = max(stop, start + 1)
+            yield start, stop
+            start = stop
+
+    def block(self, start, stop):
+        """Return sequences ``start`` to ``stop`` as PackedSequences
+        viewing the same frames."""
+        first = self.offsets[start]
+        ids = self.ids[start:stop] if self.ids is not None else None
+        return PackedSequences(self.frames[first:self.offsets[stop]],
+                               self.offsets[start:stop + 1] - first, ids)
+
+
+def iter_framelogprob(obs_batch, compute):
+    """Yield (seq, framelogprob) for the sequences of a batch.
+
+    ``compute`` maps frames to their emission log likelihoods. The frames
+    of PackedSequences are passed to it one block of sequences at a time.
+    """
+    for item in obs_batch:
+        if not isinstance(item, PackedSequences):
+            seq = np.asarray(item)
+            yield seq, compute(seq)
+            continue
+        for start, stop in item.blocks():
+            first = item.offsets[start]
+            framelogprob = compute(item.frames[first:item.offsets[stop]])
+            for i in range(start, stop):
+                yield item[i], framelogprob[item.offsets[i] - first:
+                                            item.offsets[i + 1] - first]
+
+
+def batch_keys(obs_batch):
+    """Keys of the sequences of a batch of (key, sequence) pairs and
+    PackedSequences, the latter keyed by their ids, and the batch of
+    sequences."""
+    keys, seqs = [], []
+    for item in obs_batch:
+        if isinstance(item, PackedSequences):
+            keys.extend(item.ids if item.ids is not None
+                        else range(len(item)))
+            seqs.append(item)
+        else:
+            keys.append(item[0])
+            seqs.append(item[1])
+    return keys, seqs
+
+
+class FrameStream(object):
+    """Re-iterable stream of the observation sequences as arrays.
+
+    Parameters
+    ----------
+    obs : list
+        Observation sequences or PackedSequences, or paths to pickled
+        lists of them when ``memory_safe``, loaded one file at a time.
+
+    memory_safe : bool, optional
+        Whether obs holds paths.
+
+    column : int, optional
+        Column of the sequences to keep.
+    """
+
+    def __init__(self, obs, memory_safe=False, column=None):
+        self.obs = obs
+        self.memory_safe = memory_safe
+        self.column = column
+
+    def __iter__(self):
+        for item in self.obs:
+            if self.memory_safe:
+                sequences = cPickle.load(open(item, 'rb'))
+            elif isinstance(item, PackedSequences):
+                sequences = item
+            else:
+                sequences = [item]
+            for seq in sequences:
+                seq = np.asarray(seq)
+                if self.column is not None:
+                    seq = seq[:, self.column]
+                yield seq
+
+
+def init_frames(obs, strategy, memory_safe=False, column=None):
+    """Frames the initialization of the emissions looks at.
+
+    Every strategy streams the corpus, all the files of it when
+    ``memory_safe``, with a FrameStream.
+    """
+    if strategy not in init_strategies:
+        raise ValueError("init_strategy must be one of %s, got %r"
+                         % (init_strategies, strategy))
+    return FrameStream(obs, memory_safe, column)
+
+
+def _as_rows(frames):
+    frames = np.asarray(frames)
+    return frames.reshape(len(frames), -1)
+
+
+def _rebatch(chunks, batch_size):
+    """Regroup a stream of arrays of frames into batches of
+    ``batch_size`` frames, the last one possibly smaller."""
+    pending, n_pending = [], 0
+    for chunk in chunks:
+        chunk = _as_rows(chunk)
+        while len(chunk):
+            take = batch_size - n_pending
+            pending.append(chunk[:take])
+            n_pending += len(pending[-1])
+            chunk = chunk[take:]
+            if n_pending == batch_size:
+                yield np.concatenate(pending)
+                pending, n_pending = [], 0
+    if n_pending:
+        yield np.concatenate(pending)
+
+
+def reservoir_sample(chunks, n_samples, random_state=None):
+    """Uniformly sample ``n_samples`` frames from a stream of arrays of
+    frames, in one pass and with memory for the sample only.
+
+    Returns an array of shape (min(n_samples, n_frames), n_features).
+    """
+    random_state = check_random_state(random_state)
+    sample = None
+    n_seen = 0
+    for chunk in chunks:
+        chunk = _as_rows(chunk)
+        if sample is None:
+            sample = np.empty((n_samples, chunk.shape[1]), chunk.dtype)
+        # Fill the reservoir, then frame number i replaces a random slot
+        # with probability n_samples / (i + 1).
+        n_fill = min(max(n_samples - n_seen, 0), len(chunk))
+        sample[n_seen:n_seen + n_fill] = chunk[:n_fill]
+        if n_fill < len(chunk):
+            seen = n_seen + np.arange(n_fill, len(chunk))
+            slots = (random_state.random_sample(len(seen))
+                     * (seen + 1)).astype(int)
+            replace = slots < n_samples
+            sample[slots[replace]] = chunk[n_fill:][replace]
+        n_seen += len(chunk)
+    if sample is None:
+        raise ValueError("Cannot sample from an empty sequence of frames")
+    return sample[:min(n_seen, n_samples)]
+
+
+def chunk_moments(chunk):
+    """Number of frames, mean and scatter matrix of an array of frames."""
+    chunk = _as_rows(chunk).astype(float)
+    if not len(chunk):
+        return 0, 0., 0.
+    mean = chunk.mean(axis=0)
+    centered = chunk - mean
+    return len(chunk), mean, np.dot(centered.T, centered)
+
+
+def merge_moments(x, y):
+    """Merge two (n_frames, mean, scatter) triples of `chunk_moments`.
+
+    This is the pairwise update of Chan et al., which unlike sums of
+    squares does not lose the covariance when the frames are far from
+    the origin.
+    """
+    if not x[0]:
+        return y
+    if not y[0]:
+        return x
+    total = x[0] + y[0]
+    delta = y[1] - x[1]
+    return (total, x[1] + delta * y[0] / total,
+            x[2] + y[2] + np.outer(delta, delta) * x[0] * y[0] / total)
+
+
+def streaming_mean_cov(chunks):
+    """Mean and covariance of the frames of a stream of arrays of frames,
+    merged chunk by chunk so that the frames are never concatenated.
+
+    The covariance is normalized by ``n_frames - 1``, like ``np.cov``.
+    """
+    n_frames, mean, scatter = reduce(
+        merge_moments, (chunk_moments(chunk) for chunk in chunks), (0, 0., 0.))
+    if not n_frames:
+        raise ValueError("Cannot compute moments of no frames")
+    return mean, scatter / max(n_frames - 1, 1)
+
+
+def init_cluster_centers(frames, n_clusters, strategy, sample_size=10000,
+                         random_state=None):
+    """Cluster the frames to initialize the emissions.
+
+    Parameters
+    ----------
+    frames : iterable of arrays
+        Frames, as returned by ``init_frames``.
+
+    n_clusters : int
+        Number of clusters, usually the number of states.
+
+    strategy : string, one of init_strategies
+        "full" runs KMeans on all the frames, gathered in memory,
+        "reservoir" on a uniform sample of ``sample_size`` of them, and
+        "minibatch" runs MiniBatchKMeans over batches of ``sample_size``
+        frames.
+
+    Returns
+    -------
+    centers : array, shape (n_clusters, n_features)
+    """
+    if strategy == "full":
+        # KMeans needs all the frames at once, this is the only copy.
+        chunks = [_as_rows(chunk) for chunk in frames]
+        data = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return cluster.KMeans(n_clusters=n_clusters,
+                              random_state=random_state).fit(
+                                  data).cluster_centers_
+    if strategy == "reservoir":
+        sample = reservoir_sample(frames, sample_size, random_state)
+        return cluster.KMeans(n_clusters=n_clusters,
+                              random_state=random_state).fit(
+                                  sample).cluster_centers_
+    if strategy == "minibatch":
+        clu = cluster.MiniBatchKMeans(n_clusters=n_clusters,
+                                      random_state=random_state)
+        for batch in _rebatch(frames, max(sample_size, n_clusters)):
+            clu.partial_fit(batch)
+        return clu.cluster_centers_
+    raise ValueError("init_strategy must be one of %s, got %r"
+                     % (init_strategies, strategy))
+
+
+def summarize_symbols(symbols, distinct=True):
+    """Summarize the symbols of one chunk of frames.
+
+    Parameters
+    ----------
+    symbols : array_like
+        Symbols of the chunk.
+
+    distinct : bool, optional
+        Whether to list the distinct symbols, which is only needed to
+        discover the vocabulary.
+
+    Returns
+    -------
+    summary : dict
+        Maps 'valid' to whether the symbols are non-negative integers,
+        'count' to their number, 'min' and 'max' to the smallest and
+        largest symbol (None if there are none) and 'symbols' to the
+        sorted distinct symbols.
+    """
+    symbols = np.asarray(symbols)
+    summary = {'valid': True, 'count': symbols.size, 'min': None,
+               'max': None, 'symbols': np.zeros(0, dtype=int)}
+    if not symbols.size:
+        return summary
+    if symbols.dtype.kind != 'i':
+        summary['valid'] = False
+        return summary
+    summary['min'] = symbols.min()
+    summary['max'] = symbols.max()
+    if summary['min'] < 0:
+        summary['valid'] = False
+    elif distinct:
+        # A count over the range would be as large as the largest symbol,
+        # only use it when the range is no wider than the chunk.
+        if summary['max'] - summary['min'] + 1 > symbols.size:
+            summary['symbols'] = np.unique(symbols)
+        else:
+            summary['symbols'] = summary['min'] + np.flatnonzero(
+                np.bincount(symbols.ravel() - summary['min']))
+    return summary
+
+
+def merge_symbol_summaries(x, y):
+    """Merge two summaries made by `summarize_symbols`."""
+    bounds = [b for b in (x['min'], y['min'], x['max'], y['max'])
+              if b is not None]
+    return {'valid': x['valid'] and y['valid'],
+            'count': x['count'] + y['count'],
+            'min': min(bounds) if bounds else None,
+            'max': max(bounds) if bounds else None,
+            'symbols': np.union1d(x['symbols'], y['symbols'])}
+
+
+def symbol_summary(chunks, distinct=True):
+    """Summarize the symbols of a stream of chunks in a single pass."""
+    return reduce(merge_symbol_summaries,
+                  (summarize_symbols(chunk, distinct) for chunk in chunks),
+                  summarize_symbols([]))
+
+
+def summarize_symbol_values(seq):
+    """Summarize the symbols of a sequence of (symbol, value) frames, as
+    emitted by MultinomialExponentialHMM.
+
+    The symbols are the first column. The sequence is only valid if all
+    its frames are non-negative numbers.
+    """
+    seq = np.asarray(seq)
+    if seq.dtype.kind not in ('i', 'f') or np.any(seq < 0):
+        summary = summarize_symbols([])
+        summary['valid'] = False
+        return summary
+    return summarize_symbols(seq[:, 0].astype(int))
+
+
+def summarize_values(values):
+    """Summarize a chunk of frames of non-negative numbers, such as the
+    durations of ExponentialHMM, as `summarize_symbols` does symbols.
+
+    Only 'valid' and 'count' are filled in.
+    """
+    values = np.asarray(values)
+    summary = summarize_symbols([])
+    summary['count'] = values.size
+    if values.size and (values.dtype.kind not in ('i', 'f')
+                        or np.any(values < 0)):
+        summary['valid'] = False
+    return summary
+
+
+def check_symbol_summary(summary, n_symbols=None):
+    """Whether the summarized symbols can be fitted.
+
+    They must be at least two non-negative integers, and contiguous unless
+    the vocabulary is declared by ``n_symbols``, in which case they must
+    all be below it.
+    """
+    if not summary['valid'] or summary['count'] < 2:
+        return False
+    if n_symbols is not None:
+        return summary['max'] < n_symbols
+    # Fewer frames than the range cannot cover it.
+    n_range = summary['max'] - summary['min'] + 1
+    return (n_range <= summary['count']
+            and len(summary['symbols']) == n_range)
+
+
+def count_transitions(state_sequence, n_states):
+    """Count the transitions between each pair of states along a path."""
+    pairs = state_sequence[:-1] * n_states + state_sequence[1:]
+    return np.bincount(pairs, minlength=n_states ** 2).reshape(n_states,
+                                                               n_states)
+
+
+def sum_per_state(state_sequence, values, n_states):
+    """Sum ``values`` over the observations spent in each state of a path.
+
+    ``values`` has shape (n_observations,) or (n_observations, n_features)
+    and the result shape (n_states,) or (n_states, n_features).
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        return np.bincount(state_sequence, values, n_states)
+    return np.column_stack([np.bincount(state_sequence, column, n_states)
+                            for column in values.T])
+
+
+def fill_per_sequence(results, out):
+    """Write per-batch arrays of per-sequence values into ``out``.
+
+    Parameters
+    ----------
+    results : iterable of array_like
+        Per-sequence values of consecutive batches, in order.
+
+    out : array_like or None
+        Array to write into. If None, the batches are concatenated into a
+        new array.
+
+    Returns
+    -------
+    out : array_like
+        The filled array.
+    """
+    if out is None:
+        results = list(results)
+        if not results:
+            return np.zeros(0)
+        return np.concatenate(results)
+    start = 0
+    for values in results:
+        out[start:start + len(values)] = values
+        start += len(values)
+    if start != len(out):
+        raise ValueError("out has length %d but %d sequences were scored"
+                         % (len(out), start))
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+class LatticeWorkspace(object):
+    """Scratch arrays for the forward-backward algorithm.
+
+    The arrays are sized to the longest sequence seen so far and reused
+    for every sequence, so that an EM iteration does not allocate new
+    lattices for each of them.
+
+    Parameters
+    ----------
+    n_states : int
+        Number of states of the model.
+
+    n_observations : int, optional
+        Length of the longest sequence to reserve space for. The
+        workspace grows when a longer sequence comes in.
+
+    Attributes
+    ----------
+    nbytes : int
+        Memory currently held by the workspace, in bytes.
+
+    peak_nbytes : int
+        Largest memory held by the workspace so far, in bytes.
+    """
+
+    def __init__(self, n_states, n_observations=1):
+        self.n_states = n_states
+        self.peak_nbytes = 0
+        self.work_buffer = np.zeros(n_states)
+        self._allocate(n_observations)
+
+    def _allocate(self, n_observations):
+        self.n_observations = n_observations
+        self._fwdlattice = np.empty((n_observations, self.n_states))
+        self._bwdlattice = np.empty((n_observations, self.n_states))
+        self._posteriors = np.empty((n_observations, self.n_states))
+        self.peak_nbytes = max(self.peak_nbytes, self.nbytes)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self._fwdlattice, self._bwdlattice,
+                                      self._posteriors, self.work_buffer))
+
+    def reserve(self, n_observations):
+        """Make room for a sequence of length ``n_observations``."""
+        if n_observations > self.n_observations:
+            self._allocate(n_observations)
+
+    def lattices(self, n_observations, n_states=None):
+        """Return views of the forward lattice, backward lattice and
+        posteriors for a sequence of length ``n_observations``.
+
+        ``n_states``, at most the one of the workspace, narrows the views
+        to contiguous arrays of that many columns. The views are
+        overwritten by the next call.
+        """
+        self.reserve(n_observations)
+        if n_states is None or n_states == self.n_states:
+            return (self._fwdlattice[:n_observations],
+                    self._bwdlattice[:n_observations],
+                    self._posteriors[:n_observations])
+        if n_states > self.n_states:
+            raise ValueError("the workspace holds %d states, got %d"
+                             % (self.n_states, n_states))
+        size = n_observations * n_states
+        return tuple(a.reshape(-1)[:size].reshape(n_observations, n_states)
+                     for a in (self._fwdlattice, self._bwdlattice,
+                               self._posteriors))
+
+
 def log_normalize(A, axis=None):
     arr = np.rollaxis(A, axis)
     vmax = arr.max(axis=axis)
@@ -112,6 +730,13 @@ def normalize(A, axis=None):
     return A / Asum
 
 
+def log_renormalize(A):
+    """Shift the log-probabilities of the last axis of A to sum to one."""
+    vmax = A.max(axis=-1)[..., np.newaxis]
+    vmax[~np.isfinite(vmax)] = 0
+    return A - vmax - np.log(np.exp(A - vmax).sum(axis=-1))[..., np.newaxis]
+
+
 def randomize(A, axis=None):
     randomizer = np.random.rand(*A.shape) / 10.
     Arand = A + randomizer
@@ -148,7 +773,128 @@ class VerboseReporter(object):
                 self.verbose_mod *= 10
 
 
-class _BaseHMM(BaseEstimator):
+class SquaremAccelerator(object):
+    """Squared extrapolation of the EM updates (SQUAREM).
+
+    Every two EM updates theta0 -> theta1 -> theta2 are extrapolated to
+    ``theta0 - 2 * alpha * r + alpha ** 2 * v``, with ``r = theta1 - theta0``,
+    ``v = theta2 - 2 * theta1 + theta0`` and ``alpha = -|r| / |v|``, in the
+    unconstrained space of the model's ``_get_em_params``. The extrapolated
+    parameters are kept only when their log probability is at least the
+    one of theta1, otherwise the fit goes on from theta2 as plain EM would.
+
+    See R. Varadhan and C. Roland, "Simple and globally convergent methods
+    for accelerating the convergence of any EM algorithm", Scandinavian
+    Journal of Statistics, 2008.
+
+    Parameters
+    ----------
+    model : _BaseHMM
+        Model being fitted.
+
+    params : string
+        Parameters the M-step updates.
+    """
+
+    def __init__(self, model, params):
+        self.model = model
+        self.params = params
+        self._trajectory = []
+        self._fallback = None
+        self._logprob = -np.inf
+
+    def accept(self, logprob):
+        """Check the log probability of the current parameters, after the
+        E-step. Returns False when extrapolated parameters are rejected, in
+        which case the model is reset to the last EM update and the E-step
+        must be run again."""
+        if self._fallback is not None:
+            fallback, self._fallback = self._fallback, None
+            if not logprob >= self._logprob:
+                self.model._set_em_params(fallback)
+                return False
+        self._logprob = logprob
+        if not self._trajectory:
+            self._trajectory.append(self.model._get_em_params(self.params))
+        return True
+
+    def update(self, extrapolate=True):
+        """Record the parameters of an M-step, extrapolating every second
+        one. Without ``extrapolate``, as after the last iteration where no
+        E-step would check them, the M-step is kept as it is."""
+        self._trajectory.append(self.model._get_em_params(self.params))
+        if len(self._trajectory) < 3 or not extrapolate:
+            return
+        theta0, theta1, theta2 = self._trajectory
+        self._trajectory = []
+        r, v = {}, {}
+        for name in theta2:
+            finite = (np.isfinite(theta0[name]) & np.isfinite(theta1[name])
+                      & np.isfinite(theta2[name]))
+            r[name] = np.where(finite, theta1[name] - theta0[name], 0)
+            v[name] = np.where(finite, theta2[name] - theta1[name], 0) - \
+                r[name]
+        r_norm = np.sqrt(sum((r[name] ** 2).sum() for name in r))
+        v_norm = np.sqrt(sum((v[name] ** 2).sum() for name in v))
+        if v_norm == 0:
+            return
+        # A step no shorter than the one of plain EM, alpha == -1 lands
+        # on theta2.
+        alpha = min(-r_norm / v_norm, -1)
+        if alpha == -1:
+            return
+        extrapolated = {}
+        for name in theta2:
+            step = theta0[name] - 2 * alpha * r[name] + alpha ** 2 * v[name]
+            extrapolated[name] = np.where(np.isfinite(step) & (r[name] != 0),
+                                          step, theta2[name])
+        self.model._set_em_params(extrapolated)
+        self._fallback = theta2
+
+
+class _TrainingScoreMixin(object):
+    """Reuse of the log probability computed by fit in ``aic`` and ``bic``.
+
+    The estimator provides ``score``, ``_count_frames``, ``batch_size``,
+    ``memory_safe`` and the ``converged_`` flag set by fit.
+    """
+
+    def _remember_training_set(self, obs, logprob, executor, n_data=None):
+        """Keep what ``aic`` and ``bic`` reuse on the training set.
+
+        ``n_data`` is the frame count of the last E-step, if any.
+        """
+        self.logprob_ = logprob
+        # A converged fit ends on an E-step of the final parameters,
+        # otherwise the log probability is computed on first demand.
+        self._training_logprob = logprob[-1] if self.converged_ else None
+        distributed = executor.is_distributed(obs)
+        if n_data is not None:
+            self.n_data_ = n_data
+        elif distributed:
+            self.n_data_ = executor.aggregate_batches(
+                unwrap_self_count_frames, self, obs, self.batch_size, 0,
+                operator.add)
+        else:
+            self.n_data_ = self._count_frames(obs)
+        # Data held by the backend has no key, scoring it always takes a
+        # pass.
+        self._training_key = None if distributed else \
+            (data_key(obs), params_fingerprint(self))
+
+    def _training_score(self, obs):
+        """Return the log probability and number of observations of obs,
+        without a pass over the data when obs is the training set of the
+        last fit and the parameters have not changed since."""
+        key = getattr(self, '_training_key', None)
+        if key is None or key != (data_key(obs), params_fingerprint(self)):
+            return self.score(obs), self._count_frames(obs)
+        if self._training_logprob is None:
+            self._training_logprob = self.score(obs)
+        return self._training_logprob, self.n_data_
+
+
+class _BaseHMM(_TrainingScoreMixin, BaseEstimator):
     """Hidden Markov Model base class.
 
     Representation of a hidden Markov model probability distribution.
@@ -207,6 +953,14 @@ class _BaseHMM(BaseEstimator):
         greater than 1 then it prints progress and performance for every
         iteration.
 
+    n_jobs : int, default: 1
+        Number of workers the batches of sequences are spread over.
+
+    backend : string or Executor, optional
+        Where the batches run, one of "serial", "thread" or "process", or
+        an executor from :mod:`hmmlearn.executors` (e.g. a SparkExecutor).
+        Defaults to serial when ``n_jobs == 1`` and processes otherwise.
+
 
     See Also
     --------
@@ -229,7 +983,8 @@ class _BaseHMM(BaseEstimator):
                  algorithm="viterbi", random_state=None,
                  n_iter=10, thresh=1e-2, params=string.ascii_letters,
                  init_params=string.ascii_letters, verbose=0,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None):
 
         self.n_states = n_states
         self.n_iter = n_iter
@@ -251,11 +1006,15 @@ class _BaseHMM(BaseEstimator):
         self.n_jobs = n_jobs
         self.batch_size = batch_size
         self.memory_safe = memory_safe
+        self.backend = backend
+
+    def _executor_scope(self):
+        return executor_scope(self.backend, self.n_jobs)
 
     def eval(self, X):
         return self.score_samples(X)
 
-    def score_samples(self, obs):
+    def score_samples(self, obs, out=None):
         """Compute the log probability under the model and compute posteriors.
 
         Parameters
@@ -264,6 +1023,11 @@ class _BaseHMM(BaseEstimator):
             Sequence of n_features-dimensional data points. Each row
             corresponds to a single point in the sequence.
 
+        out : array_like, shape (n_frames, n_states), optional
+            Buffer to write the posteriors of all the sequences into, one
+            after the other. If given, the returned posteriors are views
+            into ``out``.
+
         Returns
         -------
         logprob : float
@@ -278,23 +1042,8 @@ class _BaseHMM(BaseEstimator):
         score : Compute the log probability under the model
         decode : Find most likely state sequence corresponding to a `obs`
         """
-        logprob = 0
-        posteriors = []
-        for seq in obs:
-            seq = np.asarray(seq)
-            framelogprob = self._compute_log_likelihood(seq)
-            lpr, fwdlattice = self._do_forward_pass(framelogprob)
-            bwdlattice = self._do_backward_pass(framelogprob)
-            gamma = fwdlattice + bwdlattice
-            # gamma is guaranteed to be correctly normalized by logprob at
-            # all frames, unless we do approximate inference using pruning.
-            # So, we will normalize each frame explicitly in case we
-            # pruned too aggressively.
-            posteriors.append(np.exp(gamma.T - logsumexp(gamma, axis=1)).T)
-            posteriors[-1] += np.finfo(np.float32).eps
-            posteriors[-1] /= np.sum(posteriors, axis=1).reshape((-1, 1))
-            logprob += lpr
-        return logprob, posteriors
+        results = self.infer(obs, outputs=("logprob", "posteriors"), out=out)
+        return results["logprob"].sum(), results["posteriors"]
 
     def score(self, obs):
         """Compute the log probability under the model.
@@ -317,20 +1066,53 @@ class _BaseHMM(BaseEstimator):
 
         decode : Find most likely state sequence corresponding to a `obs`
         """
-        n_batches = (len(obs) // self.batch_size) + \
-                (1 if len(obs) % self.batch_size else 0)
-        if self.n_jobs == 1:
-            logprob = 0
-            for obs_batch in batches(obs, self.batch_size):
-                logprob += self._score(obs_batch)
-        else:
-            pool = mp.Pool(processes=self.n_jobs)
-            results = pool.map(unwrap_self_score,
-                               zip([self] * n_batches,
-                                   batches(obs, self.batch_size)))
-            pool.terminate()
-            logprob = sum(results)
-        return logprob
+        with self._executor_scope() as executor:
+            return executor.aggregate_batches(unwrap_self_score, self, obs,
+                                              self.batch_size, 0,
+                                              operator.add)
+
+    def score_per_sequence(self, obs, out=None):
+        """Compute the log probability of each sequence under the model.
+
+        Parameters
+        ----------
+        obs : list of array_like, shape (n, n_features)
+            Sequence of n_features-dimensional data points.  Each row
+            corresponds to a single data point.
+
+        out : array_like or string, optional
+            Preallocated float64 array (or ``np.memmap``) of length
+            ``len(obs)`` to write the log probabilities into. If a string
+            is given, the results are streamed into a new float64
+            ``np.memmap`` stored at that path. When ``memory_safe`` is
+            set, ``out`` must hold one entry per sequence of all the
+            pickled files.
+
+        Returns
+        -------
+        logprobs : array_like, shape (n_sequences,)
+            Log likelihood of each sequence in ``obs``.
+
+        See Also
+        --------
+        score : Compute the log probability under the model
+        """
+        if isinstance(out, str):
+            if self.memory_safe:
+                raise ValueError("The number of sequences is unknown when "
+                                 "memory safe, preallocate out instead.")
+            out = np.memmap(out, dtype=np.float64, mode='w+',
+                            shape=(len(obs),))
+        elif out is None and not self.memory_safe:
+            out = np.empty(len(obs))
+
+        with self._executor_scope() as executor:
+            # imap keeps the batches in order and lets the results be
+            # written out as they arrive.
+            return fill_per_sequence(
+                executor.imap(unwrap_self_score_per_sequence,
+                              ((self, obs_batch) for obs_batch
+                               in batches(obs, self.batch_size))), out)
 
     def aic(self, obs):
         """Computes the Aikaike Information Criterion of the model and
@@ -345,11 +1127,15 @@ class _BaseHMM(BaseEstimator):
         -------
         aic_score : float
             The Aikaike Information Criterion.
+
+        Notes
+        -----
+        On the training set of the last fit, the log probability that fit
+        computed is reused instead of scoring the data again. The training
+        set is recognized by identity, pass a copy of sequences changed in
+        place since.
         """
-        logprob = self.score(obs)
-        n_pars = self._n_free_parameters()
-        aic_score = 2 * n_pars - 2 * logprob
-        return aic_score
+        return self._aic(self._training_score(obs)[0])
 
     def bic(self, obs):
         """Computes the Aikaike Information Criterion of the model and
@@ -365,9 +1151,15 @@ class _BaseHMM(BaseEstimator):
         bic_score : float
             The Aikaike Information Criterion.
         """
-        logprob = self.score(obs)
+        return self._bic(*self._training_score(obs))
+
+    def _aic(self, logprob):
+        n_pars = self._n_free_parameters()
+        aic_score = 2 * n_pars - 2 * logprob
+        return aic_score
+
+    def _bic(self, logprob, n_data):
         n_pars = self._n_free_parameters()
-        n_data = sum([len(seq) for seq in obs])
         bic_score = n_pars * (np.log(n_data) - np.log(2 * np.pi)) - 2 * logprob
         return bic_score
 
@@ -397,14 +1189,8 @@ class _BaseHMM(BaseEstimator):
 
         score : Compute the log probability under the model
         """
-        viterbi_logprobs = np.zeros(len(obs))
-        state_sequences = []
-        for n, seq in enumerate(obs):
-            seq = np.asarray(seq)
-            framelogprob = self._compute_log_likelihood(seq)
-            viterbi_logprobs[n], state_sequence = self._do_viterbi_pass(framelogprob)
-            state_sequences.append(state_sequence)
-        return viterbi_logprobs, state_sequences
+        results = self.infer(obs, outputs=("viterbi",))
+        return results["viterbi_logprob"], results["viterbi"]
 
     def _decode_map(self, obs):
         """Find most likely state sequence corresponding to `obs`.
@@ -430,9 +1216,9 @@ class _BaseHMM(BaseEstimator):
             posteriors.
         score : Compute the log probability under the model.
         """
-        map_logprobs = np.zeros(len(obs))
+        posteriors = self.infer(obs, outputs=("posteriors",))["posteriors"]
+        map_logprobs = np.zeros(len(posteriors))
         state_sequences = []
-        _, posteriors = self.score_samples(obs)
         for n, post in enumerate(posteriors):
             state_sequences.append(np.argmax(post, axis=1))
             map_logprobs[n] = np.max(post, axis=1).sum()
@@ -506,10 +1292,104 @@ class _BaseHMM(BaseEstimator):
         posteriors : list of array-like, shape (n, n_states)
             Returns the probability of the sample for each state in the model.
         """
-        _, posteriors = self.score_samples(obs)
-        return posteriors
+        return self.infer(obs, outputs=("posteriors",))["posteriors"]
+
+    def infer(self, obs, outputs=inference_outputs, out=None):
+        """Run several inference algorithms in a single pass over ``obs``.
+
+        The frame log likelihood of each sequence is computed once and
+        shared by all of the requested algorithms.
+
+        Parameters
+        ----------
+        obs : list of array_like, shape (n, n_features)
+            Sequence of n_features-dimensional data points. Each row
+            corresponds to a single point in the sequence.
+
+        outputs : sequence of strings, one or more of `inference_outputs`
+            Which results to compute: "logprob" for the log likelihood
+            of each sequence, "posteriors" for the posterior state
+            probabilities and "viterbi" for the most likely state
+            sequences.
+
+        out : array_like, shape (n_frames, n_states), optional
+            Buffer to write the posteriors of all the sequences into, one
+            after the other. If given, the returned posteriors are views
+            into ``out``.
+
+        Returns
+        -------
+        results : dict
+            Maps "logprob" to an array of shape (n_sequences,),
+            "posteriors" to a list of arrays of shape (n, n_states),
+            "viterbi" to a list of state sequences and "viterbi_logprob"
+            to an array of shape (n_sequences,) with the log probability
+            of those sequences, for the requested outputs only.
+
+        See Also
+        --------
+        score_samples : Compute the log probability under the model and
+            posteriors.
 
-    def sample(self, n_seq=1, n_min=10, n_max=20, random_state=None):
+        decode : Find most likely state sequence corresponding to a `obs`
+        """
+        outputs = tuple(outputs)
+        for output in outputs:
+            if output not in inference_outputs:
+                raise ValueError("outputs must be in %s, got %r"
+                                 % (inference_outputs, output))
+        if out is not None and "posteriors" in outputs:
+            # The posteriors are written into out without bounds checks.
+            shape = (self._count_frames(obs), self.n_states)
+            if not isinstance(out, np.ndarray) or out.shape != shape or \
+                    out.dtype != np.float64 or \
+                    not out.flags['C_CONTIGUOUS']:
+                raise ValueError("out must be a C-contiguous float64 array "
+                                 "of shape %s" % (shape,))
+
+        with self._executor_scope() as executor:
+            serial = isinstance(executor, SerialExecutor)
+            if serial:
+                batch_results = []
+                offset = 0
+                for obs_batch in batches(obs, self.batch_size):
+                    batch_results.append(self._infer(obs_batch, outputs, out,
+                                                     offset))
+                    if "posteriors" in outputs:
+                        offset += sum(len(post) for post
+                                      in batch_results[-1]["posteriors"])
+            else:
+                batch_results = executor.map(
+                    unwrap_self_infer,
+                    ((self, obs_batch, outputs) for obs_batch
+                     in batches(obs, self.batch_size)))
+
+        if not batch_results:
+            # No sequence at all: still hand back every requested output.
+            batch_results = [self._infer([], outputs)]
+
+        results = {}
+        for key in batch_results[0]:
+            values = [r[key] for r in batch_results]
+            if isinstance(values[0], np.ndarray):
+                results[key] = np.concatenate(values)
+            else:
+                results[key] = reduce(lambda x, y: x + y, values, [])
+
+        if out is not None and not serial:
+            # Workers do not know their offset into the caller's buffer,
+            # so copy the posteriors over and hand back views of it.
+            offset = 0
+            for n, post in enumerate(results["posteriors"]):
+                if offset + len(post) > len(out):
+                    raise ValueError("out holds fewer frames than obs")
+                out[offset:offset + len(post)] = post
+                results["posteriors"][n] = out[offset:offset + len(post)]
+                offset += len(post)
+        return results
+
+    def sample(self, n_seq=1, n_min=10, n_max=20, random_state=None,
+               lengths=None):
         """Generate random samples from the model.
 
         Parameters
@@ -527,6 +1407,10 @@ class _BaseHMM(BaseEstimator):
             A random number generator instance. If None is given, the
             object's random_state is used
 
+        lengths : array_like of int, optional
+            Length of each sequence to generate. If given, ``n_seq``,
+            ``n_min`` and ``n_max`` are ignored.
+
         Returns
         -------
         (obs, hidden_states)
@@ -537,36 +1421,42 @@ class _BaseHMM(BaseEstimator):
             random_state = self.random_state
         random_state = check_random_state(random_state)
 
+        if lengths is None:
+            lengths = random_state.randint(n_min, n_max, size=n_seq)
+        lengths = np.asarray(lengths, dtype=int)
+        n_seq = len(lengths)
+        if n_seq == 0:
+            return [], []
+
         startprob_pdf = self.startprob_
         startprob_cdf = np.cumsum(startprob_pdf)
         transmat_pdf = self.transmat_
         transmat_cdf = np.cumsum(transmat_pdf, 1)
 
-        obs = []
-        states = []
-
-        for _ in range(n_seq):
-            n = np.random.randint(n_min, n_max, size=1)
-            # Initial state.
-            rand = random_state.rand()
-            currstate = (startprob_cdf > rand).argmax()
-            state_seq = [currstate]
-            obs_seq = [self._generate_sample_from_state(
-                currstate, random_state=random_state)]
-
-            for _ in range(n - 1):
-                rand = random_state.rand()
-                currstate = (transmat_cdf[currstate] > rand).argmax()
-                state_seq.append(currstate)
-                obs_seq.append(self._generate_sample_from_state(
-                    currstate, random_state=random_state))
-
-            obs.append(deepcopy(np.array(obs_seq)))
-            states.append(deepcopy(np.array(state_seq, dtype=int)))
+        # Hidden states of all the sequences are drawn together, one time
+        # step at a time, rather than one sequence after the other.
+        state_paths = np.zeros((n_seq, max(lengths.max(), 1)), dtype=int)
+        rand = random_state.rand(n_seq)
+        state_paths[:, 0] = (startprob_cdf > rand[:, np.newaxis]).argmax(1)
+        for t in range(1, lengths.max()):
+            rand = random_state.rand(n_seq)
+            state_paths[:, t] = (transmat_cdf[state_paths[:, t - 1]]
+                                 > rand[:, np.newaxis]).argmax(1)
+
+        # Emissions of all the frames are then drawn in one call and split
+        # back into sequences.
+        mask = np.arange(lengths.max()) < lengths[:, np.newaxis]
+        all_states = state_paths[mask]
+        all_obs = self._generate_samples_from_states(
+            all_states, random_state=random_state)
+        offsets = np.cumsum(lengths)[:-1]
+        obs = np.split(all_obs, offsets)
+        states = np.split(all_states, offsets)
 
         return obs, states
 
-    def fit(self, obs, warm_start=False):
+    def fit(self, obs, warm_start=False, algorithm="baum-welch",
+            acceleration=None, n_init=1, abandon_after=10, abandon_tol=1e-2):
         """Estimate model parameters.
 
         An initialization step is performed before entering the EM
@@ -582,6 +1472,41 @@ class _BaseHMM(BaseEstimator):
             each of which is a filepath to a pickled object, being
             a list of array-like observation sequences.
 
+        warm_start : bool, optional
+            Start from the current parameters instead of initializing
+            them.
+
+        algorithm : string, one of the training_algorithms
+            "baum-welch" weighs the statistics by the state posteriors.
+            "viterbi" counts them along the most likely state path of
+            each sequence instead, which needs neither the backward pass
+            nor the posteriors.
+
+        acceleration : None or "squarem", optional
+            "squarem" extrapolates the trajectory of the parameters every
+            two iterations (see :class:`SquaremAccelerator`), which usually
+            takes fewer passes over the data to converge. Extrapolated
+            parameters that lower the log probability are dropped for the
+            plain EM update.
+
+        n_init : int, optional
+            Number of restarts from different initializations, run
+            concurrently on the backend. Each restart is initialized
+            from a seed drawn from ``random_state``. The restart with the
+            highest log probability is kept. With ``warm_start`` the first
+            restart starts from the current parameters. The process
+            backend sends a copy of ``obs`` with each restart, pass paths
+            with ``memory_safe`` to keep it small.
+
+        abandon_after : int, optional
+            Number of iterations after which the restarts are compared.
+            Those whose log probability trails the best one by more than
+            ``abandon_tol`` times its magnitude are abandoned.
+
+        abandon_tol : float, optional
+            Relative margin of the restarts kept after ``abandon_after``
+            iterations.
+
         Notes
         -----
         In general, `logprob` should be non-decreasing unless
@@ -590,17 +1515,47 @@ class _BaseHMM(BaseEstimator):
         small).  You can fix this by getting more training data,
         or strengthening the appropriate subclass-specific regularization
         parameter.
+
+        With Viterbi training `logprob` is the log probability of the
+        best paths. A state that no path goes through gets no
+        statistics, which leaves its emission parameters to the priors.
+
+        With the serial backend the forward and backward lattices of all
+        the sequences share one workspace, sized to the longest sequence.
+        Its peak size in bytes is stored in ``workspace_nbytes_``.
+
+        The log probability of each iteration is stored in ``logprob_``,
+        the number of observations in ``n_data_``, and ``converged_``
+        tells whether ``thresh`` was met. ``aic`` and ``bic`` then reuse
+        them on the training set. With
+        ``n_init > 1`` the traces of all the restarts are stored in
+        ``restart_logprobs_`` and the index of the best one in
+        ``best_restart_``.
         """
 
         if self.memory_safe and (not isinstance(obs[0], str)):
             raise ValueError("Filepath locations must be provided as \
                              observations to be memory safe.")
 
-        n_batches = (len(obs) // self.batch_size) + \
-            (1 if len(obs) % self.batch_size else 0)
+        if n_init < 1:
+            raise ValueError("n_init must be positive, got %r" % (n_init,))
+
         if self.algorithm not in decoder_algorithms:
             self._algorithm = "viterbi"
 
+        if algorithm not in training_algorithms:
+            raise ValueError("algorithm must be one of %s, got %r"
+                             % (training_algorithms, algorithm))
+
+        if acceleration is not None and acceleration not in accelerations:
+            raise ValueError("acceleration must be one of %s, got %r"
+                             % (accelerations, acceleration))
+
+        if n_init > 1:
+            return self._fit_restarts(
+                obs, n_init, abandon_after, abandon_tol, warm_start,
+                dict(algorithm=algorithm, acceleration=acceleration))
+
         if not warm_start:
             self._init(obs, self.init_params)
 
@@ -608,40 +1563,192 @@ class _BaseHMM(BaseEstimator):
             verbose_reporter = VerboseReporter(self.verbose)
             verbose_reporter.init()
 
+        # The serial E-step reuses one workspace for all the sequences of
+        # all the iterations, each worker makes its own per batch.
+        workspace = LatticeWorkspace(self.n_states)
+        estep = unwrap_self_estep
+        if algorithm == "viterbi":
+            estep = unwrap_self_viterbi_estep
+        accelerator = None
+        if acceleration == "squarem":
+            accelerator = SquaremAccelerator(self, self.params)
         logprob = []
-        for i in range(self.n_iter):
-            # Expectation step
-            if self.n_jobs == 1:
-                stats = self._initialize_sufficient_statistics()
-                curr_logprob = 0
-                for obs_batch in batches(obs, self.batch_size):
-                    seq_stats, lpr = self._do_estep(obs_batch)
-                    stats = merge_sum(stats, seq_stats)
-                    curr_logprob += lpr
-            else:
-                pool = mp.Pool(processes=self.n_jobs)
-                results = pool.map(unwrap_self_estep,
-                                   zip([self] * n_batches,
-                                       batches(obs, self.batch_size)))
-                pool.terminate()
-                stats = reduce_merge_sum([x[0] for x in results])
-                curr_logprob = sum([x[1] for x in results])
-            logprob.append(curr_logprob)
-            if i > 0:
-                improvement = logprob[-1] - logprob[-2]
-            else:
-                improvement = np.inf
-            if self.verbose:
-                verbose_reporter.update(i, curr_logprob, improvement)
+        n_data = None
+        self.converged_ = False
+        with self._executor_scope() as executor, executor.sharing(self):
+            batch_workspace = workspace
+            if not isinstance(executor, SerialExecutor):
+                batch_workspace = None
+            for i in range(self.n_iter):
+                # Expectation step
+                stats, curr_logprob = executor.aggregate_batches(
+                    estep, self, obs, self.batch_size,
+                    (self._initialize_sufficient_statistics(), 0),
+                    merge_estep_results, (batch_workspace,))
+                n_data = stats['nframes']
+                if accelerator is not None and \
+                        not accelerator.accept(curr_logprob):
+                    # The extrapolation made things worse, the model is
+                    # back to the last EM update.
+                    continue
+                logprob.append(curr_logprob)
+                if len(logprob) > 1:
+                    improvement = logprob[-1] - logprob[-2]
+                else:
+                    improvement = np.inf
+                if self.verbose:
+                    verbose_reporter.update(i, curr_logprob, improvement)
+
+                # Check for convergence.
+                if len(logprob) > 1 and \
+                        abs(logprob[-1] - logprob[-2]) < self.thresh:
+                    self.converged_ = True
+                    break
+
+                # Maximization step
+                self._do_mstep(stats, self.params)
+                if accelerator is not None:
+                    accelerator.update(extrapolate=i < self.n_iter - 1)
+
+            self._remember_training_set(obs, logprob, executor, n_data)
+        self.workspace_nbytes_ = workspace.peak_nbytes
+        return self
+
+    def _fit_restart(self, obs, n_iter, fit_params, init=False):
+        if init:
+            self._init(obs, self.init_params)
+        self.n_iter = n_iter
+        return _BaseHMM.fit(self, obs, warm_start=True, **fit_params)
+
+    def _fit_restarts(self, obs, n_init, abandon_after, abandon_tol,
+                      warm_start, fit_params):
+        # The restarts are initialized and fit serially inside the tasks of
+        # the executor, each from a seed of its own. Data held by the
+        # backend stays there: the restarts then take turns, each running
+        # on the backend. Other data travels with each task, which the
+        # process backend pickles: memory_safe paths keep that light.
+        seeds = check_random_state(self.random_state).randint(
+            np.iinfo(np.int32).max, size=n_init)
+        with self._executor_scope() as backend:
+            distributed = backend.is_distributed(obs)
+        restarts = []
+        for r in range(n_init):
+            restart = copy.deepcopy(self)
+            if not distributed:
+                restart.backend = "serial"
+                restart.n_jobs = 1
+            restart.verbose = 0
+            restart.random_state = seeds[r]
+            restarts.append(restart)
+
+        n_probe_iter = min(abandon_after, self.n_iter)
+        scope = executor_scope("serial") if distributed \
+            else self._executor_scope()
+        with scope as executor:
+            restarts = executor.map(
+                unwrap_self_fit_restart,
+                ((restart, obs, n_probe_iter, fit_params,
+                  r > 0 or not warm_start)
+                 for r, restart in enumerate(restarts)))
+            traces = [list(restart.logprob_) for restart in restarts]
+            leader = max(trace[-1] for trace in traces)
+            alive = [r for r, restart in enumerate(restarts)
+                     if not restart.converged_
+                     and traces[r][-1] >= leader - abandon_tol * abs(leader)]
+            if alive and n_probe_iter < self.n_iter:
+                resumed = executor.map(
+                    unwrap_self_fit_restart,
+                    ((restarts[r], obs, self.n_iter - n_probe_iter,
+                      fit_params) for r in alive))
+                for r, restart in zip(alive, resumed):
+                    restarts[r] = restart
+                    traces[r].extend(restart.logprob_)
+
+        best = int(np.argmax([trace[-1] for trace in traces]))
+        settings = dict((name, getattr(self, name))
+                        for name in ('n_iter', 'backend', 'n_jobs', 'verbose',
+                                     'random_state'))
+        self.__dict__.update(restarts[best].__dict__)
+        self.__dict__.update(settings)
+        self.logprob_ = traces[best]
+        self.restart_logprobs_ = traces
+        self.best_restart_ = best
+        return self
 
-            # Check for convergence.
-            if i > 0 and abs(logprob[-1] - logprob[-2]) < self.thresh:
-                break
+    def _fit_candidate(self, obs, warm_start=False):
+        self.fit(obs, warm_start)
+        return self, self._training_score(obs)[0]
 
-            # Maximization step
-            self._do_mstep(stats, self.params)
+    def _resized(self, n_states):
+        """Return an unfitted copy of the model with ``n_states`` states.
 
-        return self
+        Priors of the wrong size are reset to their defaults.
+        """
+        model = copy.deepcopy(self)
+        model.n_states = n_states
+        if np.shape(model.startprob_prior) != (n_states,):
+            model.startprob_prior = np.ones(n_states)
+        if np.shape(model.transmat_prior) != (n_states, n_states):
+            model.transmat_prior = np.ones((n_states, n_states))
+        model.startprob_ = None
+        model.transmat_ = None
+        return model
+
+    def _split_states(self, n_states, n_observations=100):
+        """Return a copy of the model grown to ``n_states`` states.
+
+        The state most visited by sequences of length ``n_observations``
+        is split in two until there are enough of them.
+        """
+        model = copy.deepcopy(self)
+        while model.n_states < n_states:
+            state_probs = model.startprob_
+            occupancy = np.zeros(model.n_states)
+            for t in range(int(n_observations)):
+                occupancy += state_probs
+                state_probs = np.dot(state_probs, model.transmat_)
+            model._split_state(int(np.argmax(occupancy)))
+        return model
+
+    def _split_state(self, state):
+        # The new state is appended. Both halves share the start and
+        # incoming transition probabilities of the state split.
+        startprob = np.append(self.startprob_, self.startprob_[state] / 2)
+        startprob[state] /= 2
+        transmat = np.vstack([self.transmat_, self.transmat_[state]])
+        transmat = np.hstack([transmat, transmat[:, [state]] / 2])
+        transmat[:, state] /= 2
+        self.startprob_prior = np.append(self.startprob_prior,
+                                         self.startprob_prior[state])
+        transmat_prior = np.vstack([self.transmat_prior,
+                                    self.transmat_prior[state]])
+        self.transmat_prior = np.hstack([transmat_prior,
+                                         transmat_prior[:, [state]]])
+        self._split_emissions(state)
+        self.n_states += 1
+        self.startprob_ = startprob
+        self.transmat_ = transmat
+
+    def _split_emissions(self, state):
+        """Append a perturbed copy of the emission parameters of state."""
+        raise ValueError("%s does not support splitting states"
+                         % self.__class__.__name__)
+
+    def _get_em_params(self, params):
+        """Return the parameters the M-step updates, mapped to a space
+        where any value is valid, for SquaremAccelerator."""
+        em_params = {}
+        if 's' in params:
+            em_params['startprob'] = self._log_startprob.copy()
+        if 't' in params:
+            em_params['transmat'] = self._log_transmat.copy()
+        return em_params
+
+    def _set_em_params(self, em_params):
+        if 'startprob' in em_params:
+            self._log_startprob = log_renormalize(em_params['startprob'])
+        if 'transmat' in em_params:
+            self._log_transmat = log_renormalize(em_params['transmat'])
 
     def _get_algorithm(self):
         "decoder algorithm"
@@ -712,24 +1819,32 @@ class _BaseHMM(BaseEstimator):
             self._log_transmat, framelogprob)
         return logprob, state_sequence
 
-    def _do_forward_pass(self, framelogprob):
-
+    def _do_forward_pass(self, framelogprob, out=None, work_buffer=None):
+        # The kernel already clamps values below ZEROLOGPROB to NEGINF.
         n_observations, n_states = framelogprob.shape
-        fwdlattice = np.zeros((n_observations, n_states))
+        if out is None:
+            out = np.zeros((n_observations, n_states))
         _hmmc._forward(n_observations, n_states, self._log_startprob,
-                       self._log_transmat, framelogprob, fwdlattice)
-        fwdlattice[fwdlattice <= ZEROLOGPROB] = NEGINF
-        return logsumexp(fwdlattice[-1]), fwdlattice
+                       self._log_transmat, framelogprob, out, work_buffer)
+        return _hmmc._logsum(out[-1]), out
 
-    def _do_backward_pass(self, framelogprob):
+    def _do_backward_pass(self, framelogprob, out=None, work_buffer=None):
         n_observations, n_states = framelogprob.shape
-        bwdlattice = np.zeros((n_observations, n_states))
+        if out is None:
+            out = np.zeros((n_observations, n_states))
         _hmmc._backward(n_observations, n_states, self._log_startprob,
-                        self._log_transmat, framelogprob, bwdlattice)
-
-        bwdlattice[bwdlattice <= ZEROLOGPROB] = NEGINF
-
-        return bwdlattice
+                        self._log_transmat, framelogprob, out, work_buffer)
+        return out
+
+    def _compute_posteriors(self, fwdlattice, bwdlattice, out=None):
+        """Normalize fwdlattice + bwdlattice into state posteriors, one
+        frame at a time. ``out`` may be ``fwdlattice`` itself."""
+        n_observations, n_states = fwdlattice.shape
+        if out is None:
+            out = np.empty((n_observations, n_states))
+        _hmmc._compute_posteriors(n_observations, n_states, fwdlattice,
+                                  bwdlattice, out)
+        return out
 
     def _compute_log_likelihood(self, obs):
         pass
@@ -737,17 +1852,29 @@ class _BaseHMM(BaseEstimator):
     def _generate_sample_from_state(self, state, random_state=None):
         pass
 
+    def _generate_samples_from_states(self, states, random_state=None):
+        """Draw one emission for each entry of ``states``.
+
+        Subclasses override this with a vectorized draw; the default falls
+        back to one call of ``_generate_sample_from_state`` per frame.
+        """
+        random_state = check_random_state(random_state)
+        return np.array([self._generate_sample_from_state(
+            state, random_state=random_state) for state in states])
+
     def _init(self, obs, params):
+        random_state = check_random_state(self.random_state)
         if 's' in params:
-            self.startprob_ = np.random.dirichlet(self.startprob_prior)
+            self.startprob_ = random_state.dirichlet(self.startprob_prior)
         if 't' in params:
-            self.transmat_ = np.vstack([np.random.dirichlet(
+            self.transmat_ = np.vstack([random_state.dirichlet(
                 self.transmat_prior[i])
                 for i in range(self.n_states)])
     # Methods used by self.fit()
 
     def _initialize_sufficient_statistics(self):
         stats = {'nobs': 0,
+                 'nframes': 0,
                  'start': np.zeros(self.n_states),
                  'trans': np.zeros((self.n_states, self.n_states))}
         return stats
@@ -756,6 +1883,7 @@ class _BaseHMM(BaseEstimator):
                                           posteriors, fwdlattice, bwdlattice,
                                           params):
         stats['nobs'] += 1
+        stats['nframes'] += len(posteriors)
         if 's' in params:
             stats['start'] += posteriors[0]
         if 't' in params:
@@ -763,54 +1891,154 @@ class _BaseHMM(BaseEstimator):
             # when the sample is of length 1, it contains no transitions
             # so there is no reason to update our trans. matrix estimate
             if n_observations > 1:
-                lneta = np.zeros((n_observations - 1,
-                                  n_states,
-                                  n_states))
-                lnP = logsumexp(fwdlattice[-1])
-                _hmmc._compute_lneta(n_observations, n_states, fwdlattice,
-                                     self._log_transmat, bwdlattice,
-                                     framelogprob, lnP, lneta)
-                stats['trans'] += np.exp(np.minimum(logsumexp(lneta, 0), 700))
-
-    def _do_estep(self, obs_batch):
-        if self.memory_safe:
-            local_obs = reduce(lambda x, y: x + y,
-                               [cPickle.load(open(filename, 'r'))
-                                for filename in obs_batch],
-                               [])
-        else:
-            local_obs = obs_batch
+                log_xi_sum = np.empty((n_states, n_states))
+                lnP = _hmmc._logsum(fwdlattice[-1])
+                _hmmc._compute_log_xi_sum(n_observations, n_states,
+                                          fwdlattice, self._log_transmat,
+                                          bwdlattice, framelogprob, lnP,
+                                          log_xi_sum)
+                stats['trans'] += np.exp(np.minimum(log_xi_sum, 700))
+
+    def _accumulate_path_statistics(self, stats, seq, state_sequence,
+                                    params):
+        """Accumulate the statistics of Viterbi training, where the
+        posteriors are the indicators of the states of ``state_sequence``.
+        """
+        stats['nobs'] += 1
+        stats['nframes'] += len(state_sequence)
+        if 's' in params:
+            stats['start'][state_sequence[0]] += 1
+        if 't' in params:
+            stats['trans'] += count_transitions(state_sequence,
+                                                self.n_states)
+
+    def _do_viterbi_estep(self, obs_batch, workspace=None):
+        local_obs = load_batch(obs_batch, self.memory_safe)
+        local_stats = self._initialize_sufficient_statistics()
+        curr_logprob = 0
+        for seq, framelogprob in iter_framelogprob(
+                local_obs, self._compute_log_likelihood):
+            lpr, state_sequence = self._do_viterbi_pass(framelogprob)
+            curr_logprob += lpr
+            self._accumulate_path_statistics(local_stats, seq,
+                                             state_sequence, self.params)
+        return local_stats, curr_logprob
+
+    def _do_estep(self, obs_batch, workspace=None):
+        local_obs = load_batch(obs_batch, self.memory_safe)
+        if workspace is None:
+            workspace = LatticeWorkspace(self.n_states)
         local_stats = self._initialize_sufficient_statistics()
         curr_logprob = 0
-        for seq in local_obs:
-            framelogprob = self._compute_log_likelihood(seq)
-            lpr, fwdlattice = self._do_forward_pass(framelogprob)
+        for seq, framelogprob in iter_framelogprob(
+                local_obs, self._compute_log_likelihood):
+            fwdlattice, bwdlattice, posteriors = workspace.lattices(
+                len(framelogprob))
+            lpr, _ = self._do_forward_pass(framelogprob, fwdlattice,
+                                           workspace.work_buffer)
             curr_logprob += lpr
-            bwdlattice = self._do_backward_pass(framelogprob)
-            gamma = fwdlattice + bwdlattice
-            posteriors = np.exp(gamma.T - logsumexp(gamma, axis=1)).T
+            self._do_backward_pass(framelogprob, bwdlattice,
+                                   workspace.work_buffer)
+            self._compute_posteriors(fwdlattice, bwdlattice, posteriors)
             self._accumulate_sufficient_statistics(local_stats, seq, framelogprob,
                                                    posteriors, fwdlattice,
                                                    bwdlattice, self.params)
-        if self.memory_safe:
-            local_obs = None
         return local_stats, curr_logprob
 
     def _score(self, obs_batch):
-        if self.memory_safe:
-            local_obs = reduce(lambda x, y: x + y,
-                               [cPickle.load(open(filename, 'r'))
-                                for filename in obs_batch],
-                               [])
-        else:
-            local_obs = obs_batch
-        logprob = 0
-        for seq in local_obs:
-            seq = np.asarray(seq)
-            framelogprob = self._compute_log_likelihood(seq)
-            lpr, _ = self._do_forward_pass(framelogprob)
-            logprob += lpr
-        return logprob
+        return self._score_per_sequence(obs_batch).sum()
+
+    def _score_per_sequence(self, obs_batch):
+        local_obs = load_batch(obs_batch, self.memory_safe)
+        workspace = LatticeWorkspace(self.n_states)
+        logprobs = []
+        for seq, framelogprob in iter_framelogprob(
+                local_obs, self._compute_log_likelihood):
+            fwdlattice, _, _ = workspace.lattices(len(framelogprob))
+            lpr, _ = self._do_forward_pass(framelogprob, fwdlattice,
+                                           workspace.work_buffer)
+            logprobs.append(lpr)
+        return np.array(logprobs, dtype=float)
+
+    def _infer(self, obs_batch, outputs, out=None, offset=0):
+        local_obs = load_batch(obs_batch, self.memory_safe)
+        results = {}
+        if "logprob" in outputs:
+            results["logprob"] = []
+        if "posteriors" in outputs:
+            results["posteriors"] = []
+        if "viterbi" in outputs:
+            results["viterbi_logprob"] = []
+            results["viterbi"] = []
+        workspace = LatticeWorkspace(self.n_states)
+        for seq, framelogprob in iter_framelogprob(
+                local_obs, self._compute_log_likelihood):
+            fwdlattice, bwdlattice, _ = workspace.lattices(len(framelogprob))
+            if "logprob" in outputs or "posteriors" in outputs:
+                lpr, _ = self._do_forward_pass(framelogprob, fwdlattice,
+                                               workspace.work_buffer)
+                if "logprob" in outputs:
+                    results["logprob"].append(lpr)
+            if "posteriors" in outputs:
+                self._do_backward_pass(framelogprob, bwdlattice,
+                                       workspace.work_buffer)
+                if out is None:
+                    # The posteriors are returned, so they cannot live in
+                    # the workspace.
+                    post = None
+                else:
+                    post = out[offset:offset + len(framelogprob)]
+                    if len(post) != len(framelogprob):
+                        raise ValueError("out holds fewer frames than obs")
+                    offset += len(framelogprob)
+                results["posteriors"].append(
+                    self._compute_posteriors(fwdlattice, bwdlattice, post))
+            if "viterbi" in outputs:
+                lpr, state_sequence = self._do_viterbi_pass(framelogprob)
+                results["viterbi_logprob"].append(lpr)
+                results["viterbi"].append(state_sequence)
+        for key in ("logprob", "viterbi_logprob"):
+            if key in results:
+                results[key] = np.array(results[key], dtype=float)
+        return results
+
+    def _count_frames(self, obs_batch):
+        return sum(len(seq) for seq
+                   in FrameStream(obs_batch, self.memory_safe))
+
+    def _count_sequences(self, obs_batch):
+        return sum(1 for _ in FrameStream(obs_batch, self.memory_safe))
+
+    def _symbol_summary(self, obs):
+        """Summarize the symbols of obs in a single pass, a batch per
+        task, see ``_summarize_symbols``."""
+        with self._executor_scope() as executor:
+            return executor.aggregate_batches(
+                unwrap_self_summarize_symbols, self, obs, self.batch_size,
+                summarize_symbols([]), merge_symbol_summaries)
+
+    def _get_param_pack(self):
+        """Return the parameters updated by fit, as a dict of arrays.
+
+        This is all a backend holding a copy of the estimator needs to
+        receive on every EM iteration, see ``Executor.sharing``.
+        """
+        return {'log_startprob': self._log_startprob,
+                'log_transmat': self._log_transmat}
+
+    def _set_param_pack(self, pack):
+        self._log_startprob = pack['log_startprob']
+        self._log_transmat = pack['log_transmat']
+
+    # Hooks of the initialization of the emissions, which backends holding
+    # the data themselves override.
+
+    def _init_frames(self, obs, column=None):
+        return init_frames(obs, self.init_strategy, self.memory_safe, column)
+
+    def _init_centers(self, frames):
+        return init_cluster_centers(frames, self.n_states, self.init_strategy,
+                                    self.init_sample_size, self.random_state)
 
     def _do_mstep(self, stats, params):
         # Based on Huang, Acero, Hon, "Spoken Language Processing",
@@ -899,6 +2127,16 @@ class GaussianHMM(_BaseHMM):
         greater than 1 then it prints progress and performance for every
         iteration.
 
+    init_strategy : string, one of init_strategies, default: "reservoir"
+        How the emissions are initialized from the data. "reservoir"
+        clusters a uniform sample of ``init_sample_size`` frames and
+        "minibatch" runs MiniBatchKMeans over batches of that size, both
+        streaming the sequences without concatenating them. "full"
+        clusters all the frames at once, which holds them all in memory.
+
+    init_sample_size : int, default: 10000
+        Number of frames of the "reservoir" and "minibatch" strategies.
+
     Examples
     --------
     >>> from hmmlearn.hmm import GaussianHMM
@@ -922,7 +2160,9 @@ class GaussianHMM(_BaseHMM):
                  verbose=0,
                  n_jobs=1,
                  batch_size=1,
-                 memory_safe=False):
+                 memory_safe=False,
+                 backend=None, init_strategy="reservoir",
+                 init_sample_size=10000):
         _BaseHMM.__init__(self, n_states, startprob, transmat,
                           startprob_prior=startprob_prior,
                           transmat_prior=transmat_prior, algorithm=algorithm,
@@ -931,7 +2171,10 @@ class GaussianHMM(_BaseHMM):
                           init_params=init_params, verbose=verbose,
                           n_jobs=n_jobs,
                           batch_size=batch_size,
-                          memory_safe=memory_safe)
+                          memory_safe=memory_safe,
+                          backend=backend)
+        self.init_strategy = init_strategy
+        self.init_sample_size = init_sample_size
 
         self._covariance_type = covariance_type
         if not covariance_type in ['spherical', 'tied', 'diag', 'full']:
@@ -995,36 +2238,61 @@ class GaussianHMM(_BaseHMM):
         return sample_gaussian(self._means_[state], cv, self._covariance_type,
                                random_state=random_state)
 
+    def _generate_samples_from_states(self, states, random_state=None):
+        random_state = check_random_state(random_state)
+        n_features = self._means_.shape[1]
+        rand = random_state.randn(len(states), n_features)
+        if self._covariance_type in ('diag', 'spherical'):
+            cv = np.asarray(self._covars_)[states]
+            if cv.ndim == 1:
+                cv = cv[:, np.newaxis]
+            return self._means_[states] + rand * np.sqrt(cv)
+        # Full and tied covariances: one square root factor per state,
+        # applied to all the frames drawn from that state at once.
+        samples = self._means_[states].astype(float)
+        for state in np.unique(states):
+            if self._covariance_type == 'tied':
+                cv = self._covars_
+            else:
+                cv = self._covars_[state]
+            s, U = linalg.eigh(cv)
+            U *= np.sqrt(np.clip(s, 0, None))
+            idx = states == state
+            samples[idx] += np.dot(rand[idx], U.T)
+        return samples
+
     def _init(self, obs, params='stmc'):
         super(GaussianHMM, self)._init(obs, params=params)
 
-        if self.memory_safe:
-            concat_obs = np.vstack(cPickle.load(open(obs[0], 'r')))
-        else:
-            concat_obs = np.vstack(obs)
+        frames = self._init_frames(obs)
+        n_features = self._init_n_features(frames)
         if (hasattr(self, 'n_features')
-                and self.n_features != concat_obs.shape[1]):
+                and self.n_features != n_features):
             raise ValueError('Unexpected number of dimensions, got %s but '
-                             'expected %s' % (concat_obs.shape[1],
+                             'expected %s' % (n_features,
                                               self.n_features))
 
-        self.n_features = concat_obs.shape[1]
+        self.n_features = n_features
 
         if 'm' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                concat_obs)
-            self._means_ = np.array([multivariate_normal(
+            centers = self._init_centers(frames)
+            random_state = check_random_state(self.random_state)
+            self._means_ = np.array([random_state.multivariate_normal(
                 mean,
                 np.eye(self.n_features) * self.means_var)
-                for mean in clu.cluster_centers_])
+                for mean in centers])
         if 'c' in params:
-            cv = np.cov(concat_obs.T)
-            if not cv.shape:
-                cv.shape = (1, 1)
+            cv = self._init_covariance(frames)
             self._covars_ = distribute_covar_matrix_to_match_covariance_type(
                 cv, self._covariance_type, self.n_states)
             self._covars_[self._covars_ == 0] = 1e-5
 
+    def _init_n_features(self, frames):
+        return np.shape(next(iter(frames)))[1]
+
+    def _init_covariance(self, frames):
+        return streaming_mean_cov(frames)[1]
+
     def _initialize_sufficient_statistics(self):
         stats = super(GaussianHMM, self)._initialize_sufficient_statistics()
         stats['post'] = np.zeros(self.n_states)+1e-1000
@@ -1055,6 +2323,25 @@ class GaussianHMM(_BaseHMM):
                     for c in range(self.n_states):
                         stats['obs*obs.T'][c] += posteriors[t, c] * obsobsT
 
+    def _accumulate_path_statistics(self, stats, obs, state_sequence,
+                                    params):
+        super(GaussianHMM, self)._accumulate_path_statistics(
+            stats, obs, state_sequence, params)
+
+        if 'm' in params or 'c' in params:
+            stats['post'] += np.bincount(state_sequence,
+                                         minlength=self.n_states)
+            stats['obs'] += sum_per_state(state_sequence, obs, self.n_states)
+
+        if 'c' in params:
+            if self._covariance_type in ('spherical', 'diag'):
+                stats['obs**2'] += sum_per_state(state_sequence, obs ** 2,
+                                                 self.n_states)
+            elif self._covariance_type in ('tied', 'full'):
+                for c in range(self.n_states):
+                    state_obs = obs[state_sequence == c]
+                    stats['obs*obs.T'][c] += np.dot(state_obs.T, state_obs)
+
     def _do_mstep(self, stats, params):
         super(GaussianHMM, self)._do_mstep(stats, params)
 
@@ -1103,6 +2390,50 @@ class GaussianHMM(_BaseHMM):
                     self._covars_ = ((covars_prior + cvnum) /
                                      (cvweight + stats['post'][:, None, None]))
 
+    def _get_em_params(self, params):
+        em_params = super(GaussianHMM, self)._get_em_params(params)
+        if 'm' in params:
+            em_params['means'] = self._means_.copy()
+        # Only the covariances that are vectors of variances are
+        # extrapolated, matrices could lose their positive definiteness.
+        if 'c' in params and self._covariance_type in ('spherical', 'diag'):
+            em_params['covars'] = np.log(self._covars_)
+        return em_params
+
+    def _set_em_params(self, em_params):
+        super(GaussianHMM, self)._set_em_params(em_params)
+        if 'means' in em_params:
+            self._means_ = em_params['means']
+        if 'covars' in em_params:
+            self._covars_ = np.exp(em_params['covars'])
+
+    def _split_emissions(self, state):
+        # The halves move half a standard deviation apart.
+        if self._covariance_type == 'tied':
+            variances = np.diag(self._covars_)
+        elif self._covariance_type == 'full':
+            variances = np.diag(self._covars_[state])
+        else:
+            variances = self._covars_[state]
+        shift = 0.5 * np.sqrt(variances)
+        means = self._means_[state]
+        self._means_ = np.vstack([self._means_, means + shift])
+        self._means_[state] = means - shift
+        if self._covariance_type != 'tied':
+            self._covars_ = np.concatenate([self._covars_,
+                                            self._covars_[[state]]])
+
+    def _get_param_pack(self):
+        pack = super(GaussianHMM, self)._get_param_pack()
+        pack['means'] = self._means_
+        pack['covars'] = self._covars_
+        return pack
+
+    def _set_param_pack(self, pack):
+        super(GaussianHMM, self)._set_param_pack(pack)
+        self._means_ = pack['means']
+        self._covars_ = pack['covars']
+
     def _n_free_parameters(self):
         n_pars = (self.n_states - 1) * (self.n_states + 1)
         n_pars += self.n_states * self.n_features
@@ -1116,7 +2447,7 @@ class GaussianHMM(_BaseHMM):
             n_pars += self.n_states * ((self.n_features + 1) * self.n_features) / 2
         return n_pars
 
-    def fit(self, obs, warm_start=False):
+    def fit(self, obs, warm_start=False, **kwargs):
         """Estimate model parameters.
 
         An initialization step is performed before entering the EM
@@ -1140,7 +2471,7 @@ class GaussianHMM(_BaseHMM):
         more components becomminging too small).  You can fix this by getting
         more training data, or increasing covars_prior.
         """
-        return super(GaussianHMM, self).fit(obs, warm_start)
+        return super(GaussianHMM, self).fit(obs, warm_start, **kwargs)
 
 
 class MultinomialHMM(_BaseHMM):
@@ -1153,6 +2484,7 @@ class MultinomialHMM(_BaseHMM):
 
     n_symbols : int
         Number of possible symbols emitted by the model (in the observations).
+        If not given, it is discovered from the training sequences.
 
     transmat : array, shape (`n_states`, `n_states`)
         Matrix of transition probabilities between states.
@@ -1207,13 +2539,18 @@ class MultinomialHMM(_BaseHMM):
                  emissionprob_prior=None, algorithm="viterbi",
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters, init_params=string.ascii_letters,
-                 verbose=0, n_jobs=1, batch_size=1, memory_safe=False):
+                 verbose=0, n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, n_symbols=None):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
         ----------
         n_states : int
             Number of states.
+
+        n_symbols : int, optional
+            Size of the vocabulary. Declaring it skips the discovery of
+            the symbols, which then need not all occur in the data.
         """
         _BaseHMM.__init__(self, n_states, startprob, transmat,
                           startprob_prior=startprob_prior,
@@ -1227,9 +2564,11 @@ class MultinomialHMM(_BaseHMM):
                           verbose=verbose,
                           n_jobs=n_jobs,
                           batch_size=batch_size,
-                          memory_safe=memory_safe)
+                          memory_safe=memory_safe,
+                          backend=backend)
 
         self.emissionprob_prior = emissionprob_prior
+        self.n_symbols = n_symbols
 
     def _get_emissionprob(self):
         """Emission probability distribution for each state."""
@@ -1237,7 +2576,7 @@ class MultinomialHMM(_BaseHMM):
 
     def _set_emissionprob(self, emissionprob):
         emissionprob = np.asarray(emissionprob)
-        if hasattr(self, 'n_symbols') and \
+        if self.n_symbols is not None and \
                 emissionprob.shape != (self.n_states, self.n_symbols):
             raise ValueError('emissionprob must have shape '
                              '(n_states, n_symbols)')
@@ -1264,20 +2603,19 @@ class MultinomialHMM(_BaseHMM):
         symbol = (cdf > rand).argmax()
         return symbol
 
+    def _generate_samples_from_states(self, states, random_state=None):
+        random_state = check_random_state(random_state)
+        cdf = np.cumsum(self.emissionprob_, 1)[states]
+        rand = random_state.rand(len(states))
+        return (cdf > rand[:, np.newaxis]).argmax(1)
+
     def _init(self, obs, params='ste'):
         super(MultinomialHMM, self)._init(obs, params=params)
         self.random_state = check_random_state(self.random_state)
 
         if 'e' in params:
-            if not hasattr(self, 'n_symbols'):
-                symbols = set()
-                for o in obs:
-                    if self.memory_safe:
-                        symbols = symbols.union(set(np.concatenate(
-                            cPickle.load(open(o, 'r')))))
-                    else:
-                        symbols = symbols.union(set(o))
-                self.n_symbols = len(symbols)
+            if self.n_symbols is None:
+                self.n_symbols = len(self._symbol_summary(obs)['symbols'])
             if self.emissionprob_prior is None:
                 self.emissionprob_prior = np.ones((self.n_states,
                                                    self.n_symbols))
@@ -1301,44 +2639,73 @@ class MultinomialHMM(_BaseHMM):
             for t, symbol in enumerate(obs):
                 stats['obs'][:, symbol] += posteriors[t]
 
+    def _accumulate_path_statistics(self, stats, obs, state_sequence,
+                                    params):
+        super(MultinomialHMM, self)._accumulate_path_statistics(
+            stats, obs, state_sequence, params)
+        if 'e' in params:
+            pairs = state_sequence * self.n_symbols + np.asarray(obs)
+            stats['obs'] += np.bincount(
+                pairs, minlength=self.n_states * self.n_symbols).reshape(
+                    self.n_states, self.n_symbols)
+
     def _do_mstep(self, stats, params):
         super(MultinomialHMM, self)._do_mstep(stats, params)
         if 'e' in params:
             self.emissionprob_ = (stats['obs']
                                   / stats['obs'].sum(1)[:, np.newaxis])
 
+    def _summarize_symbols(self, obs):
+        # The occurring symbols are only needed to discover n_symbols.
+        return symbol_summary(FrameStream(obs, self.memory_safe),
+                              self.n_symbols is None)
+
     def _check_input_symbols(self, obs):
         """check if input can be used for Multinomial.fit input must be both
         positive integer array and every element must be continuous.
-        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not
+        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not.
+        With a declared n_symbols, every element must be below it instead.
         """
+        return check_symbol_summary(self._symbol_summary(obs), self.n_symbols)
 
-        if self.memory_safe:
-            symbols = []
-            for o in obs:
-                symbols += cPickle.load(open(o, 'r'))
-            symbols = np.concatenate(symbols)
-        else:
-            symbols = np.concatenate(obs)
-
-        if symbols.dtype.kind != 'i':
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
+    def _get_em_params(self, params):
+        em_params = super(MultinomialHMM, self)._get_em_params(params)
+        if 'e' in params:
+            em_params['emissionprob'] = self._log_emissionprob.copy()
+        return em_params
+
+    def _set_em_params(self, em_params):
+        super(MultinomialHMM, self)._set_em_params(em_params)
+        if 'emissionprob' in em_params:
+            self._log_emissionprob = log_renormalize(
+                em_params['emissionprob'])
+
+    def _resized(self, n_states):
+        model = super(MultinomialHMM, self)._resized(n_states)
+        if (model.emissionprob_prior is not None
+                and len(model.emissionprob_prior) != n_states):
+            model.emissionprob_prior = None
+        return model
+
+    def _split_emissions(self, state):
+        emissionprob = self.emissionprob_
+        halves = normalize(emissionprob[state] * np.random.uniform(
+            0.9, 1.1, size=(2, self.n_symbols)), 1)
+        emissionprob = np.vstack([emissionprob, halves[1]])
+        emissionprob[state] = halves[0]
+        self._log_emissionprob = np.log(emissionprob)
+        if self.emissionprob_prior is not None:
+            self.emissionprob_prior = np.vstack(
+                [self.emissionprob_prior, self.emissionprob_prior[state]])
 
-        symbols.sort()
-        if np.any(np.diff(symbols) > 1):
-            # input is discontinous
-            return False
+    def _get_param_pack(self):
+        pack = super(MultinomialHMM, self)._get_param_pack()
+        pack['log_emissionprob'] = self._log_emissionprob
+        return pack
 
-        return True
+    def _set_param_pack(self, pack):
+        super(MultinomialHMM, self)._set_param_pack(pack)
+        self._log_emissionprob = pack['log_emissionprob']
 
     def _n_free_parameters(self):
         n_pars = (self.n_states - 1) * (self.n_states + 1)
@@ -1365,8 +2732,12 @@ class MultinomialHMM(_BaseHMM):
                    "in all, every element must be continuous, but %s was "
                    "given.")
 
-        if not self._check_input_symbols(obs):
+        # Validation and symbol discovery share a single pass over obs.
+        summary = self._symbol_summary(obs)
+        if not check_symbol_summary(summary, self.n_symbols):
             raise ValueError(err_msg % obs)
+        if self.n_symbols is None:
+            self.n_symbols = len(summary['symbols'])
 
         return super(MultinomialHMM, self).fit(obs, warm_start, **kwargs)
 
@@ -1415,6 +2786,16 @@ class PoissonHMM(_BaseHMM):
         greater than 1 then it prints progress and performance for every
         iteration.
 
+    init_strategy : string, one of init_strategies, default: "reservoir"
+        How the emissions are initialized from the data. "reservoir"
+        clusters a uniform sample of ``init_sample_size`` frames and
+        "minibatch" runs MiniBatchKMeans over batches of that size, both
+        streaming the sequences without concatenating them. "full"
+        clusters all the frames at once, which holds them all in memory.
+
+    init_sample_size : int, default: 10000
+        Number of frames of the "reservoir" and "minibatch" strategies.
+
     Examples
     --------
     >>> from hmmlearn.hmm import PoissonHMM
@@ -1433,7 +2814,9 @@ class PoissonHMM(_BaseHMM):
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
                  init_params=string.ascii_letters, verbose=0,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, init_strategy="reservoir",
+                 init_sample_size=10000):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -1453,7 +2836,10 @@ class PoissonHMM(_BaseHMM):
                           verbose=verbose,
                           n_jobs=n_jobs,
                           batch_size=batch_size,
-                          memory_safe=memory_safe)
+                          memory_safe=memory_safe,
+                          backend=backend)
+        self.init_strategy = init_strategy
+        self.init_sample_size = init_sample_size
         self.rates_var = rates_var
 
     def _get_rates(self):
@@ -1472,18 +2858,18 @@ class PoissonHMM(_BaseHMM):
     def _generate_sample_from_state(self, state, random_state=None):
         return poisson.rvs(self._rates[state])
 
+    def _generate_samples_from_states(self, states, random_state=None):
+        random_state = check_random_state(random_state)
+        return random_state.poisson(self._rates[states])
+
     def _init(self, obs, params='str'):
         super(PoissonHMM, self)._init(obs, params=params)
 
-        if self.memory_safe:
-            concat_obs = np.concatenate(cPickle.load(open(obs[0], 'r')))
-        else:
-            concat_obs = np.concatenate(obs)
         if 'r' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                np.atleast_2d(concat_obs).T)
-            rates = normal(0, self.rates_var, self.n_states) + \
-                clu.cluster_centers_.T[0]
+            centers = self._init_centers(self._init_frames(obs))
+            random_state = check_random_state(self.random_state)
+            rates = random_state.normal(0, self.rates_var, self.n_states) + \
+                centers.T[0]
             self._rates = np.maximum(0.1, rates)
 
     def _initialize_sufficient_statistics(self):
@@ -1503,12 +2889,26 @@ class PoissonHMM(_BaseHMM):
             stats['post'] += posteriors.sum(axis=0)
             stats['obs'] += np.dot(posteriors.T, obs)
 
+    def _accumulate_path_statistics(self, stats, obs, state_sequence,
+                                    params):
+        super(PoissonHMM, self)._accumulate_path_statistics(
+            stats, obs, state_sequence, params)
+
+        if 'r' in params:
+            stats['post'] += np.bincount(state_sequence,
+                                         minlength=self.n_states)
+            stats['obs'] += sum_per_state(state_sequence, np.ravel(obs),
+                                          self.n_states)
+
     def _do_mstep(self, stats, params):
         super(PoissonHMM, self)._do_mstep(stats, params)
 
         if 'r' in params:
             self._rates = stats['obs'] / stats['post']
 
+    def _summarize_symbols(self, obs):
+        return symbol_summary(FrameStream(obs, self.memory_safe), False)
+
     def _check_input_symbols(self, obs):
         """check if input can be used for PoissonHMM. Input must be a list
         of non-negative integers.
@@ -1545,12 +2945,36 @@ class PoissonHMM(_BaseHMM):
 
         return True
 
+    def _get_em_params(self, params):
+        em_params = super(PoissonHMM, self)._get_em_params(params)
+        if 'r' in params:
+            em_params['rates'] = np.log(self._rates)
+        return em_params
+
+    def _set_em_params(self, em_params):
+        super(PoissonHMM, self)._set_em_params(em_params)
+        if 'rates' in em_params:
+            self._rates = np.exp(em_params['rates'])
+
+    def _split_emissions(self, state):
+        self._rates = np.append(self._rates, self._rates[state] * 1.1)
+        self._rates[state] *= 0.9
+
+    def _get_param_pack(self):
+        pack = super(PoissonHMM, self)._get_param_pack()
+        pack['rates'] = self._rates
+        return pack
+
+    def _set_param_pack(self, pack):
+        super(PoissonHMM, self)._set_param_pack(pack)
+        self._rates = pack['rates']
+
     def _n_free_parameters(self):
         n_pars = (self.n_states - 1) * (self.n_states + 1)
         n_pars += self.n_states
         return n_pars
 
-    def fit(self, obs, warm_start=False):
+    def fit(self, obs, warm_start=False, **kwargs):
         """Estimate model parameters.
 
         An initialization step is performed before entering the EM
@@ -1580,7 +3004,7 @@ class PoissonHMM(_BaseHMM):
         if not self._check_input_symbols(obs):
             raise ValueError(err_msg % obs)
 
-        return super(PoissonHMM, self).fit(obs, warm_start)
+        return super(PoissonHMM, self).fit(obs, warm_start, **kwargs)
 
 
 class ExponentialHMM(_BaseHMM):
@@ -1627,6 +3051,16 @@ class ExponentialHMM(_BaseHMM):
         greater than 1 then it prints progress and performance for every
         iteration.
 
+    init_strategy : string, one of init_strategies, default: "reservoir"
+        How the emissions are initialized from the data. "reservoir"
+        clusters a uniform sample of ``init_sample_size`` frames and
+        "minibatch" runs MiniBatchKMeans over batches of that size, both
+        streaming the sequences without concatenating them. "full"
+        clusters all the frames at once, which holds them all in memory.
+
+    init_sample_size : int, default: 10000
+        Number of frames of the "reservoir" and "minibatch" strategies.
+
     Examples
     --------
     >>> from hmmlearn.hmm import ExponentialHMM
@@ -1645,7 +3079,9 @@ class ExponentialHMM(_BaseHMM):
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
                  init_params=string.ascii_letters, verbose=0,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, init_strategy="reservoir",
+                 init_sample_size=10000):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -1665,7 +3101,10 @@ class ExponentialHMM(_BaseHMM):
                           verbose=verbose,
                           n_jobs=n_jobs,
                           batch_size=batch_size,
-                          memory_safe=memory_safe)
+                          memory_safe=memory_safe,
+                          backend=backend)
+        self.init_strategy = init_strategy
+        self.init_sample_size = init_sample_size
         self.rates_var = rates_var
 
     def _get_rates(self):
@@ -1684,18 +3123,18 @@ class ExponentialHMM(_BaseHMM):
     def _generate_sample_from_state(self, state, random_state=None):
         return expon.rvs(scale=1. / self._rates[state])
 
+    def _generate_samples_from_states(self, states, random_state=None):
+        random_state = check_random_state(random_state)
+        return random_state.exponential(1. / self._rates[states])
+
     def _init(self, obs, params='str'):
         super(ExponentialHMM, self)._init(obs, params=params)
 
-        if self.memory_safe:
-            concat_obs = np.concatenate(cPickle.load(open(obs[0], 'r')))
-        else:
-            concat_obs = np.concatenate(obs)
         if 'r' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                np.atleast_2d(concat_obs).T)
-            rates = normal(0, self.rates_var, self.n_states) + \
-                1. / clu.cluster_centers_.T[0]
+            centers = self._init_centers(self._init_frames(obs))
+            random_state = check_random_state(self.random_state)
+            rates = random_state.normal(0, self.rates_var, self.n_states) + \
+                1. / centers.T[0]
             self._rates = np.maximum(0.1, rates)
 
     def _initialize_sufficient_statistics(self):
@@ -1715,12 +3154,29 @@ class ExponentialHMM(_BaseHMM):
             stats['post'] += posteriors.sum(axis=0)
             stats['obs'] += np.dot(posteriors.T, obs)
 
+    def _accumulate_path_statistics(self, stats, obs, state_sequence,
+                                    params):
+        super(ExponentialHMM, self)._accumulate_path_statistics(
+            stats, obs, state_sequence, params)
+
+        if 'r' in params:
+            stats['post'] += np.bincount(state_sequence,
+                                         minlength=self.n_states)
+            stats['obs'] += sum_per_state(state_sequence, np.ravel(obs),
+                                          self.n_states)
+
     def _do_mstep(self, stats, params):
         super(ExponentialHMM, self)._do_mstep(stats, params)
 
         if 'r' in params:
             self._rates = stats['post'] / stats['obs']
 
+    def _summarize_symbols(self, obs):
+        return reduce(merge_symbol_summaries,
+                      (summarize_values(seq) for seq
+                       in FrameStream(obs, self.memory_safe)),
+                      summarize_symbols([]))
+
     def _check_input_symbols(self, obs):
         """check if input can be used for ExponentialHMM. Input must be a list
         of non-negative reals.
@@ -1758,12 +3214,25 @@ class ExponentialHMM(_BaseHMM):
 
         return True
 
+    def _split_emissions(self, state):
+        self._rates = np.append(self._rates, self._rates[state] * 1.1)
+        self._rates[state] *= 0.9
+
+    def _get_param_pack(self):
+        pack = super(ExponentialHMM, self)._get_param_pack()
+        pack['rates'] = self._rates
+        return pack
+
+    def _set_param_pack(self, pack):
+        super(ExponentialHMM, self)._set_param_pack(pack)
+        self._rates = pack['rates']
+
     def _n_free_parameters(self):
         n_pars = (self.n_states - 1) * (self.n_states + 1)
         n_pars += self.n_states
         return n_pars
 
-    def fit(self, obs, warm_start=False):
+    def fit(self, obs, warm_start=False, **kwargs):
         """Estimate model parameters.
 
         An initialization step is performed before entering the EM
@@ -1793,7 +3262,7 @@ class ExponentialHMM(_BaseHMM):
         if not self._check_input_symbols(obs):
             raise ValueError(err_msg % obs)
 
-        return super(ExponentialHMM, self).fit(obs, warm_start)
+        return super(ExponentialHMM, self).fit(obs, warm_start, **kwargs)
 
 
 class MultinomialExponentialHMM(_BaseHMM):
@@ -1846,6 +3315,16 @@ class MultinomialExponentialHMM(_BaseHMM):
         greater than 1 then it prints progress and performance for every
         iteration.
 
+    init_strategy : string, one of init_strategies, default: "reservoir"
+        How the emissions are initialized from the data. "reservoir"
+        clusters a uniform sample of ``init_sample_size`` frames and
+        "minibatch" runs MiniBatchKMeans over batches of that size, both
+        streaming the sequences without concatenating them. "full"
+        clusters all the frames at once, which holds them all in memory.
+
+    init_sample_size : int, default: 10000
+        Number of frames of the "reservoir" and "minibatch" strategies.
+
     Examples
     --------
     >>> from hmmlearn.hmm import MultinomialHMM
@@ -1863,7 +3342,9 @@ class MultinomialExponentialHMM(_BaseHMM):
                  emissionprob_prior=None, rates_var=1.0, algorithm="viterbi",
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters, init_params=string.ascii_letters,
-                 verbose=0, n_jobs=1, batch_size=1, memory_safe=False):
+                 verbose=0, n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, init_strategy="reservoir",
+                 init_sample_size=10000):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -1883,7 +3364,10 @@ class MultinomialExponentialHMM(_BaseHMM):
                           verbose=verbose,
                           n_jobs=n_jobs,
                           batch_size=batch_size,
-                          memory_safe=memory_safe)
+                          memory_safe=memory_safe,
+                          backend=backend)
+        self.init_strategy = init_strategy
+        self.init_sample_size = init_sample_size
 
         self.emissionprob_prior = emissionprob_prior
         self.rates_var = rates_var
@@ -1933,20 +3417,22 @@ class MultinomialExponentialHMM(_BaseHMM):
         expon_obs = expon.rvs(scale=1. / self._rates[state])
         return symbol, expon_obs
 
+    def _generate_samples_from_states(self, states, random_state=None):
+        random_state = check_random_state(random_state)
+        cdf = np.cumsum(self.emissionprob_, 1)[states]
+        rand = random_state.rand(len(states))
+        symbols = (cdf > rand[:, np.newaxis]).argmax(1)
+        expon_obs = random_state.exponential(1. / self._rates[states])
+        return np.column_stack([symbols, expon_obs])
+
     def _init(self, obs, params='ster'):
         super(MultinomialExponentialHMM, self)._init(obs, params=params)
         self.random_state = check_random_state(self.random_state)
 
         if 'e' in params:
             if not hasattr(self, 'n_symbols'):
-                symbols = set()
-                for o in obs:
-                    if self.memory_safe:
-                        symbols = symbols.union(set(np.concatenate(
-                            cPickle.load(open(o, 'r')))[:, 0]))
-                    else:
-                        symbols = symbols.union(set(o[:, 0]))
-                self.n_symbols = len(symbols)
+                summary = self._symbol_summary(obs)
+                self.n_symbols = len(summary['symbols'])
             if self.emissionprob_prior is None:
                 self.emissionprob_prior = np.ones((self.n_states,
                                                    self.n_symbols))
@@ -1955,15 +3441,11 @@ class MultinomialExponentialHMM(_BaseHMM):
                 for i in range(self.n_states)])
             self.emissionprob_ = emissionprob
 
-        if self.memory_safe:
-            concat_obs = np.concatenate(cPickle.load(open(obs[0], 'r')))[:, 1]
-        else:
-            concat_obs = np.concatenate(obs)[:, 1]
         if 'r' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                np.atleast_2d(concat_obs).T)
-            rates = normal(0, self.rates_var, self.n_states) + \
-                1. / clu.cluster_centers_.T[0]
+            centers = self._init_centers(self._init_frames(obs, column=1))
+            random_state = check_random_state(self.random_state)
+            rates = random_state.normal(0, self.rates_var, self.n_states) + \
+                1. / centers.T[0]
             self._rates = np.maximum(0.1, rates)
 
     def _initialize_sufficient_statistics(self):
@@ -1986,6 +3468,21 @@ class MultinomialExponentialHMM(_BaseHMM):
             stats['post'] += posteriors.sum(axis=0)
             stats['expon_obs'] += np.dot(posteriors.T, obs[:, 1])
 
+    def _accumulate_path_statistics(self, stats, obs, state_sequence,
+                                    params):
+        super(MultinomialExponentialHMM, self)._accumulate_path_statistics(
+            stats, obs, state_sequence, params)
+        if 'e' in params:
+            pairs = state_sequence * self.n_symbols + obs[:, 0].astype(int)
+            stats['obs'] += np.bincount(
+                pairs, minlength=self.n_states * self.n_symbols).reshape(
+                    self.n_states, self.n_symbols)
+        if 'r' in params:
+            stats['post'] += np.bincount(state_sequence,
+                                         minlength=self.n_states)
+            stats['expon_obs'] += sum_per_state(state_sequence, obs[:, 1],
+                                                self.n_states)
+
     def _do_mstep(self, stats, params):
         super(MultinomialExponentialHMM, self)._do_mstep(stats, params)
         if 'e' in params:
@@ -1994,67 +3491,50 @@ class MultinomialExponentialHMM(_BaseHMM):
         if 'r' in params:
             self._rates = stats['post'] / stats['expon_obs']
 
+    def _summarize_symbols(self, obs):
+        return reduce(merge_symbol_summaries,
+                      (summarize_symbol_values(seq) for seq
+                       in FrameStream(obs, self.memory_safe)),
+                      summarize_symbols([]))
+
     def _check_input_symbols(self, obs):
         """check if input can be used for Multinomial.fit input must be both
         positive integer array and every element must be continuous.
-        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not
+        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not.
+        The exponential observations must be non-negative.
         """
-
-        if self.memory_safe:
-            symbols = []
-            for o in obs:
-                symbols += cPickle.load(open(o, 'r'))
-            symbols = np.concatenate(symbols)[:, 0]
-        else:
-            symbols = np.concatenate(obs)[:, 0]
-
-        if symbols.dtype.kind not in ('i', 'f'):
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        symbols.sort()
-        if np.any(np.diff(symbols) > 1):
-            # input is discontinous
-            return False
-
-        if self.memory_safe:
-            for o in obs:
-                symbols = np.concatenate(cPickle.load(open(o, 'r')))[:, 1]
-
-                if symbols.dtype.kind not in ('f', 'i'):
-                    # input symbols must be integer
-                    return False
-
-                if len(symbols) == 1:
-                    # input too short
-                    return False
-
-                if np.any(symbols < 0):
-                    # input contains negative intiger
-                    return False
-        else:
-            symbols = np.concatenate(obs)[:, 1]
-            if symbols.dtype.kind not in ('f', 'i'):
-                # input symbols must be integer
-                return False
-
-            if len(symbols) == 1:
-                # input too short
-                return False
-
-            if np.any(symbols < 0):
-                # input contains negative intiger
-                return False
-
-        return True
+        return check_symbol_summary(self._symbol_summary(obs))
+
+    def _resized(self, n_states):
+        model = super(MultinomialExponentialHMM, self)._resized(n_states)
+        if (model.emissionprob_prior is not None
+                and len(model.emissionprob_prior) != n_states):
+            model.emissionprob_prior = None
+        return model
+
+    def _split_emissions(self, state):
+        emissionprob = self.emissionprob_
+        halves = normalize(emissionprob[state] * np.random.uniform(
+            0.9, 1.1, size=(2, self.n_symbols)), 1)
+        emissionprob = np.vstack([emissionprob, halves[1]])
+        emissionprob[state] = halves[0]
+        self._log_emissionprob = np.log(emissionprob)
+        if self.emissionprob_prior is not None:
+            self.emissionprob_prior = np.vstack(
+                [self.emissionprob_prior, self.emissionprob_prior[state]])
+        self._rates = np.append(self._rates, self._rates[state] * 1.1)
+        self._rates[state] *= 0.9
+
+    def _get_param_pack(self):
+        pack = super(MultinomialExponentialHMM, self)._get_param_pack()
+        pack['log_emissionprob'] = self._log_emissionprob
+        pack['rates'] = self._rates
+        return pack
+
+    def _set_param_pack(self, pack):
+        super(MultinomialExponentialHMM, self)._set_param_pack(pack)
+        self._log_emissionprob = pack['log_emissionprob']
+        self._rates = pack['rates']
 
     def _n_free_parameters(self):
         n_pars = (self.n_states - 1) * (self.n_states + 1)
@@ -2082,12 +3562,15 @@ class MultinomialExponentialHMM(_BaseHMM):
                    "in all, every element must be continuous, but %s was "
                    "given.")
 
-        cleaned_obs = [np.array(seq) for seq in obs]
-
-        if not self._check_input_symbols(cleaned_obs):
+        # Validation and symbol discovery share a single pass over obs.
+        summary = self._symbol_summary(obs)
+        if not check_symbol_summary(summary):
             raise ValueError(err_msg % obs)
+        if not hasattr(self, 'n_symbols'):
+            self.n_symbols = len(summary['symbols'])
 
-        return super(MultinomialExponentialHMM, self).fit(cleaned_obs, warm_start, **kwargs)
+        return super(MultinomialExponentialHMM, self).fit(obs, warm_start,
+                                                          **kwargs)
 
 
 class GMMHMM(_BaseHMM):
@@ -2157,7 +3640,8 @@ class GMMHMM(_BaseHMM):
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
                  verbose=0, means_var=1.0,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None):
         """Create a hidden Markov model with GMM emissions.
 
         Parameters
@@ -2177,7 +3661,8 @@ class GMMHMM(_BaseHMM):
                           verbose=verbose,
                           n_jobs=n_jobs,
                           batch_size=batch_size,
-                          memory_safe=memory_safe)
+                          memory_safe=memory_safe,
+                          backend=backend)
 
         # XXX: Hotfit for n_mix that is incompatible with the scikit's
         # BaseEstimator API
@@ -2214,21 +3699,24 @@ class GMMHMM(_BaseHMM):
     def _init(self, obs, params='stwmc'):
         super(GMMHMM, self)._init(obs, params=params)
 
-        if self.memory_safe:
-            concat_obs = np.concatenate(cPickle.load(open(obs[0], 'r')), 0)
-        else:
-            concat_obs = np.concatenate(obs, 0)
+        concat_obs = self._init_gmm_frames(obs)
         n_features = concat_obs.shape[1]
+        random_state = check_random_state(self.random_state)
 
         for g in self.gmms_:
             g.set_params(init_params=params, n_iter=0)
             g.fit(concat_obs)
-            means = np.array([multivariate_normal(
+            means = np.array([random_state.multivariate_normal(
                 mean,
                 np.eye(n_features) * self.means_var)
                 for mean in g.means_])
             g.means_ = means
 
+    def _init_gmm_frames(self, obs):
+        """Frames the GMMs are initialized from, all of them, from all
+        the files when ``memory_safe``."""
+        return np.concatenate(list(FrameStream(obs, self.memory_safe)), 0)
+
     def _initialize_sufficient_statistics(self):
         stats = super(GMMHMM, self)._initialize_sufficient_statistics()
         stats['norm'] = [np.zeros(g.weights_.shape) for g in self.gmms_]
@@ -2242,7 +3730,16 @@ class GMMHMM(_BaseHMM):
         super(GMMHMM, self)._accumulate_sufficient_statistics(
             stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice,
             params)
+        self._accumulate_mixture_statistics(stats, obs, posteriors, params)
+
+    def _accumulate_path_statistics(self, stats, obs, state_sequence,
+                                    params):
+        super(GMMHMM, self)._accumulate_path_statistics(
+            stats, obs, state_sequence, params)
+        posteriors = np.eye(self.n_states)[state_sequence]
+        self._accumulate_mixture_statistics(stats, obs, posteriors, params)
 
+    def _accumulate_mixture_statistics(self, stats, obs, posteriors, params):
         for state, g in enumerate(self.gmms_):
             _, tmp_gmm_posteriors = g.score_samples(obs)
             lgmm_posteriors = np.log(tmp_gmm_posteriors
@@ -2304,6 +3801,18 @@ class GMMHMM(_BaseHMM):
                                      + self.covars_prior * eye[np.newaxis])
                                      / cvnorm)
 
+    def _get_param_pack(self):
+        pack = super(GMMHMM, self)._get_param_pack()
+        pack['gmms'] = [(g.weights_, g.means_, g.covars_) for g in self.gmms_]
+        return pack
+
+    def _set_param_pack(self, pack):
+        super(GMMHMM, self)._set_param_pack(pack)
+        for g, (weights, means, covars) in zip(self.gmms_, pack['gmms']):
+            g.weights_ = weights
+            g.means_ = means
+            g.covars_ = covars
+
     def _n_free_parameters(self):
         n_pars = (self.n_states - 1) * (self.n_states + 1)
         for g in self.gmms_:
@@ -2320,3 +3829,91 @@ class GMMHMM(_BaseHMM):
             elif g.covariance_type == 'full':
                 n_pars += n_components * ((n_features + 1) * n_features) / 2
         return n_pars
+
+
+def select_n_states(estimator, obs, candidates, criterion="bic",
+                    split_states=False):
+    """Choose the number of states of an HMM with an information criterion.
+
+    A copy of ``estimator`` is fitted for each number of states. Their log
+    probability is taken from the last E-step of their fit when it
+    converged, the data is only scored again otherwise.
+
+    Parameters
+    ----------
+    estimator : _BaseHMM
+        Unfitted model whose settings the candidates share.
+
+    obs : list
+        List of array-like observation sequences.
+
+    candidates : list of int
+        Numbers of states to try.
+
+    criterion : string, one of "aic" or "bic"
+        Criterion to minimize.
+
+    split_states : bool, optional
+        Fit the candidates in increasing order, each one warm-started by
+        splitting the states of the previous one, instead of fitting them
+        independently and concurrently on the estimator's backend.
+
+    Returns
+    -------
+    best : _BaseHMM
+        Fitted candidate of lowest criterion.
+
+    scores : array, shape (len(candidates),)
+        Criterion of each candidate, in the order of ``candidates``.
+    """
+    if criterion not in ("aic", "bic"):
+        raise ValueError("criterion must be 'aic' or 'bic', got %r"
+                         % (criterion,))
+    candidates = list(candidates)
+    if split_states:
+        fitted = {}
+        model = None
+        for n_states in sorted(set(candidates)):
+            if model is None:
+                model, logprob = estimator._resized(n_states)._fit_candidate(
+                    obs)
+                with model._executor_scope() as executor:
+                    n_sequences = executor.aggregate_batches(
+                        unwrap_self_count_sequences, model, obs,
+                        model.batch_size, 0, operator.add)
+            else:
+                model = model._split_states(
+                    n_states, float(model.n_data_) / n_sequences)
+                model, logprob = model._fit_candidate(obs, warm_start=True)
+            fitted[n_states] = model, logprob
+        results = [fitted[n_states] for n_states in candidates]
+    else:
+        # The candidates fit serially inside the tasks of the executor.
+        # Data held by the backend stays there: the candidates then take
+        # turns, each running on the backend.
+        with estimator._executor_scope() as backend:
+            distributed = backend.is_distributed(obs)
+        models = []
+        for n_states in candidates:
+            model = estimator._resized(n_states)
+            if not distributed:
+                model.backend = "serial"
+                model.n_jobs = 1
+            models.append(model)
+        scope = executor_scope("serial") if distributed \
+            else estimator._executor_scope()
+        with scope as executor:
+            results = executor.map(unwrap_self_fit_candidate,
+                                   ((model, obs) for model in models))
+        for model, _ in results:
+            model.backend = estimator.backend
+            model.n_jobs = estimator.n_jobs
+
+    # Every candidate counted the frames of obs in its last E-step.
+    n_data = results[0][0].n_data_
+    if criterion == "bic":
+        scores = np.array([model._bic(logprob, n_data)
+                           for model, logprob in results])
+    else:
+        scores = np.array([model._aic(logprob) for model, logprob in results])
+    return results[int(np.argmin(scores))][0], scores
@@ -1,4 +1,4 @@
-# Hidden Markov Models
+# Hidden Markov Models on Spark
 #
 # Author: Ron Weiss <ronweiss@gmail.com>
 # and Shiqiao Du <lucidfrontier.45@gmail.com>
@@ -6,851 +6,749 @@
 # Modifications to create of the HMMLearn module: Gael Varoquaux
 
 """
-The :mod:`hmmlearn.hmm` module implements hidden Markov models.
+The :mod:`hmmlearn.hmmspark` module fits the hidden Markov models of
+:mod:`hmmlearn.hmm` on sequences held in a Spark RDD.
+
+The estimators here are the ones of :mod:`hmmlearn.hmm`, run on a
+:class:`hmmlearn.executors.SparkExecutor`. This module adds the
+``(sc, data)`` entry points, the initialization of the emissions from
+distributed data and the helpers that lay the sequences out.
 """
 
+import copy
+import heapq
+import pickle
 import string
+from contextlib import contextmanager
 
 import numpy as np
-from numpy.random import multivariate_normal, normal
 
 from sklearn.utils import check_random_state
-from sklearn.utils.extmath import logsumexp
-from sklearn.base import BaseEstimator
-from sklearn.mixture import (
-    GMM, sample_gaussian,
-    distribute_covar_matrix_to_match_covariance_type, _validate_covars)
-from sklearn import cluster
-from scipy.stats import (poisson, expon)
-from copy import deepcopy
-
-from .utils.fixes import (log_multivariate_normal_density,
-                          log_poisson_pmf, log_exponential_density)
 
-from . import _hmmc
+from . import hmm
+from .hmm import (PackedSequences, PACKED_BLOCK_FRAMES, batch_keys,
+                  decoder_algorithms, chunk_moments, merge_moments)
+from .executors import SparkExecutor
 
 __all__ = ['GMMHMM',
            'GaussianHMM',
            'MultinomialHMM',
-           'decoder_algorithms',
-           'normalize']
-
-ZEROLOGPROB = -1e200
-EPS = np.finfo(float).eps
-NEGINF = -np.inf
-decoder_algorithms = ("viterbi", "map")
+           'PoissonHMM',
+           'ExponentialHMM',
+           'MultinomialExponentialHMM',
+           'PackedSequences',
+           'pack_sequences',
+           'pack_dataframe',
+           'balance_partitions',
+           'kmeans_parallel',
+           'frame_moments',
+           'select_n_states',
+           'sequences']
 
 
 def identity(x):
     return x
 
 
-def _do_estep(seq, modelBroadcast):
-    model = modelBroadcast.value
-    stats = model._initialize_sufficient_statistics()
-    framelogprob = model._compute_log_likelihood(seq)
-    lpr, fwdlattice = model._do_forward_pass(framelogprob)
-    bwdlattice = model._do_backward_pass(framelogprob)
-    gamma = fwdlattice + bwdlattice
-    posteriors = np.exp(gamma.T - logsumexp(gamma, axis=1)).T
-    model._accumulate_sufficient_statistics(stats,
-                                            seq,
-                                            framelogprob,
-                                            posteriors,
-                                            fwdlattice,
-                                            bwdlattice,
-                                            model.params)
-    return stats, lpr
-
-
-def _score(seq, modelBroadcast):
-    model = modelBroadcast.value
-    seq = np.asarray(seq)
-    framelogprob = model._compute_log_likelihood(seq)
-    lpr, _ = model._do_forward_pass(framelogprob)
-    return lpr
-
-
-def merge_sum(x, y):
-    D = {}
-    for k in x.keys():
-        if isinstance(x[k], list):
-            z = []
-            for i in xrange(len(x[k])):
-                z.append(x[k][i] + y[k][i])
-            D[k] = z
-        else:
-            D[k] = x[k] + y[k]
-    return D
+
+def unpack_sequences(item):
+    """Return the sequences of an RDD element, packed or not."""
+    if isinstance(item, PackedSequences):
+        return item
+    return [item]
 
 
-def log_normalize(A, axis=None):
-    arr = np.rollaxis(A, axis)
-    vmax = arr.max(axis=axis)
-    return normalize(np.exp((arr.T - vmax).T))
+def sequences(data):
+    """RDD of the sequences of ``data``, unpacking any PackedSequences."""
+    return data.flatMap(unpack_sequences)
 
 
-def normalize(A, axis=None):
-    """ Normalize the input array so that it sums to 1.
 
-    WARNING: The HMM module and its functions will be removed in 0.17
-    as it no longer falls within the project's scope and API.
+def pack_sequences(data, dtype=None, keyed=False):
+    """Pack each partition of an RDD of sequences into a PackedSequences.
 
     Parameters
     ----------
-    A: array, shape (n_samples, n_features)
-       Non-normalized input data
-    axis: int
-          dimension along which normalization is performed
+    data : RDD of array_like, or of (key, array_like) pairs if ``keyed``
+        Observation sequences.
+
+    dtype : data-type, optional
+        Type of the packed frames.
 
     Returns
     -------
-    normalized_A: array, shape (n_samples, n_features)
-        A with values normalized (summing to 1) along the prescribed axis
-
-    WARNING: Modifies inplace the array
+    packed : RDD of PackedSequences
+        One element per non-empty partition of ``data``.
     """
-    A += EPS
-    Asum = A.sum(axis)
-    if axis and A.ndim > 1:
-        # Make sure we don't divide by zero.
-        Asum[Asum == 0] = 1
-        shape = list(A.shape)
-        shape[axis] = 1
-        Asum.shape = shape
-    return A / Asum
-
+    def pack_partition(items):
+        items = list(items)
+        if not items:
+            return
+        if keyed:
+            ids = [key for key, _ in items]
+            items = [seq for _, seq in items]
+        else:
+            ids = None
+        yield PackedSequences.from_sequences(items, ids, dtype)
 
-def randomize(A, axis=None):
-    randomizer = np.random.rand(*A.shape) / 10.
-    Arand = A + randomizer
-    return normalize(Arand, axis)
+    return data.mapPartitions(pack_partition, preservesPartitioning=True)
 
 
-class VerboseReporter(object):
-    """Reports verbose output to stdout.
+def _pack_frames(frame_ids, columns, dtype):
+    """Pack frames sorted by sequence, given the sequence of each frame
+    and one array per feature."""
+    frames = np.column_stack(columns).astype(dtype)
+    frame_ids = np.asarray(frame_ids)
+    starts = np.flatnonzero(frame_ids[1:] != frame_ids[:-1]) + 1
+    offsets = np.concatenate([[0], starts, [len(frame_ids)]])
+    return PackedSequences(frames, offsets, frame_ids[offsets[:-1]].tolist())
 
-    If ``verbose==1`` output is printed once in a while (when iteration mod
-    verbose_mod is zero).; if larger than 1 then output is printed for
-    each update.
-    """
 
-    def __init__(self, verbose):
-        self.verbose = verbose
-        self.verbose_fmt = '{iter:>10d} {lpr:>16.4f} {improvement:>16.4f}'
-        self.verbose_mod = 1
+def _pack_blocks(frame_ids, columns, dtype, block_frames):
+    """Pack frames sorted by sequence into blocks of whole sequences."""
+    packed = _pack_frames(frame_ids, columns, dtype)
+    for start, stop in packed.blocks(block_frames):
+        yield packed.block(start, stop)
 
-    def init(self):
-        header_fields = ['Iter', 'Log Likelihood', 'Log Improvement']
-        print(('%10s ' + '%16s ' *
-               (len(header_fields) - 1)) % tuple(header_fields))
 
-    def update(self, i, lpr, improvement):
-        """Update reporter with new iteration. """
-        # we need to take into account if we fit additional estimators.
-        if (i + 1) % self.verbose_mod == 0:
-            print(self.verbose_fmt.format(iter=i + 1,
-                                          lpr=lpr,
-                                          improvement=improvement))
-            if self.verbose == 1 and ((i + 1) // (self.verbose_mod * 10) > 0):
-                # adjust verbose frequency (powers of 10)
-                self.verbose_mod *= 10
+def pack_dataframe(df, feature_cols, sequence_col="sequence_id",
+                   frame_col="frame_index", dtype=float, n_partitions=None,
+                   block_frames=PACKED_BLOCK_FRAMES):
+    """Pack a DataFrame with one row per frame into PackedSequences.
 
+    The rows are clustered by sequence and sorted by frame index, so that
+    every sequence lands whole in one partition. On Spark 3.3 and later
+    the partitions are converted through Arrow (``mapInArrow``), without
+    building a Row object per frame.
 
-class _BaseHMM(BaseEstimator):
-    """Hidden Markov Model base class.
+    Parameters
+    ----------
+    df : DataFrame
+        Frames, with a sequence id, a frame index and feature columns.
 
-    Representation of a hidden Markov model probability distribution.
-    This class allows for easy evaluation of, sampling from, and
-    maximum-likelihood estimation of the parameters of a HMM.
+    feature_cols : list of strings
+        Feature columns. The frames are 2-D, of shape
+        (n_frames, len(feature_cols)), even with a single column. The
+        models of 1-D symbols or counts take ``pack_sequences`` of 1-D
+        arrays instead.
 
-    See the instance documentation for details specific to a
-    particular object.
+    dtype : data-type
+        Type of the packed frames.
 
-    Attributes
-    ----------
-    n_states : int
-        Number of states in the model.
+    n_partitions : int, optional
+        Number of partitions of the result, ``spark.sql.shuffle.partitions``
+        by default.
 
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
+    block_frames : int
+        Most frames of one packed element. Sequences are never split, a
+        longer sequence is an element of its own.
 
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
+    Returns
+    -------
+    packed : RDD of PackedSequences
+        Blocks of consecutive sequences, keyed by the sequence ids. Each
+        block is one row of the Arrow output, whose binary cells are
+        limited to 2GB, and is the unit the E-step computes emissions on.
+        The RDD is cached by ``fit``, so that the packed form is reused
+        across the iterations.
+    """
+    feature_cols = list(feature_cols)
+    df = df.select(sequence_col, frame_col, *feature_cols)
+    if n_partitions is None:
+        df = df.repartition(sequence_col)
+    else:
+        df = df.repartition(n_partitions, sequence_col)
+    df = df.sortWithinPartitions(sequence_col, frame_col)
+
+    if not hasattr(df, "mapInArrow"):
+        def pack_rows(rows):
+            rows = list(rows)
+            if rows:
+                for block in _pack_blocks(
+                        [row[sequence_col] for row in rows],
+                        [[row[col] for row in rows] for col in feature_cols],
+                        dtype, block_frames):
+                    yield block
+
+        return df.rdd.mapPartitions(pack_rows)
+
+    import pyarrow as pa
+    from pyspark.sql.types import StructType, StructField, BinaryType
+
+    def pack_batches(batches):
+        batches = list(batches)
+        if not batches:
+            return
+        table = pa.Table.from_batches(batches)
+        if table.num_rows == 0:
+            return
+        for block in _pack_blocks(table.column(sequence_col).to_numpy(),
+                                  [table.column(col).to_numpy()
+                                   for col in feature_cols],
+                                  dtype, block_frames):
+            yield pa.RecordBatch.from_pydict(
+                {"packed": [pickle.dumps(block, pickle.HIGHEST_PROTOCOL)]})
+
+    schema = StructType([StructField("packed", BinaryType())])
+    return df.mapInArrow(pack_batches, schema).rdd.map(
+        lambda row: pickle.loads(row.packed))
+
+
+def _split_sequence(seq, max_frames):
+    """Split a sequence into chunks of at most max_frames frames."""
+    n_chunks = -(-len(seq) // max_frames)
+    if n_chunks <= 1:
+        return [seq]
+    return np.array_split(np.asarray(seq), n_chunks)
+
+
+def _partition_quotas(loads, n_partitions):
+    """Split the frames of each source partition among the partitions of
+    the result, so that each of these receives an equal share.
+
+    The source partitions are laid end to end and cut into n_partitions
+    equal intervals; a source partition owes each interval it overlaps
+    the length of the overlap.
+    """
+    bounds = np.concatenate([[0.], np.cumsum(loads, dtype=float)])
+    cuts = np.linspace(0., bounds[-1], n_partitions + 1)
+    quotas = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        first = min(np.searchsorted(cuts, start, side='right') - 1,
+                    n_partitions - 1)
+        quota = []
+        for p in range(first, n_partitions):
+            overlap = min(stop, cuts[p + 1]) - max(start, cuts[p])
+            if overlap <= 0 and quota:
+                break
+            quota.append((p, max(overlap, 0.)))
+        quotas.append(quota)
+    return quotas
+
+
+def _fill_quotas(seqs, quota):
+    """Assign sequences, longest first, each to the partition with the
+    largest remaining quota."""
+    heap = [(-share, p) for p, share in quota]
+    heapq.heapify(heap)
+    for seq in sorted(seqs, key=len, reverse=True):
+        remaining, p = heapq.heappop(heap)
+        yield p, seq
+        heapq.heappush(heap, (remaining + len(seq), p))
+
+
+def balance_partitions(data, n_partitions, max_frames=None):
+    """Repartition sequences into partitions of balanced cost.
+
+    The cost of a sequence is its number of frames, to which that of its
+    forward-backward recursions is proportional. Only the frame count of
+    each partition is collected to the driver, which gives each source
+    partition a quota of frames to send to each partition of the result.
+    The partitions then deal out their sequences, longest first, to the
+    destination with the largest remaining quota, so that no EM
+    iteration waits on one task holding all the long sequences. A
+    partition of the result exceeds its share by at most the longest
+    sequence of the few source partitions that feed it.
 
-    transmat_prior : array, shape (`n_states`, `n_states`)
-        Matrix of prior transition probabilities between states.
+    Parameters
+    ----------
+    data : RDD of array_like or of PackedSequences
+        Observation sequences.
 
-    startprob_prior : array, shape ('n_states`,)
-        Initial state occupation prior distribution.
+    n_partitions : int
+        Number of partitions of the result.
 
-    algorithm : string, one of the decoder_algorithms
-        decoder algorithm
+    max_frames : int, optional
+        Sequences longer than this are split into chunks of at most
+        ``max_frames`` frames. EM then treats the chunks as independent
+        sequences: the transitions across the cuts are dropped and each
+        chunk starts from ``startprob``. The bias is small when the chunks
+        are much longer than the mixing time of the chain, so this is off
+        by default.
 
-    random_state: RandomState or an int seed (0 by default)
-        A random number generator instance
+    Returns
+    -------
+    balanced : RDD of array_like
+        The sequences, persisted in their balanced layout so that it is
+        reused across the iterations. Pack it with ``pack_sequences`` for
+        the packed input path.
+    """
+    seqs = sequences(data)
+    if max_frames is not None:
+        seqs = seqs.flatMap(lambda seq: _split_sequence(seq, max_frames))
+    # Read twice, for the loads and for the shuffle.
+    seqs = seqs.persist()
+    loads = seqs.mapPartitions(
+        lambda part: [sum(len(seq) for seq in part)]).collect()
+    quotas = _partition_quotas(loads, n_partitions)
+
+    def assign_partition(index, part):
+        return _fill_quotas(part, quotas[index])
+
+    balanced = seqs.mapPartitionsWithIndex(assign_partition).partitionBy(
+        n_partitions, identity).values().persist()
+    balanced.count()
+    seqs.unpersist()
+    return balanced
+
+
+def _frames(seq):
+    """Return the observations of a sequence as a 2-D float array."""
+    seq = np.asarray(seq, dtype=float)
+    if seq.ndim == 1:
+        seq = seq[:, np.newaxis]
+    return seq
+
+
+def _squared_distances(X, centers):
+    """Squared euclidean distance of each row of X to each center."""
+    dist = (np.sum(X ** 2, axis=1)[:, np.newaxis]
+            - 2 * np.dot(X, centers.T)
+            + np.sum(centers ** 2, axis=1)[np.newaxis, :])
+    return np.maximum(dist, 0)
+
+
+def frame_moments(data):
+    """Count, mean and covariance of the frames of an RDD of sequences.
+
+    All three are computed in a single aggregate pass, the moments of
+    the sequences being merged with `hmm.merge_moments`.
+    """
+    n_frames, mean, scatter = data.aggregate(
+        (0, 0., 0.), lambda acc, seq: merge_moments(acc, chunk_moments(seq)),
+        merge_moments)
+    if not n_frames:
+        raise ValueError("Cannot compute moments of no frames")
+    return n_frames, mean, scatter / max(n_frames - 1, 1)
+
+
+def _weighted_kmeans_plusplus(X, weights, n_clusters, random_state):
+    """Pick n_clusters rows of X with weighted k-means++ seeding."""
+    centers = [X[random_state.choice(len(X), p=weights / weights.sum())]]
+    for _ in range(1, n_clusters):
+        dist = _squared_distances(X, np.array(centers)).min(axis=1) * weights
+        if dist.sum() > 0:
+            centers.append(X[random_state.choice(len(X),
+                                                 p=dist / dist.sum())])
+        else:
+            centers.append(X[random_state.randint(len(X))])
+    return np.array(centers)
 
-    n_iter : int, optional
-        Number of iterations to perform.
 
-    thresh : float, optional
-        Convergence threshold.
+def _first_center(data, seed):
+    """Draw a frame uniformly from an RDD of sequences, in one pass.
 
-    params : string, optional
-        Controls which parameters are updated in the training
-        process.  Can contain any combination of 's' for startprob,
-        't' for transmat, and other characters for subclass-specific
-        emmission parameters. Defaults to all parameters.
+    Each partition draws one of its frames and counts them, the driver
+    then picks a partition in proportion to its count.
+    """
+    def draw_partition(index, seqs):
+        prng = np.random.RandomState([seed, index])
+        n_frames, frame = 0, None
+        for seq in seqs:
+            X = _frames(seq)
+            n_frames += len(X)
+            if len(X) and prng.rand() < float(len(X)) / n_frames:
+                frame = X[prng.randint(len(X))]
+        yield n_frames, frame
+
+    draws = [draw for draw in data.mapPartitionsWithIndex(
+        draw_partition).collect() if draw[0]]
+    if not draws:
+        raise ValueError("Cannot initialize the centers from no frames")
+    counts = np.array([n_frames for n_frames, _ in draws], dtype=float)
+    random_state = np.random.RandomState(seed)
+    return draws[random_state.choice(len(draws), p=counts / counts.sum())][1]
+
+
+def kmeans_parallel(data, n_clusters, seed=0, sample_budget=10000,
+                    n_rounds=5, n_iter=5):
+    """Cluster the frames of an RDD of sequences with k-means||.
+
+    Candidate centers are oversampled over ``n_rounds`` passes, in
+    proportion to their squared distance to the current candidates
+    (Bahmani et al., "Scalable K-Means++"). The candidates, weighted by
+    the number of frames closest to them, are reduced to ``n_clusters``
+    centers with k-means++ on the driver. The centers are then refined
+    with at most ``n_iter`` distributed Lloyd iterations.
+
+    Each round draws its candidates and computes, for the next round,
+    the cost of the candidates it started from in the same pass. Its
+    draws are then normalized by the cost of the previous round, which
+    bounds the current one from above, so that slightly fewer candidates
+    are drawn than with an exact cost.
 
+    Parameters
+    ----------
+    data : RDD of array_like
+        Observation sequences, each of shape (n, n_features) or (n,).
+        It should be cached, it is read ``n_rounds + n_iter + 3`` times
+        at most.
 
-    init_params : string, optional
-        Controls which parameters are initialized prior to
-        training.  Can contain any combination of 's' for
-        startprob, 't' for transmat, and other characters for
-        subclass-specific emmission parameters. Defaults to all
-        parameters.
+    n_clusters : int
+        Number of centers.
 
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
+    seed : int
+        Seed of all the random draws, the result is deterministic for a
+        given seed and partitioning of ``data``.
 
+    sample_budget : int
+        Expected number of candidate frames collected to the driver.
 
-    See Also
-    --------
-    GMM : Gaussian mixture model
+    Returns
+    -------
+    centers : array, shape (n_clusters, n_features)
     """
+    random_state = np.random.RandomState(seed)
+    centers = _first_center(data, seed)[np.newaxis]
+    oversampling = max(float(sample_budget) / n_rounds, 1.)
+    cost = data.map(lambda seq, centers=centers: _squared_distances(
+        _frames(seq), centers).min(axis=1).sum()).sum()
+
+    for r in range(n_rounds):
+        if cost == 0:
+            break
+
+        def sample_partition(index, seqs, centers=centers, cost=cost, r=r):
+            prng = np.random.RandomState([seed, r, index])
+            partition_cost, candidates = 0., []
+            for seq in seqs:
+                X = _frames(seq)
+                dist = _squared_distances(X, centers).min(axis=1)
+                partition_cost += dist.sum()
+                keep = prng.rand(len(X)) < oversampling * dist / cost
+                if keep.any():
+                    candidates.append(X[keep])
+            yield partition_cost, candidates
+
+        results = data.mapPartitionsWithIndex(sample_partition).collect()
+        cost = sum(partition_cost for partition_cost, _ in results)
+        candidates = [X for _, partition in results for X in partition]
+        if candidates:
+            centers = np.vstack([centers] + candidates)
+    if len(centers) > sample_budget:
+        centers = centers[random_state.choice(len(centers), sample_budget,
+                                              replace=False)]
+
+    weights = data.map(lambda seq, centers=centers: np.bincount(
+        _squared_distances(_frames(seq), centers).argmin(axis=1),
+        minlength=len(centers))).reduce(lambda a, b: a + b)
+    centers = _weighted_kmeans_plusplus(centers, weights.astype(float),
+                                        n_clusters, random_state)
+
+    for _ in range(n_iter):
+        def add_sequence(acc, seq, centers=centers):
+            X = _frames(seq)
+            labels = _squared_distances(X, centers).argmin(axis=1)
+            sums, counts = acc
+            np.add.at(sums, labels, X)
+            counts += np.bincount(labels, minlength=n_clusters)
+            return sums, counts
+
+        sums, counts = data.aggregate(
+            (np.zeros(centers.shape), np.zeros(n_clusters)), add_sequence,
+            lambda x, y: (x[0] + y[0], x[1] + y[1]))
+        nonempty = counts > 0
+        previous = centers.copy()
+        centers[nonempty] = sums[nonempty] / counts[nonempty, np.newaxis]
+        if np.allclose(centers, previous):
+            # The assignment no longer changes.
+            break
+    return centers
+
+
+def select_n_states(sc, estimator, data, candidates, criterion="bic",
+                    split_states=False):
+    """Choose the number of states of an HMM on an RDD of sequences.
+
+    See :func:`hmmlearn.hmm.select_n_states`. The candidates take turns,
+    each fitting on the whole RDD, which is cached.
 
-    # This class implements the public interface to all HMMs that
-    # derive from it, including all of the machinery for the
-    # forward-backward and Viterbi algorithms.  Subclasses need only
-    # implement _generate_sample_from_state(), _compute_log_likelihood(),
-    # _init(), _initialize_sufficient_statistics(),
-    # _accumulate_sufficient_statistics(), and _do_mstep(), all of
-    # which depend on the specific emission distribution.
-    #
-    # Subclasses will probably also want to implement properties for
-    # the emission distribution parameters to expose them publicly.
+    Parameters
+    ----------
+    sc : SparkContext
+        Context the jobs are submitted to.
 
-    def __init__(self, n_states=1, startprob=None, transmat=None,
-                 startprob_prior=None, transmat_prior=None,
-                 algorithm="viterbi", random_state=None,
-                 n_iter=10, thresh=1e-2, params=string.ascii_letters,
-                 init_params=string.ascii_letters, verbose=0):
-
-        self.n_states = n_states
-        self.n_iter = n_iter
-        self.thresh = thresh
-        self.params = params
-        self.init_params = init_params
-        self.startprob_ = startprob
-        if startprob_prior is None:
-            startprob_prior = np.ones(n_states)
-        self.startprob_prior = startprob_prior
-        self.transmat_ = transmat
-        if transmat_prior is None:
-            transmat_prior = np.ones((n_states,
-                                      n_states))
-        self.transmat_prior = transmat_prior
-        self._algorithm = algorithm
-        self.random_state = random_state
-        self.verbose = verbose
-
-    def eval(self, X):
-        return self.score_samples(X)
-
-    def score_samples(self, obs):
-        """Compute the log probability under the model and compute posteriors.
+    estimator : _SparkHMMMixin
+        Unfitted model of this module whose settings the candidates share.
 
-        Parameters
-        ----------
-        obs : array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points. Each row
-            corresponds to a single point in the sequence.
+    data : RDD of array_like or of PackedSequences
+        Observation sequences.
 
-        Returns
-        -------
-        logprob : float
-            Log likelihood of the sequence ``obs``.
+    Returns
+    -------
+    best : _SparkHMMMixin
+        Fitted candidate of lowest criterion.
 
-        posteriors : list of array_like, shape (n, n_states)
-            Posterior probabilities of each state for each
-            observation
+    scores : array, shape (len(candidates),)
+        Criterion of each candidate, in the order of ``candidates``.
+    """
+    data.cache()
+    with estimator._spark_backend(sc):
+        best, scores = hmm.select_n_states(estimator, data, candidates,
+                                           criterion, split_states)
+    best.backend = estimator.backend
+    return best, scores
 
-        See Also
-        --------
-        score : Compute the log probability under the model
-        decode : Find most likely state sequence corresponding to a `obs`
-        """
-        logprob = 0
-        posteriors = []
-        for seq in obs:
-            seq = np.asarray(seq)
-            framelogprob = self._compute_log_likelihood(seq)
-            lpr, fwdlattice = self._do_forward_pass(framelogprob)
-            bwdlattice = self._do_backward_pass(framelogprob)
-            gamma = fwdlattice + bwdlattice
-            # gamma is guaranteed to be correctly normalized by logprob at
-            # all frames, unless we do approximate inference using pruning.
-            # So, we will normalize each frame explicitly in case we
-            # pruned too aggressively.
-            posteriors.append(np.exp(gamma.T - logsumexp(gamma, axis=1)).T)
-            posteriors[-1] += np.finfo(np.float32).eps
-            posteriors[-1] /= np.sum(posteriors, axis=1).reshape((-1, 1))
-            logprob += lpr
-        return logprob, posteriors
 
-    def score(self, sc, data):
-        """Compute the log probability under the model.
+def _init_seed(random_state):
+    """Draw a seed for the distributed initialization."""
+    return check_random_state(random_state).randint(np.iinfo(np.int32).max)
 
-        Parameters
-        ----------
-        obs : list of array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points.  Each row
-            corresponds to a single data point.
 
-        Returns
-        -------
-        logprob : float
-            Log likelihood of the ``obs``.
 
-        See Also
-        --------
-        score_samples : Compute the log probability under the model and
-            posteriors
+class _SparkMixin(object):
+    """Entry points of the estimators taking an RDD of sequences.
 
-        decode : Find most likely state sequence corresponding to a `obs`
-        """
-        modelBroadcast = sc.broadcast(self)
-        logprob = data.map(lambda seq: _score(seq, modelBroadcast)).reduce(lambda a, b: a + b)
-        return logprob
+    The RDD is handed to the methods of the local estimator with a
+    SparkExecutor as backend, which runs their batches as the partitions
+    of the RDD.
+    """
 
-    def aic(self, sc, obs):
-        """Computes the Aikaike Information Criterion of the model and
-        set of observations.
+    @contextmanager
+    def _spark_backend(self, sc):
+        backend = self.backend
+        self.backend = SparkExecutor(
+            sc, aggregation_depth=self.aggregation_depth)
+        try:
+            yield self.backend
+        finally:
+            self.backend = backend
+
+    def fit(self, sc, data, warm_start=False, **kwargs):
+        """Estimate model parameters.
 
         Parameters
         ----------
-        obs : list of arrays
-            List of observation sequences.
+        sc : SparkContext
+            Context the jobs are submitted to.
 
-        Returns
-        -------
-        aic_score : float
-            The Aikaike Information Criterion.
-        """
-        logprob = self.score(sc, obs)
-        n_pars = self._n_free_parameters()
-        aic_score = 2 * n_pars - 2 * logprob
-        return aic_score
+        data : RDD of array_like or of PackedSequences
+            Observation sequences, each of shape (n_i, n_features). The
+            RDD is cached, and checkpointed if ``checkpoint`` is set.
 
-    def bic(self, sc, obs):
-        """Computes the Aikaike Information Criterion of the model and
-        set of observations.
+        warm_start : bool, optional
+            Start from the current parameters instead of initializing
+            them.
 
-        Parameters
-        ----------
-        obs : list of arrays
-            List of observation sequences.
+        Other keyword arguments are those of the local ``fit``.
 
-        Returns
-        -------
-        bic_score : float
-            The Aikaike Information Criterion.
+        Notes
+        -----
+        ``data`` may hold PackedSequences (see ``pack_sequences`` and
+        ``pack_dataframe``). They stay cached in packed form across the
+        iterations and their emissions are computed a block at a time.
         """
-        logprob = self.score(sc, obs)
-        n_pars = self._n_free_parameters()
-        n_data = sum([len(seq) for seq in obs])
-        bic_score = n_pars * (np.log(n_data) - np.log(2 * np.pi)) - 2 * logprob
-        return bic_score
-
-    def _decode_viterbi(self, obs):
-        """Find most likely state sequence corresponding to ``obs``.
-
-        Uses the Viterbi algorithm.
+        data.cache()
+        if self.checkpoint:
+            data.checkpoint()
+        with self._spark_backend(sc):
+            return super(_SparkMixin, self).fit(data, warm_start, **kwargs)
 
-        Parameters
-        ----------
-        obs : array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points. Each row
-            corresponds to a single point in the sequence.
+    def score(self, sc, data):
+        """Compute the log probability of an RDD of sequences under the
+        model.
 
         Returns
         -------
-        viterbi_logprobs : array_like, shape (n,)
-            Log probability of the maximum likelihood path through the HMM.
-
-        state_sequences : list of array_like, shape (n,)
-            Index of the most likely states for each observation.
+        logprob : float
+            Log likelihood of the sequences of ``data``.
+        """
+        with self._spark_backend(sc):
+            return super(_SparkMixin, self).score(data)
+
+    def _fit_candidate(self, obs, warm_start=False):
+        # select_n_states runs the local fit, on the SparkExecutor the
+        # estimator was given.
+        super(_SparkMixin, self).fit(obs, warm_start)
+        logprob = self._training_logprob
+        if logprob is None:
+            logprob = super(_SparkMixin, self).score(obs)
+        return self, logprob
+
+    def aic(self, sc, data):
+        """Computes the Aikaike Information Criterion of the model and
+        an RDD of sequences."""
+        return self._aic(self.score(sc, data))
 
-        See Also
-        --------
-        score_samples : Compute the log probability under the model and
-            posteriors.
+    def bic(self, sc, data):
+        """Computes the Bayesian Information Criterion of the model and
+        an RDD of sequences."""
+        return self._bic(self.score(sc, data),
+                         sequences(data).map(len).sum())
 
-        score : Compute the log probability under the model
-        """
-        viterbi_logprobs = np.zeros(len(obs))
-        state_sequences = []
-        for n, seq in enumerate(obs):
-            seq = np.asarray(seq)
-            framelogprob = self._compute_log_likelihood(seq)
-            viterbi_logprobs[n], state_sequence = self._do_viterbi_pass(
-                framelogprob)
-            state_sequences.append(state_sequence)
-        return viterbi_logprobs, state_sequences
 
-    def _decode_map(self, obs):
-        """Find most likely state sequence corresponding to `obs`.
+class _SparkInputCheckMixin(object):
+    """Run the input checks of the local estimator over an RDD, from
+    summaries of its partitions merged on the driver."""
 
-        Uses the maximum a posteriori estimation.
+    def _check_input_symbols(self, obs):
+        if not hasattr(obs, 'mapPartitions'):
+            return super(_SparkInputCheckMixin,
+                         self)._check_input_symbols(obs)
+        # The local check also rejects a single frame in all, which only
+        # the merged count decides.
+        summary = self._symbol_summary(obs)
+        return summary['valid'] and summary['count'] != 1
+
+
+class _SparkHMMMixin(_SparkMixin):
+    """Distributed initialization and inference of the HMMs."""
+
+    # Hooks of the initialization of the emissions, see hmm._BaseHMM.
+    # Nothing is collected to the driver but moments and a bounded
+    # sample of frames.
+
+    def _init_frames(self, obs, column=None):
+        frames = sequences(obs)
+        if column is not None:
+            frames = frames.map(lambda seq: np.asarray(seq)[:, column])
+        return frames
+
+    def _init_centers(self, frames):
+        return kmeans_parallel(frames, self.n_states,
+                               seed=_init_seed(self.random_state),
+                               sample_budget=self.init_sample_budget)
+
+    def _init_n_features(self, frames):
+        return _frames(frames.first()).shape[1]
+
+    def _init_covariance(self, frames):
+        return frame_moments(frames)[2]
+
+    def _init_gmm_frames(self, obs):
+        rows = sequences(obs).flatMap(_frames).takeSample(
+            False, self.init_sample_budget, _init_seed(self.random_state))
+        if not rows:
+            raise ValueError("Cannot initialize the mixtures from no frames")
+        return np.vstack(rows)
+
+    def _infer_rdd(self, data, outputs):
+        # The tasks get a copy of the model in their closure, so that the
+        # lazy result does not change with a later fit.
+        model = copy.deepcopy(self)
+
+        def infer_partition(items):
+            keys, seqs = batch_keys(list(items))
+            results = model._infer(seqs, outputs)
+            for i, key in enumerate(keys):
+                yield key, dict((name, values[i])
+                                for name, values in results.items())
+
+        return data.mapPartitions(infer_partition, preservesPartitioning=True)
+
+    def score_samples_rdd(self, sc, data):
+        """Compute the log probability and the posteriors of each sequence
+        of an RDD.
 
         Parameters
         ----------
-        obs : list of array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points. Each row
-            corresponds to a single point in the sequence.
+        data : RDD of (key, array_like) pairs or of PackedSequences
+            Observation sequences, each of shape (n, n_features), with an
+            arbitrary key that is passed through to the results. Packed
+            sequences are keyed by their ids.
 
         Returns
         -------
-        map_logprobs : array_like, shape (n,)
-            Log probability of the maximum likelihood path through the HMM
-        state_sequences : list of array_like, shape (n,)
-            Index of the most likely states for each observation
-
-        See Also
-        --------
-        score_samples : Compute the log probability under the model and
-            posteriors.
-        score : Compute the log probability under the model.
+        results : RDD of (key, (logprob, posteriors)) pairs
+            Log likelihood of each sequence and the posterior probability
+            of each state for each observation, shape (n, n_states).
         """
-        map_logprobs = np.zeros(len(obs))
-        state_sequences = []
-        _, posteriors = self.score_samples(obs)
-        for n, post in enumerate(posteriors):
-            state_sequences.append(np.argmax(post, axis=1))
-            map_logprobs[n] = np.max(post, axis=1).sum()
-        return map_logprobs, state_sequences
-
-    def decode(self, obs, algorithm="viterbi"):
-        """Find most likely state sequence corresponding to ``obs``.
-        Uses the selected algorithm for decoding.
+        return self._infer_rdd(data, ("logprob", "posteriors")).mapValues(
+            lambda result: (result["logprob"], result["posteriors"]))
+
+    def decode_rdd(self, sc, data, algorithm="viterbi"):
+        """Find the most likely state sequence of each sequence of an RDD.
 
         Parameters
         ----------
-        obs : array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points. Each row
-            corresponds to a single point in the sequence.
+        data : RDD of (key, array_like) pairs or of PackedSequences
+            Observation sequences, each of shape (n, n_features), with an
+            arbitrary key that is passed through to the results. Packed
+            sequences are keyed by their ids.
 
         algorithm : string, one of the `decoder_algorithms`
             decoder algorithm to be used
 
         Returns
         -------
-        logprobs : array_like, shape (n,)
-            Log probability of the maximum likelihood path through the HMM
-
-        state_sequences : list of array_like, shape (n,)
-            Index of the most likely states for each observation
+        results : RDD of (key, (logprob, state_sequence)) pairs
+            Log probability of the most likely path of each sequence and
+            the index of the most likely state for each observation.
 
         See Also
         --------
-        score_samples : Compute the log probability under the model and
-            posteriors.
-
-        score : Compute the log probability under the model.
+        decode : Decode a list of sequences locally.
         """
         if self._algorithm in decoder_algorithms:
             algorithm = self._algorithm
-        elif algorithm in decoder_algorithms:
-            algorithm = algorithm
-        decoder = {"viterbi": self._decode_viterbi,
-                   "map": self._decode_map}
-        logprobs, state_sequences = decoder[algorithm](obs)
-        return logprobs, state_sequences
-
-    def predict(self, obs, algorithm="viterbi"):
-        """Find most likely state sequence corresponding to `obs`.
-
-        Parameters
-        ----------
-        obs : array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points. Each row
-            corresponds to a single point in the sequence.
-
-        Returns
-        -------
-        state_sequences : list of array_like, shape (n,)
-            Index of the most likely states for each observation
-        """
-        _, state_sequences = self.decode(obs, algorithm)
-        return state_sequences
+        elif algorithm not in decoder_algorithms:
+            raise ValueError("algorithm must be one of the decoder_algorithms")
+        if algorithm == "viterbi":
+            return self._infer_rdd(data, ("viterbi",)).mapValues(
+                lambda result: (result["viterbi_logprob"], result["viterbi"]))
+        return self._infer_rdd(data, ("posteriors",)).mapValues(
+            lambda result: (np.max(result["posteriors"], axis=1).sum(),
+                            np.argmax(result["posteriors"], axis=1)))
 
-    def predict_proba(self, obs):
-        """Compute the posterior probability for each state in the model
+    def predict_rdd(self, sc, data, algorithm="viterbi"):
+        """Find the most likely state sequence of each sequence of an RDD.
 
         Parameters
         ----------
-        obs : array_like, shape (n, n_features)
-            Sequence of n_features-dimensional data points. Each row
-            corresponds to a single point in the sequence.
+        data : RDD of (key, array_like) pairs or of PackedSequences
+            Observation sequences, each of shape (n, n_features), with an
+            arbitrary key that is passed through to the results. Packed
+            sequences are keyed by their ids.
 
         Returns
         -------
-        posteriors : list of array-like, shape (n, n_states)
-            Returns the probability of the sample for each state in the model.
+        results : RDD of (key, state_sequence) pairs
+            Index of the most likely state for each observation.
         """
-        _, posteriors = self.score_samples(obs)
-        return posteriors
+        return self.decode_rdd(sc, data, algorithm).mapValues(
+            lambda result: result[1])
 
-    def sample(self, n_seq=1, n_min=10, n_max=20, random_state=None):
-        """Generate random samples from the model.
+    def predict_proba_rdd(self, sc, data):
+        """Compute the state posteriors of each sequence of an RDD.
 
         Parameters
         ----------
-        n_seq : int
-            Number of observation sequences to generate.
-
-        n_min : int
-            Minimum number of observations for a sequence.
-
-        n_max : int
-            Maximum number of observations for a sequence.
-
-        random_state: RandomState or an int seed (0 by default)
-            A random number generator instance. If None is given, the
-            object's random_state is used
+        data : RDD of (key, array_like) pairs or of PackedSequences
+            Observation sequences, each of shape (n, n_features), with an
+            arbitrary key that is passed through to the results. Packed
+            sequences are keyed by their ids.
 
         Returns
         -------
-        (obs, hidden_states)
-        obs : list of array_like, length `n_seq` List of samples
-        states : list of array_like, length `n_seq` List of hidden states
-        """
-        if random_state is None:
-            random_state = self.random_state
-        random_state = check_random_state(random_state)
-
-        startprob_pdf = self.startprob_
-        startprob_cdf = np.cumsum(startprob_pdf)
-        transmat_pdf = self.transmat_
-        transmat_cdf = np.cumsum(transmat_pdf, 1)
-
-        obs = []
-        states = []
-
-        for _ in range(n_seq):
-            n = np.random.randint(n_min, n_max, size=1)
-            # Initial state.
-            rand = random_state.rand()
-            currstate = (startprob_cdf > rand).argmax()
-            state_seq = [currstate]
-            obs_seq = [self._generate_sample_from_state(
-                currstate, random_state=random_state)]
-
-            for _ in range(n - 1):
-                rand = random_state.rand()
-                currstate = (transmat_cdf[currstate] > rand).argmax()
-                state_seq.append(currstate)
-                obs_seq.append(self._generate_sample_from_state(
-                    currstate, random_state=random_state))
-
-            obs.append(deepcopy(np.array(obs_seq)))
-            states.append(deepcopy(np.array(state_seq, dtype=int)))
-
-        return obs, states
-
-    def fit(self, sc, data, warm_start=False):
-        """Estimate model parameters.
-
-        An initialization step is performed before entering the EM
-        algorithm. If you want to avoid this step, pass proper
-        ``init_params`` keyword argument to estimator's constructor.
-
-        Parameters
-        ----------
-        obs : list
-            List of array-like observation sequences, each of which
-            has shape (n_i, n_features), where n_i is the length of
-            the i_th observation. Alternatively, a list of strings,
-            each of which is a filepath to a pickled object, being
-            a list of array-like observation sequences.
-
-        Notes
-        -----
-        In general, `logprob` should be non-decreasing unless
-        aggressive pruning is used.  Decreasing `logprob` is generally
-        a sign of overfitting (e.g. a covariance parameter getting too
-        small).  You can fix this by getting more training data,
-        or strengthening the appropriate subclass-specific regularization
-        parameter.
+        results : RDD of (key, posteriors) pairs
+            Posterior probability of each state for each observation,
+            shape (n, n_states).
         """
+        return self._infer_rdd(data, ("posteriors",)).mapValues(
+            lambda result: result["posteriors"])
 
-        if self.algorithm not in decoder_algorithms:
-            self._algorithm = "viterbi"
-
-        if not warm_start:
-            self._init(data, self.init_params)
-
-        if self.verbose:
-            verbose_reporter = VerboseReporter(self.verbose)
-            verbose_reporter.init()
 
-        data.cache()
-
-        logprob = []
-        for i in range(self.n_iter):
-            # Expectation step
-            modelBroadcast = sc.broadcast(self)
-            results = data.map(lambda seq: _do_estep(seq, modelBroadcast)).cache()
-            stats = results.keys().reduce(merge_sum)
-            curr_logprob = results.values().reduce(lambda a, b:
-                                                   a + b)
-            logprob.append(curr_logprob)
-            if i > 0:
-                improvement = logprob[-1] - logprob[-2]
-            else:
-                improvement = np.inf
-            if self.verbose:
-                verbose_reporter.update(i, curr_logprob, improvement)
-
-            # Check for convergence.
-            if i > 0 and abs(logprob[-1] - logprob[-2]) < self.thresh:
-                break
-
-            # Maximization step
-            self._do_mstep(stats, self.params)
-
-        return self
+class GaussianHMM(_SparkHMMMixin, hmm.GaussianHMM):
+    """Hidden Markov Model with Gaussian emissions, fitted on an RDD.
 
-    def _get_algorithm(self):
-        "decoder algorithm"
-        return self._algorithm
-
-    def _set_algorithm(self, algorithm):
-        if algorithm not in decoder_algorithms:
-            raise ValueError("algorithm must be one of the decoder_algorithms")
-        self._algorithm = algorithm
-
-    algorithm = property(_get_algorithm, _set_algorithm)
-
-    def _get_startprob(self):
-        """Mixing startprob for each state."""
-        return np.exp(self._log_startprob)
-
-    def _set_startprob(self, startprob):
-        if startprob is None:
-            startprob = np.tile(1.0 / self.n_states, self.n_states)
-        else:
-            startprob = np.asarray(startprob, dtype=np.float)
-
-        # check if there exists a component whose value is exactly zero
-        # if so, add a small number and re-normalize
-        if not np.alltrue(startprob):
-            normalize(startprob)
-
-        if len(startprob) != self.n_states:
-            raise ValueError('startprob must have length n_states')
-        if not np.allclose(np.sum(startprob), 1.0):
-            raise ValueError('startprob must sum to 1.0')
-
-        self._log_startprob = np.log(np.asarray(startprob).copy())
-
-    startprob_ = property(_get_startprob, _set_startprob)
-
-    def _get_transmat(self):
-        """Matrix of transition probabilities."""
-        return np.exp(self._log_transmat)
-
-    def _set_transmat(self, transmat):
-        if transmat is None:
-            transmat = np.tile(1.0 / self.n_states,
-                               (self.n_states, self.n_states))
-
-        # check if there exists a component whose value is exactly zero
-        # if so, add a small number and re-normalize
-        if not np.alltrue(transmat):
-            normalize(transmat, axis=1)
-
-        if (np.asarray(transmat).shape
-                != (self.n_states, self.n_states)):
-            raise ValueError('transmat must have shape '
-                             '(n_states, n_states)')
-        if not np.all(np.allclose(np.sum(transmat, axis=1), 1.0)):
-            raise ValueError('Rows of transmat must sum to 1.0')
-
-        self._log_transmat = np.log(np.asarray(transmat).copy())
-        underflow_idx = np.isnan(self._log_transmat)
-        self._log_transmat[underflow_idx] = NEGINF
-
-    transmat_ = property(_get_transmat, _set_transmat)
-
-    def _do_viterbi_pass(self, framelogprob):
-        n_observations, n_states = framelogprob.shape
-        state_sequence, logprob = _hmmc._viterbi(
-            n_observations, n_states, self._log_startprob,
-            self._log_transmat, framelogprob)
-        return logprob, state_sequence
-
-    def _do_forward_pass(self, framelogprob):
-
-        n_observations, n_states = framelogprob.shape
-        fwdlattice = np.zeros((n_observations, n_states))
-        _hmmc._forward(n_observations, n_states, self._log_startprob,
-                       self._log_transmat, framelogprob, fwdlattice)
-        fwdlattice[fwdlattice <= ZEROLOGPROB] = NEGINF
-        return logsumexp(fwdlattice[-1]), fwdlattice
-
-    def _do_backward_pass(self, framelogprob):
-        n_observations, n_states = framelogprob.shape
-        bwdlattice = np.zeros((n_observations, n_states))
-        _hmmc._backward(n_observations, n_states, self._log_startprob,
-                        self._log_transmat, framelogprob, bwdlattice)
-
-        bwdlattice[bwdlattice <= ZEROLOGPROB] = NEGINF
-
-        return bwdlattice
-
-    def _compute_log_likelihood(self, obs):
-        pass
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        pass
-
-    def _init(self, obs, params):
-        if 's' in params:
-            self.startprob_ = np.random.dirichlet(self.startprob_prior)
-        if 't' in params:
-            self.transmat_ = np.vstack([np.random.dirichlet(
-                self.transmat_prior[i])
-                for i in xrange(self.n_states)])
-    # Methods used by self.fit()
-
-    def _initialize_sufficient_statistics(self):
-        stats = {'nobs': 0,
-                 'start': np.zeros(self.n_states),
-                 'trans': np.zeros((self.n_states, self.n_states))}
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, seq, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        stats['nobs'] += 1
-        if 's' in params:
-            stats['start'] += posteriors[0]
-        if 't' in params:
-            n_observations, n_states = framelogprob.shape
-            # when the sample is of length 1, it contains no transitions
-            # so there is no reason to update our trans. matrix estimate
-            if n_observations > 1:
-                lneta = np.zeros((n_observations - 1,
-                                  n_states,
-                                  n_states))
-                lnP = logsumexp(fwdlattice[-1])
-                _hmmc._compute_lneta(n_observations, n_states, fwdlattice,
-                                     self._log_transmat, bwdlattice,
-                                     framelogprob, lnP, lneta)
-                stats['trans'] += np.exp(np.minimum(logsumexp(lneta, 0), 700))
-
-    def _do_mstep(self, stats, params):
-        # Based on Huang, Acero, Hon, "Spoken Language Processing",
-        # p. 443 - 445
-
-        if 's' in params:
-            self.startprob_ = normalize(np.maximum(stats['start'], 1e-20))
-        if 't' in params:
-            self.transmat_ = normalize(np.maximum(stats['trans'], 1e-20), 1)
-
-    def _n_free_parameters(self):
-        pass
-
-
-class GaussianHMM(_BaseHMM):
-    """Hidden Markov Model with Gaussian emissions
-
-    Representation of a hidden Markov model probability distribution.
-    This class allows for easy evaluation of, sampling from, and
-    maximum-likelihood estimation of the parameters of a HMM.
+    See :class:`hmmlearn.hmm.GaussianHMM` for the model and the other
+    parameters.
 
     Parameters
     ----------
-    n_states : int
-        Number of states.
-
-    ``_covariance_type`` : string
-        String describing the type of covariance parameters to
-        use.  Must be one of 'spherical', 'tied', 'diag', 'full'.
-        Defaults to 'diag'.
-
-    Attributes
-    ----------
-    ``_covariance_type`` : string
-        String describing the type of covariance parameters used by
-        the model.  Must be one of 'spherical', 'tied', 'diag', 'full'.
-
-    n_features : int
-        Dimensionality of the Gaussian emissions.
-
-    n_states : int
-        Number of states in the model.
-
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
-
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
-
-    means : array, shape (`n_states`, `n_features`)
-        Mean parameters for each state.
-
-    covars : array
-        Covariance parameters for each state.  The shape depends on
-        ``_covariance_type``::
-
-            (`n_states`,)                   if 'spherical',
-            (`n_features`, `n_features`)              if 'tied',
-            (`n_states`, `n_features`)           if 'diag',
-            (`n_states`, `n_features`, `n_features`)  if 'full'
-
-    random_state: RandomState or an int seed (0 by default)
-        A random number generator instance
-
-    n_iter : int, optional
-        Number of iterations to perform.
-
-    thresh : float, optional
-        Convergence threshold.
-
-    params : string, optional
-        Controls which parameters are updated in the training
-        process.  Can contain any combination of 's' for startprob,
-        't' for transmat, 'm' for means, and 'c' for covars.
-        Defaults to all parameters.
-
-    init_params : string, optional
-        Controls which parameters are initialized prior to
-        training.  Can contain any combination of 's' for
-        startprob, 't' for transmat, 'm' for means, and 'c' for
-        covars.  Defaults to all parameters.
-
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
-
-    Examples
-    --------
-    >>> from hmmlearn.hmm import GaussianHMM
-    >>> GaussianHMM(n_states=2)
-    ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
-    GaussianHMM(algorithm='viterbi',...
-
-
-    See Also
-    --------
-    GMM : Gaussian mixture model
+    aggregation_depth : int, default: 2
+        Depth of the ``treeAggregate`` that reduces the statistics of
+        the E-step. Deeper trees merge more partial results on the
+        executors and send fewer of them to the driver.
+
+    checkpoint : bool, default: False
+        Whether to checkpoint the training data in fit, which cuts its
+        lineage. Requires a checkpoint directory to be set on the
+        SparkContext.
+
+    init_sample_budget : int, default: 10000
+        Expected number of frames collected to the driver to initialize
+        the emission parameters with k-means||.
     """
 
     def __init__(self, n_states=1, covariance_type='diag', startprob=None,
@@ -860,283 +758,34 @@ class GaussianHMM(_BaseHMM):
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
-                 verbose=0):
-        _BaseHMM.__init__(self, n_states, startprob, transmat,
-                          startprob_prior=startprob_prior,
-                          transmat_prior=transmat_prior, algorithm=algorithm,
-                          random_state=random_state, n_iter=n_iter,
-                          thresh=thresh, params=params,
-                          init_params=init_params, verbose=verbose)
-
-        self._covariance_type = covariance_type
-        if not covariance_type in ['spherical', 'tied', 'diag', 'full']:
-            raise ValueError('bad covariance_type')
-
-        self.means_var = means_var
-
-        self.covars_prior = covars_prior
-        self.covars_weight = covars_weight
+                 verbose=0,
+                 aggregation_depth=2, checkpoint=False,
+                 init_sample_budget=10000):
+        hmm.GaussianHMM.__init__(self, n_states, covariance_type, startprob,
+                                 transmat, startprob_prior, transmat_prior,
+                                 algorithm, means_var, covars_prior,
+                                 covars_weight, random_state, n_iter, thresh,
+                                 params, init_params, verbose)
+        self.aggregation_depth = aggregation_depth
+        self.checkpoint = checkpoint
+        self.init_sample_budget = init_sample_budget
+
+
+class MultinomialHMM(_SparkHMMMixin, hmm.MultinomialHMM):
+    """Hidden Markov Model with multinomial (discrete) emissions, fitted
+    on an RDD.
+
+    See :class:`hmmlearn.hmm.MultinomialHMM` for the model and the other
+    parameters.
 
-    @property
-    def covariance_type(self):
-        """Covariance type of the model.
-
-        Must be one of 'spherical', 'tied', 'diag', 'full'.
-        """
-        return self._covariance_type
-
-    def _get_means(self):
-        """Mean parameters for each state."""
-        return self._means_
-
-    def _set_means(self, means):
-        means = np.asarray(means)
-        if (hasattr(self, 'n_features')
-                and means.shape != (self.n_states, self.n_features)):
-            raise ValueError('means must have shape '
-                             '(n_states, n_features)')
-        self._means_ = means.copy()
-        self.n_features = self._means_.shape[1]
-
-    means_ = property(_get_means, _set_means)
-
-    def _get_covars(self):
-        """Return covars as a full matrix."""
-        if self._covariance_type == 'full':
-            return self._covars_
-        elif self._covariance_type == 'diag':
-            return [np.diag(cov) for cov in self._covars_]
-        elif self._covariance_type == 'tied':
-            return [self._covars_] * self.n_states
-        elif self._covariance_type == 'spherical':
-            return [np.eye(self.n_features) * f for f in self._covars_]
-
-    def _set_covars(self, covars):
-        covars = np.asarray(covars)
-        _validate_covars(covars, self._covariance_type, self.n_states)
-        self._covars_ = covars.copy()
-
-    covars_ = property(_get_covars, _set_covars)
-
-    def _compute_log_likelihood(self, obs):
-        return log_multivariate_normal_density(
-            obs, self._means_, self._covars_, self._covariance_type)
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        if self._covariance_type == 'tied':
-            cv = self._covars_
-        else:
-            cv = self._covars_[state]
-        return sample_gaussian(self._means_[state], cv, self._covariance_type,
-                               random_state=random_state)
-
-    def _init(self, obs, params='stmc'):
-        super(GaussianHMM, self)._init(obs, params=params)
-
-        concat_obs = np.vstack(obs
-                               .flatMap(identity)
-                               .sample(False, 0.01)
-                               .map(np.atleast_2d)
-                               .collect())
-        if (hasattr(self, 'n_features')
-                and self.n_features != concat_obs.shape[1]):
-            raise ValueError('Unexpected number of dimensions, got %s but '
-                             'expected %s' % (concat_obs.shape[1],
-                                              self.n_features))
-
-        self.n_features = concat_obs.shape[1]
-
-        if 'm' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                concat_obs)
-            self._means_ = np.array([multivariate_normal(
-                mean,
-                np.eye(self.n_features) * self.means_var)
-                for mean in clu.cluster_centers_])
-        if 'c' in params:
-            cv = np.cov(concat_obs.T)
-            if not cv.shape:
-                cv.shape = (1, 1)
-            self._covars_ = distribute_covar_matrix_to_match_covariance_type(
-                cv, self._covariance_type, self.n_states)
-            self._covars_[self._covars_ == 0] = 1e-5
-
-    def _initialize_sufficient_statistics(self):
-        stats = super(GaussianHMM, self)._initialize_sufficient_statistics()
-        stats['post'] = np.zeros(self.n_states)
-        stats['obs'] = np.zeros((self.n_states, self.n_features))
-        stats['obs**2'] = np.zeros((self.n_states, self.n_features))
-        if self._covariance_type in ('tied', 'full'):
-            stats['obs*obs.T'] = np.zeros((self.n_states, self.n_features,
-                                          self.n_features))
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        super(GaussianHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice,
-            params)
-
-        if 'm' in params or 'c' in params:
-            stats['post'] += posteriors.sum(axis=0)
-            stats['obs'] += np.dot(posteriors.T, obs)
-
-        if 'c' in params:
-            if self._covariance_type in ('spherical', 'diag'):
-                stats['obs**2'] += np.dot(posteriors.T, obs ** 2)
-            elif self._covariance_type in ('tied', 'full'):
-                for t, o in enumerate(obs):
-                    obsobsT = np.outer(o, o)
-                    for c in range(self.n_states):
-                        stats['obs*obs.T'][c] += posteriors[t, c] * obsobsT
-
-    def _do_mstep(self, stats, params):
-        super(GaussianHMM, self)._do_mstep(stats, params)
-
-        # Based on Huang, Acero, Hon, "Spoken Language Processing",
-        # p. 443 - 445
-        denom = stats['post'][:, np.newaxis]
-        if 'm' in params:
-            self._means_ = stats['obs'] / stats['post'][:, np.newaxis]
-
-        if 'c' in params:
-            covars_prior = self.covars_prior
-            covars_weight = self.covars_weight
-            if covars_prior is None:
-                covars_weight = 0
-                covars_prior = 0
-
-            if self._covariance_type in ('spherical', 'diag'):
-                cv_num = ((self._means_) ** 2
-                          + stats['obs**2']
-                          - 2 * self._means_ * stats['obs']
-                          + self._means_ ** 2 * denom)
-                cv_den = max(covars_weight - 1, 0) + denom
-                self._covars_ = (covars_prior + cv_num) / np.maximum(cv_den,
-                                                                     1e-5)
-                if self._covariance_type == 'spherical':
-                    self._covars_ = np.tile(
-                        self._covars_.mean(1)[:, np.newaxis],
-                        (1, self._covars_.shape[1]))
-            elif self._covariance_type in ('tied', 'full'):
-                cvnum = np.empty((self.n_states, self.n_features,
-                                  self.n_features))
-                for c in range(self.n_states):
-                    obsmean = np.outer(stats['obs'][c], self._means_[c])
-
-                    cvnum[c] = (np.outer(self._means_[c],
-                                         self._means_[c])
-                                + stats['obs*obs.T'][c]
-                                - obsmean - obsmean.T
-                                + np.outer(self._means_[c], self._means_[c])
-                                * stats['post'][c])
-                cvweight = max(covars_weight - self.n_features, 0)
-                if self._covariance_type == 'tied':
-                    self._covars_ = ((covars_prior + cvnum.sum(axis=0)) /
-                                     (cvweight + stats['post'].sum()))
-                elif self._covariance_type == 'full':
-                    self._covars_ = ((covars_prior + cvnum) /
-                                     (cvweight + stats['post'][:, None, None]))
-
-    def _n_free_parameters(self):
-        n_pars = (self.n_states - 1) * (self.n_states + 1)
-        n_pars += self.n_states * self.n_features
-        if self._covariance_type == 'spherical':
-            n_pars += self.n_states
-        elif self._covariance_type == 'tied':
-            n_pars += ((self.n_features + 1) * self.n_features) / 2
-        elif self._covariance_type == 'diag':
-            n_pars += self.n_states * self.n_features
-        elif self._covariance_type == 'full':
-            n_pars += self.n_states * ((self.n_features + 1)
-                                       * self.n_features) / 2
-        return n_pars
-
-    def fit(self, sc, obs, warm_start=False):
-        """Estimate model parameters.
-
-        An initialization step is performed before entering the EM
-        algorithm. If you want to avoid this step, pass proper
-        ``init_params`` keyword argument to estimator's constructor.
-
-        Parameters
-        ----------
-        obs : list
-            List of array-like observation sequences, each of which
-            has shape (n_i, n_features), where n_i is the length of
-            the i_th observation. Alternatively, a list of strings,
-            each of which is a filepath to a pickled object, being
-            a list of array-like observation sequences.
-
-        Notes
-        -----
-        In general, `logprob` should be non-decreasing unless
-        aggressive pruning is used.  Decreasing `logprob` is generally
-        a sign of overfitting (e.g. the covariance parameter on one or
-        more components becomminging too small).  You can fix this by getting
-        more training data, or increasing covars_prior.
-        """
-        return super(GaussianHMM, self).fit(sc, obs, warm_start)
-
-
-class MultinomialHMM(_BaseHMM):
-    """Hidden Markov Model with multinomial (discrete) emissions
-
-    Attributes
+    Parameters
     ----------
-    n_states : int
-        Number of states in the model.
-
-    n_symbols : int
-        Number of possible symbols emitted by the model (in the observations).
-
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
-
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
-
-    emissionprob : array, shape ('n_states`, 'n_symbols`)
-        Probability of emitting a given symbol when in each state.
-
-    random_state: RandomState or an int seed (0 by default)
-        A random number generator instance
-
-    n_iter : int, optional
-        Number of iterations to perform.
-
-    thresh : float, optional
-        Convergence threshold.
-
-    params : string, optional
-        Controls which parameters are updated in the training
-        process.  Can contain any combination of 's' for startprob,
-        't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    init_params : string, optional
-        Controls which parameters are initialized prior to
-        training.  Can contain any combination of 's' for
-        startprob, 't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
-
-    Examples
-    --------
-    >>> from hmmlearn.hmm import MultinomialHMM
-    >>> MultinomialHMM(n_states=2)
-    ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
-    MultinomialHMM(algorithm='viterbi',...
-
-    See Also
-    --------
-    GaussianHMM : HMM with Gaussian emissions
+    aggregation_depth : int, default: 2
+        Depth of the ``treeAggregate`` that reduces the statistics of
+        the E-step.
+
+    checkpoint : bool, default: False
+        Whether to checkpoint the training data in fit.
     """
 
     def __init__(self, n_states=1, startprob=None, transmat=None,
@@ -1144,208 +793,24 @@ class MultinomialHMM(_BaseHMM):
                  emissionprob_prior=None, algorithm="viterbi",
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters, init_params=string.ascii_letters,
-                 verbose=0):
-        """Create a hidden Markov model with multinomial emissions.
-
-        Parameters
-        ----------
-        n_states : int
-            Number of states.
-        """
-        _BaseHMM.__init__(self, n_states, startprob, transmat,
-                          startprob_prior=startprob_prior,
-                          transmat_prior=transmat_prior,
-                          algorithm=algorithm,
-                          random_state=random_state,
-                          n_iter=n_iter,
-                          thresh=thresh,
-                          params=params,
-                          init_params=init_params,
-                          verbose=verbose)
-
-        self.emissionprob_prior = emissionprob_prior
-
-    def _get_emissionprob(self):
-        """Emission probability distribution for each state."""
-        return np.exp(self._log_emissionprob)
-
-    def _set_emissionprob(self, emissionprob):
-        emissionprob = np.asarray(emissionprob)
-        if hasattr(self, 'n_symbols') and \
-                emissionprob.shape != (self.n_states, self.n_symbols):
-            raise ValueError('emissionprob must have shape '
-                             '(n_states, n_symbols)')
-
-        # check if there exists a component whose value is exactly zero
-        # if so, add a small number and re-normalize
-        if not np.alltrue(emissionprob):
-            normalize(emissionprob)
-
-        self._log_emissionprob = np.log(emissionprob)
-        underflow_idx = np.isnan(self._log_emissionprob)
-        self._log_emissionprob[underflow_idx] = NEGINF
-        self.n_symbols = self._log_emissionprob.shape[1]
-
-    emissionprob_ = property(_get_emissionprob, _set_emissionprob)
-
-    def _compute_log_likelihood(self, obs):
-        return self._log_emissionprob[:, obs].T
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        cdf = np.cumsum(self.emissionprob_[state, :])
-        random_state = check_random_state(random_state)
-        rand = random_state.rand()
-        symbol = (cdf > rand).argmax()
-        return symbol
-
-    def _init(self, obs, params='ste'):
-        super(MultinomialHMM, self)._init(obs, params=params)
-        self.random_state = check_random_state(self.random_state)
-
-        if 'e' in params:
-            if not hasattr(self, 'n_symbols'):
-                symbols = set(obs.flatMap(identity).distinct().collect())
-                self.n_symbols = len(symbols)
-            if self.emissionprob_prior is None:
-                self.emissionprob_prior = np.ones((self.n_states,
-                                                   self.n_symbols))
-            emissionprob = np.vstack([np.random.dirichlet(
-                self.emissionprob_prior[i])
-                for i in xrange(self.n_states)])
-            self.emissionprob_ = emissionprob
-
-    def _initialize_sufficient_statistics(self):
-        stats = super(MultinomialHMM, self)._initialize_sufficient_statistics()
-        stats['obs'] = np.zeros((self.n_states, self.n_symbols))
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        super(MultinomialHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice,
-            params)
-        if 'e' in params:
-            for t, symbol in enumerate(obs):
-                stats['obs'][:, symbol] += posteriors[t]
-
-    def _do_mstep(self, stats, params):
-        super(MultinomialHMM, self)._do_mstep(stats, params)
-        if 'e' in params:
-            self.emissionprob_ = (stats['obs']
-                                  / stats['obs'].sum(1)[:, np.newaxis])
-
-    def _check_input_symbols(self, obs):
-        """check if input can be used for Multinomial.fit input must be both
-        positive integer array and every element must be continuous.
-        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not
-        """
-
-        symbols = obs.copy()
-
-        if symbols.dtype.kind != 'i':
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        return True
-
-    def _n_free_parameters(self):
-        n_pars = (self.n_states - 1) * (self.n_states + 1)
-        n_pars += self.n_states * (self.n_symbols - 1)
-        return n_pars
-
-    def fit(self, sc, data, warm_start=False, **kwargs):
-        """Estimate model parameters.
-
-        An initialization step is performed before entering the EM
-        algorithm. If you want to avoid this step, pass proper
-        ``init_params`` keyword argument to estimator's constructor.
-
-        Parameters
-        ----------
-        obs : list
-            List of array-like observation sequences, each of which
-            has shape (n_i, n_features), where n_i is the length of
-            the i_th observation. Alternatively, a list of strings,
-            each of which is a filepath to a pickled object, being
-            a list of array-like observation sequences.
-        """
-        err_msg = ("Input must be a list of non-negative integer arrays where "
-                   "in all, every element must be continuous, but %s was "
-                   "given.")
-
-        modelBroadcast = sc.broadcast(self)
-
-        if not data.map(lambda x: modelBroadcast.value._check_input_symbols(x)).min():
-            raise ValueError(err_msg % data.take(5))
-        elif np.any(np.diff(data.flatMap(identity).distinct().sortBy(identity).collect()) > 1):
-            raise ValueError(err_msg % data.take(5))
-
-        return super(MultinomialHMM, self).fit(sc, data, warm_start, **kwargs)
-
-
-class PoissonHMM(_BaseHMM):
-    """Hidden Markov Model with Poisson (discrete) emissions
-
-    Attributes
-    ----------
-    n_states : int
-        Number of states in the model.
-
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
-
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
-
-    rates : array, shape ('n_states`,)
-        Poisson rate parameters for each state.
-
-    random_state: RandomState or an int seed (0 by default)
-        A random number generator instance
-
-    n_iter : int, optional
-        Number of iterations to perform.
-
-    thresh : float, optional
-        Convergence threshold.
-
-    params : string, optional
-        Controls which parameters are updated in the training
-        process.  Can contain any combination of 's' for startprob,
-        't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    init_params : string, optional
-        Controls which parameters are initialized prior to
-        training.  Can contain any combination of 's' for
-        startprob, 't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
-
-    Examples
-    --------
-    >>> from hmmlearn.hmm import PoissonHMM
-    >>> PoissonHMM(n_states=2)
-    ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
-    PoissonHMM(algorithm='viterbi',...
-
-    See Also
-    --------
-    GaussianHMM : HMM with Gaussian emissions
+                 verbose=0,
+                 aggregation_depth=2, checkpoint=False, n_symbols=None):
+        hmm.MultinomialHMM.__init__(self, n_states, startprob, transmat,
+                                    startprob_prior, transmat_prior,
+                                    emissionprob_prior, algorithm,
+                                    random_state, n_iter, thresh, params,
+                                    init_params, verbose,
+                                    n_symbols=n_symbols)
+        self.aggregation_depth = aggregation_depth
+        self.checkpoint = checkpoint
+
+
+class PoissonHMM(_SparkInputCheckMixin, _SparkHMMMixin, hmm.PoissonHMM):
+    """Hidden Markov Model with Poisson (discrete) emissions, fitted on an
+    RDD.
+
+    See :class:`hmmlearn.hmm.PoissonHMM` for the model and the other
+    parameters, and :class:`GaussianHMM` for the Spark ones.
     """
 
     def __init__(self, n_states=1, startprob=None, transmat=None,
@@ -1353,190 +818,25 @@ class PoissonHMM(_BaseHMM):
                  rates_var=1.0, algorithm="viterbi",
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
-                 init_params=string.ascii_letters, verbose=0):
-        """Create a hidden Markov model with multinomial emissions.
-
-        Parameters
-        ----------
-        n_states : int
-            Number of states.
-        """
-        _BaseHMM.__init__(self, n_states, startprob, transmat,
-                          startprob_prior=startprob_prior,
-                          transmat_prior=transmat_prior,
-                          algorithm=algorithm,
-                          random_state=random_state,
-                          n_iter=n_iter,
-                          thresh=thresh,
-                          params=params,
-                          init_params=init_params,
-                          verbose=verbose)
-        self.rates_var = rates_var
-
-    def _get_rates(self):
-        """Emission rate for each state."""
-        return self._rates
-
-    def _set_rates(self, rates):
-        rates = np.asarray(rates)
-        self._rates = rates.copy()
-
-    rates_ = property(_get_rates, _set_rates)
-
-    def _compute_log_likelihood(self, obs):
-        return log_poisson_pmf(obs, self._rates)
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        return poisson.rvs(self._rates[state])
-
-    def _init(self, obs, params='str'):
-        super(PoissonHMM, self)._init(obs, params=params)
-
-        concat_obs = np.array(obs.flatMap(identity).sample(False, 0.01).collect())
-        if 'r' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                np.atleast_2d(concat_obs).T)
-            rates = normal(0, self.rates_var, self.n_states) + \
-                clu.cluster_centers_.T[0]
-            self._rates = np.maximum(0.1, rates)
-
-    def _initialize_sufficient_statistics(self):
-        stats = super(PoissonHMM, self)._initialize_sufficient_statistics()
-        stats['post'] = np.zeros(self.n_states)
-        stats['obs'] = np.zeros((self.n_states,))
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        super(PoissonHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice,
-            params)
-
-        if 'r' in params:
-            stats['post'] += posteriors.sum(axis=0)
-            stats['obs'] += np.dot(posteriors.T, obs)
-
-    def _do_mstep(self, stats, params):
-        super(PoissonHMM, self)._do_mstep(stats, params)
-
-        if 'r' in params:
-            self._rates = stats['obs'] / stats['post']
-
-    def _check_input_symbols(self, obs):
-        """check if input can be used for PoissonHMM. Input must be a list
-        of non-negative integers.
-        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, -1, 3, 5, 10] not
-        """
-        symbols = obs.copy()
-        if symbols.dtype.kind != 'i':
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        return True
-
-    def _n_free_parameters(self):
-        n_pars = (self.n_states - 1) * (self.n_states + 1)
-        n_pars += self.n_states
-        return n_pars
-
-    def fit(self, sc, data, warm_start=False):
-        """Estimate model parameters.
-
-        An initialization step is performed before entering the EM
-        algorithm. If you want to avoid this step, pass proper
-        ``init_params`` keyword argument to estimator's constructor.
-
-        Parameters
-        ----------
-        obs : list
-            List of array-like observation sequences, each of which
-            has shape (n_i, n_features), where n_i is the length of
-            the i_th observation. Alternatively, a list of strings,
-            each of which is a filepath to a pickled object, being
-            a list of array-like observation sequences.
-
-        Notes
-        -----
-        In general, `logprob` should be non-decreasing unless
-        aggressive pruning is used.  Decreasing `logprob` is generally
-        a sign of overfitting (e.g. the covariance parameter on one or
-        more components becomminging too small).  You can fix this by getting
-        more training data, or increasing covars_prior.
-        """
-        err_msg = ("Input must be a list of non-negative integer arrays, \
-                   but %s was given.")
-
-        modelBroadcast = sc.broadcast(self)
-
-        if not data.map(lambda x: modelBroadcast.value._check_input_symbols(x)).min():
-            raise ValueError(err_msg % data.take(5))
-
-        return super(PoissonHMM, self).fit(sc, data, warm_start)
-
-
-class ExponentialHMM(_BaseHMM):
-    """Hidden Markov Model with Exponential (continuous) emissions
-
-    Attributes
-    ----------
-    n_states : int
-        Number of states in the model.
-
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
-
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
-
-    rates : array, shape ('n_states`,)
-        Exponential rate parameters for each state.
-
-    random_state: RandomState or an int seed (0 by default)
-        A random number generator instance
-
-    n_iter : int, optional
-        Number of iterations to perform.
-
-    thresh : float, optional
-        Convergence threshold.
-
-    params : string, optional
-        Controls which parameters are updated in the training
-        process.  Can contain any combination of 's' for startprob,
-        't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    init_params : string, optional
-        Controls which parameters are initialized prior to
-        training.  Can contain any combination of 's' for
-        startprob, 't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
-
-    Examples
-    --------
-    >>> from hmmlearn.hmm import ExponentialHMM
-    >>> ExponentialHMM(n_states=2)
-    ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
-    ExponentialHMM(algorithm='viterbi',...
-
-    See Also
-    --------
-    GaussianHMM : HMM with Gaussian emissions
+                 init_params=string.ascii_letters, verbose=0,
+                 aggregation_depth=2, checkpoint=False,
+                 init_sample_budget=10000):
+        hmm.PoissonHMM.__init__(self, n_states, startprob, transmat,
+                                startprob_prior, transmat_prior, rates_var,
+                                algorithm, random_state, n_iter, thresh,
+                                params, init_params, verbose)
+        self.aggregation_depth = aggregation_depth
+        self.checkpoint = checkpoint
+        self.init_sample_budget = init_sample_budget
+
+
+class ExponentialHMM(_SparkInputCheckMixin, _SparkHMMMixin,
+                     hmm.ExponentialHMM):
+    """Hidden Markov Model with Exponential (continuous) emissions, fitted
+    on an RDD.
+
+    See :class:`hmmlearn.hmm.ExponentialHMM` for the model and the other
+    parameters, and :class:`GaussianHMM` for the Spark ones.
     """
 
     def __init__(self, n_states=1, startprob=None, transmat=None,
@@ -1544,200 +844,26 @@ class ExponentialHMM(_BaseHMM):
                  rates_var=1.0, algorithm="viterbi",
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
-                 init_params=string.ascii_letters, verbose=0):
-        """Create a hidden Markov model with multinomial emissions.
-
-        Parameters
-        ----------
-        n_states : int
-            Number of states.
-        """
-        _BaseHMM.__init__(self, n_states, startprob, transmat,
-                          startprob_prior=startprob_prior,
-                          transmat_prior=transmat_prior,
-                          algorithm=algorithm,
-                          random_state=random_state,
-                          n_iter=n_iter,
-                          thresh=thresh,
-                          params=params,
-                          init_params=init_params,
-                          verbose=verbose)
-        self.rates_var = rates_var
-
-    def _get_rates(self):
-        """Emission rate for each state."""
-        return self._rates
-
-    def _set_rates(self, rates):
-        rates = np.asarray(rates)
-        self._rates = rates.copy()
-
-    rates_ = property(_get_rates, _set_rates)
-
-    def _compute_log_likelihood(self, obs):
-        return log_exponential_density(obs, self._rates)
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        return expon.rvs(scale=1. / self._rates[state])
-
-    def _init(self, obs, params='str'):
-        super(ExponentialHMM, self)._init(obs, params=params)
-
-        concat_obs = np.array(obs
-                              .flatMap(identity)
-                              .sample(False, 0.01)
-                              .collect())
-        if 'r' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                np.atleast_2d(concat_obs).T)
-            rates = normal(0, self.rates_var, self.n_states) + \
-                1. / clu.cluster_centers_.T[0]
-            self._rates = np.maximum(0.1, rates)
-
-    def _initialize_sufficient_statistics(self):
-        stats = super(ExponentialHMM, self)._initialize_sufficient_statistics()
-        stats['post'] = np.zeros(self.n_states)
-        stats['obs'] = np.zeros((self.n_states,))
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        super(ExponentialHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice,
-            params)
-
-        if 'r' in params:
-            stats['post'] += posteriors.sum(axis=0)
-            stats['obs'] += np.dot(posteriors.T, obs)
-
-    def _do_mstep(self, stats, params):
-        super(ExponentialHMM, self)._do_mstep(stats, params)
-
-        if 'r' in params:
-            self._rates = stats['post'] / stats['obs']
-
-    def _check_input_symbols(self, obs):
-        """check if input can be used for ExponentialHMM. Input must be a list
-        of non-negative reals.
-        e.g. x = [0., 0.5, 2.3] is OK and y = [0.0, -1.0, 3.3, 5.4, 10.9] not
-        """
-
-        symbols = obs.copy()
-        if symbols.dtype.kind not in ('f', 'i'):
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        return True
-
-    def _n_free_parameters(self):
-        n_pars = (self.n_states - 1) * (self.n_states + 1)
-        n_pars += self.n_states
-        return n_pars
-
-    def fit(self, sc, data, warm_start=False):
-        """Estimate model parameters.
-
-        An initialization step is performed before entering the EM
-        algorithm. If you want to avoid this step, pass proper
-        ``init_params`` keyword argument to estimator's constructor.
-
-        Parameters
-        ----------
-        obs : list
-            List of array-like observation sequences, each of which
-            has shape (n_i, n_features), where n_i is the length of
-            the i_th observation. Alternatively, a list of strings,
-            each of which is a filepath to a pickled object, being
-            a list of array-like observation sequences.
-
-        Notes
-        -----
-        In general, `logprob` should be non-decreasing unless
-        aggressive pruning is used.  Decreasing `logprob` is generally
-        a sign of overfitting (e.g. the covariance parameter on one or
-        more components becomminging too small).  You can fix this by getting
-        more training data, or increasing covars_prior.
-        """
-        err_msg = ("Input must be a list of non-negative real arrays, \
-                   but %s was given.")
-
-        modelBroadcast = sc.broadcast(self)
-
-        if not data.map(lambda x: modelBroadcast.value._check_input_symbols(x)).min():
-            raise ValueError(err_msg % data.take(5))
-
-        return super(ExponentialHMM, self).fit(sc, data, warm_start)
-
-
-class MultinomialExponentialHMM(_BaseHMM):
-    """Hidden Markov Model with joint multinomial and exponential emissions
-
-    Attributes
-    ----------
-    n_states : int
-        Number of states in the model.
-
-    n_symbols : int
-        Number of possible symbols emitted by the model (in the observations).
-
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
-
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
-
-    emissionprob : array, shape ('n_states`, 'n_symbols`)
-        Probability of emitting a given symbol when in each state.
-
-    rates : array, shape ('n_states`,)
-        Exponential rate parameters for each state.
-
-    random_state: RandomState or an int seed (0 by default)
-        A random number generator instance
-
-    n_iter : int, optional
-        Number of iterations to perform.
-
-    thresh : float, optional
-        Convergence threshold.
-
-    params : string, optional
-        Controls which parameters are updated in the training
-        process.  Can contain any combination of 's' for startprob,
-        't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    init_params : string, optional
-        Controls which parameters are initialized prior to
-        training.  Can contain any combination of 's' for
-        startprob, 't' for transmat, 'e' for emmissionprob.
-        Defaults to all parameters.
-
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
-
-    Examples
-    --------
-    >>> from hmmlearn.hmm import MultinomialHMM
-    >>> MultinomialHMM(n_states=2)
-    ...                             #doctest: +ELLIPSIS +NORMALIZE_WHITESPACE
-    MultinomialHMM(algorithm='viterbi',...
-
-    See Also
-    --------
-    GaussianHMM : HMM with Gaussian emissions
+                 init_params=string.ascii_letters, verbose=0,
+                 aggregation_depth=2, checkpoint=False,
+                 init_sample_budget=10000):
+        hmm.ExponentialHMM.__init__(self, n_states, startprob, transmat,
+                                    startprob_prior, transmat_prior,
+                                    rates_var, algorithm, random_state,
+                                    n_iter, thresh, params, init_params,
+                                    verbose)
+        self.aggregation_depth = aggregation_depth
+        self.checkpoint = checkpoint
+        self.init_sample_budget = init_sample_budget
+
+
+class MultinomialExponentialHMM(_SparkHMMMixin,
+                                hmm.MultinomialExponentialHMM):
+    """Hidden Markov Model with joint multinomial and exponential
+    emissions, fitted on an RDD.
+
+    See :class:`hmmlearn.hmm.MultinomialExponentialHMM` for the model and
+    the other parameters, and :class:`GaussianHMM` for the Spark ones.
     """
 
     def __init__(self, n_states=1, startprob=None, transmat=None,
@@ -1745,262 +871,25 @@ class MultinomialExponentialHMM(_BaseHMM):
                  emissionprob_prior=None, rates_var=1.0, algorithm="viterbi",
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters, init_params=string.ascii_letters,
-                 verbose=0):
-        """Create a hidden Markov model with multinomial emissions.
-
-        Parameters
-        ----------
-        n_states : int
-            Number of states.
-        """
-        _BaseHMM.__init__(self, n_states, startprob, transmat,
-                          startprob_prior=startprob_prior,
-                          transmat_prior=transmat_prior,
-                          algorithm=algorithm,
-                          random_state=random_state,
-                          n_iter=n_iter,
-                          thresh=thresh,
-                          params=params,
-                          init_params=init_params,
-                          verbose=verbose)
-
-        self.emissionprob_prior = emissionprob_prior
-        self.rates_var = rates_var
-
-    def _get_emissionprob(self):
-        """Emission probability distribution for each state."""
-        return np.exp(self._log_emissionprob)
-
-    def _set_emissionprob(self, emissionprob):
-        emissionprob = np.asarray(emissionprob)
-        if hasattr(self, 'n_symbols') and \
-                emissionprob.shape != (self.n_states, self.n_symbols):
-            raise ValueError('emissionprob must have shape '
-                             '(n_states, n_symbols)')
-
-        # check if there exists a component whose value is exactly zero
-        # if so, add a small number and re-normalize
-        if not np.alltrue(emissionprob):
-            normalize(emissionprob)
-
-        self._log_emissionprob = np.log(emissionprob)
-        underflow_idx = np.isnan(self._log_emissionprob)
-        self._log_emissionprob[underflow_idx] = NEGINF
-        self.n_symbols = self._log_emissionprob.shape[1]
-
-    emissionprob_ = property(_get_emissionprob, _set_emissionprob)
-
-    def _get_rates(self):
-        """Emission rate for each state."""
-        return self._rates
-
-    def _set_rates(self, rates):
-        rates = np.asarray(rates)
-        self._rates = rates.copy()
-
-    rates_ = property(_get_rates, _set_rates)
-
-    def _compute_log_likelihood(self, obs):
-        return self._log_emissionprob[:, map(int, obs[:, 0])].T + \
-            log_exponential_density(obs[:, 1], self._rates)
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        cdf = np.cumsum(self.emissionprob_[state, :])
-        random_state = check_random_state(random_state)
-        rand = random_state.rand()
-        symbol = (cdf > rand).argmax()
-        expon_obs = expon.rvs(scale=1. / self._rates[state])
-        return symbol, expon_obs
-
-    def _init(self, obs, params='ster'):
-        super(MultinomialExponentialHMM, self)._init(obs, params=params)
-        self.random_state = check_random_state(self.random_state)
-
-        if 'e' in params:
-            if not hasattr(self, 'n_symbols'):
-                symbols = set(obs.flatMap(identity).distinct().collect())
-                self.n_symbols = len(symbols)
-            if self.emissionprob_prior is None:
-                self.emissionprob_prior = np.ones((self.n_states,
-                                                   self.n_symbols))
-            emissionprob = np.vstack([np.random.dirichlet(
-                self.emissionprob_prior[i])
-                for i in xrange(self.n_states)])
-            self.emissionprob_ = emissionprob
-
-        concat_obs = obs.flatMap(lambda seq: seq[:, 1]).sample(False, 0.01).collect()
-        if 'r' in params:
-            clu = cluster.KMeans(n_clusters=self.n_states).fit(
-                np.atleast_2d(concat_obs).T)
-            rates = normal(0, self.rates_var, self.n_states) + \
-                1. / clu.cluster_centers_.T[0]
-            self._rates = np.maximum(0.1, rates)
-
-    def _initialize_sufficient_statistics(self):
-        stats = super(MultinomialExponentialHMM,
-                      self)._initialize_sufficient_statistics()
-        stats['obs'] = np.zeros((self.n_states, self.n_symbols))
-        stats['post'] = np.zeros(self.n_states)
-        stats['expon_obs'] = np.zeros((self.n_states,))
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        super(MultinomialExponentialHMM,
-              self)._accumulate_sufficient_statistics(stats,
-                                                      obs,
-                                                      framelogprob,
-                                                      posteriors,
-                                                      fwdlattice,
-                                                      bwdlattice,
-                                                      params)
-        if 'e' in params:
-            for t, symbol in enumerate(obs[:, 0]):
-                stats['obs'][:, int(symbol)] += posteriors[t]
-        if 'r' in params:
-            stats['post'] += posteriors.sum(axis=0)
-            stats['expon_obs'] += np.dot(posteriors.T, obs[:, 1])
-
-    def _do_mstep(self, stats, params):
-        super(MultinomialExponentialHMM, self)._do_mstep(stats, params)
-        if 'e' in params:
-            self.emissionprob_ = (stats['obs']
-                                  / stats['obs'].sum(1)[:, np.newaxis])
-        if 'r' in params:
-            self._rates = stats['post'] / stats['expon_obs']
-
-    def _check_input_symbols(self, obs):
-        """check if input can be used for Multinomial.fit input must be both
-        positive integer array and every element must be continuous.
-        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not
-        """
-
-        symbols = obs[:, 0]
-
-        if symbols.dtype.kind not in ('i', 'f'):
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        symbols = obs[:, 1]
-        if symbols.dtype.kind not in ('f', 'i'):
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        return True
-
-    def _n_free_parameters(self):
-        n_pars = (self.n_states - 1) * (self.n_states + 1)
-        n_pars += self.n_states * (self.n_symbols - 1)
-        n_pars += self.n_states
-        return n_pars
-
-    def fit(self, sc, data, warm_start=False, **kwargs):
-        """Estimate model parameters.
-
-        An initialization step is performed before entering the EM
-        algorithm. If you want to avoid this step, pass proper
-        ``init_params`` keyword argument to estimator's constructor.
-
-        Parameters
-        ----------
-        obs : list
-            List of array-like observation sequences, each of which
-            has shape (n_i, n_features), where n_i is the length of
-            the i_th observation. Alternatively, a list of strings,
-            each of which is a filepath to a pickled object, being
-            a list of array-like observation sequences.
-        """
-        err_msg = ("Input must be a list of non-negative integer arrays where "
-                   "in all, every element must be continuous, but %s was "
-                   "given.")
-
-        modelBroadcast = sc.broadcast(self)
-
-        cleaned_data = data.map(lambda seq: np.array(seq))
-
-        if not cleaned_data.map(lambda seq: modelBroadcast.value._check_input_symbols(seq)).min():
-            raise ValueError(err_msg % cleaned_data.take(5))
-        elif np.any(np.diff(cleaned_data.flatMap(lambda seq: seq[:, 0]).distinct().sortBy(identity).collect()) > 1):
-            raise ValueError(err_msg % cleaned_data.take(5))
-
-        return super(MultinomialExponentialHMM, self).fit(sc, cleaned_data, warm_start, **kwargs)
-
-
-class GMMHMM(_BaseHMM):
-    """Hidden Markov Model with Gaussin mixture emissions
-
-    Attributes
-    ----------
-    init_params : string, optional
-        Controls which parameters are initialized prior to training. Can
-        contain any combination of 's' for startprob, 't' for transmat, 'm'
-        for means, 'c' for covars, and 'w' for GMM mixing weights.
-        Defaults to all parameters.
-
-    params : string, optional
-        Controls which parameters are updated in the training process.  Can
-        contain any combination of 's' for startprob, 't' for transmat, 'm' for
-        means, and 'c' for covars, and 'w' for GMM mixing weights.
-        Defaults to all parameters.
-
-    n_states : int
-        Number of states in the model.
-
-    transmat : array, shape (`n_states`, `n_states`)
-        Matrix of transition probabilities between states.
-
-    startprob : array, shape ('n_states`,)
-        Initial state occupation distribution.
-
-    gmms : array of GMM objects, length `n_states`
-        GMM emission distributions for each state.
-
-    random_state : RandomState or an int seed (0 by default)
-        A random number generator instance
-
-    n_iter : int, optional
-        Number of iterations to perform.
-
-    thresh : float, optional
-        Convergence threshold.
-
-    verbose : int, default: 0
-        Enable verbose output. If 1 then it prints progress and performance
-        once in a while (the more iterations the lower the frequency). If
-        greater than 1 then it prints progress and performance for every
-        iteration.
-
-    var : float, default: 1.0
-        Variance parameter to randomize the initialization of the GMM objects.
-        The larger var, the greater the randomization.
-
-    Examples
-    --------
-    >>> from hmmlearn.hmm import GMMHMM
-    >>> GMMHMM(n_states=2, n_mix=10, covariance_type='diag')
-    ... # doctest: +ELLIPSIS, +NORMALIZE_WHITESPACE
-    GMMHMM(algorithm='viterbi', covariance_type='diag',...
-
-    See Also
-    --------
-    GaussianHMM : HMM with Gaussian emissions
+                 verbose=0,
+                 aggregation_depth=2, checkpoint=False,
+                 init_sample_budget=10000):
+        hmm.MultinomialExponentialHMM.__init__(
+            self, n_states, startprob, transmat, startprob_prior,
+            transmat_prior, emissionprob_prior, rates_var, algorithm,
+            random_state, n_iter, thresh, params, init_params, verbose)
+        self.aggregation_depth = aggregation_depth
+        self.checkpoint = checkpoint
+        self.init_sample_budget = init_sample_budget
+
+
+class GMMHMM(_SparkHMMMixin, hmm.GMMHMM):
+    """Hidden Markov Model with Gaussian mixture emissions, fitted on an
+    RDD.
+
+    See :class:`hmmlearn.hmm.GMMHMM` for the model and the other
+    parameters, and :class:`GaussianHMM` for the Spark ones. The mixtures
+    are initialized from a sample of ``init_sample_budget`` frames.
     """
 
     def __init__(self, n_states=1, n_mix=1, startprob=None, transmat=None,
@@ -2009,164 +898,14 @@ class GMMHMM(_BaseHMM):
                  covars_prior=1e-2, random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
-                 verbose=0, means_var=1.0):
-        """Create a hidden Markov model with GMM emissions.
-
-        Parameters
-        ----------
-        n_states : int
-            Number of states.
-        """
-        _BaseHMM.__init__(self, n_states, startprob, transmat,
-                          startprob_prior=startprob_prior,
-                          transmat_prior=transmat_prior,
-                          algorithm=algorithm,
-                          random_state=random_state,
-                          n_iter=n_iter,
-                          thresh=thresh,
-                          params=params,
-                          init_params=init_params,
-                          verbose=verbose)
-
-        # XXX: Hotfit for n_mix that is incompatible with the scikit's
-        # BaseEstimator API
-        self.n_mix = n_mix
-        self._covariance_type = covariance_type
-        self.covars_prior = covars_prior
-        self.gmms = gmms
-        if gmms is None:
-            gmms = []
-            for x in range(self.n_states):
-                if covariance_type is None:
-                    g = GMM(n_mix)
-                else:
-                    g = GMM(n_mix, covariance_type=covariance_type)
-                gmms.append(g)
-        self.gmms_ = gmms
-        self.means_var = means_var
-
-    # Read-only properties.
-    @property
-    def covariance_type(self):
-        """Covariance type of the model.
-
-        Must be one of 'spherical', 'tied', 'diag', 'full'.
-        """
-        return self._covariance_type
-
-    def _compute_log_likelihood(self, obs):
-        return np.array([g.score(obs) for g in self.gmms_]).T
-
-    def _generate_sample_from_state(self, state, random_state=None):
-        return self.gmms_[state].sample(1, random_state=random_state).flatten()
-
-    def _init(self, obs, params='stwmc'):
-        super(GMMHMM, self)._init(obs, params=params)
-
-        concat_obs = np.vstack(obs
-                               .flatMap(lambda x: x)
-                               .sample(False, 0.01)
-                               .map(np.atleast_2d)
-                               .collect())
-        n_features = concat_obs.shape[1]
-
-        for g in self.gmms_:
-            g.set_params(init_params=params, n_iter=0)
-            g.fit(concat_obs)
-            means = np.array([multivariate_normal(
-                mean,
-                np.eye(n_features) * self.means_var)
-                for mean in g.means_])
-            g.means_ = means
-
-    def _initialize_sufficient_statistics(self):
-        stats = super(GMMHMM, self)._initialize_sufficient_statistics()
-        stats['norm'] = [np.zeros(g.weights_.shape) for g in self.gmms_]
-        stats['means'] = [np.zeros(np.shape(g.means_)) for g in self.gmms_]
-        stats['covars'] = [np.zeros(np.shape(g.covars_)) for g in self.gmms_]
-        return stats
-
-    def _accumulate_sufficient_statistics(self, stats, obs, framelogprob,
-                                          posteriors, fwdlattice, bwdlattice,
-                                          params):
-        super(GMMHMM, self)._accumulate_sufficient_statistics(
-            stats, obs, framelogprob, posteriors, fwdlattice, bwdlattice,
-            params)
-
-        for state, g in enumerate(self.gmms_):
-            _, tmp_gmm_posteriors = g.score_samples(obs)
-            lgmm_posteriors = np.log(tmp_gmm_posteriors
-                                     + np.finfo(np.float).eps) + \
-                np.log(posteriors[:, state][:, np.newaxis]
-                       + np.finfo(np.float).eps)
-            gmm_posteriors = np.exp(lgmm_posteriors)
-            tmp_gmm = GMM(g.n_components, covariance_type=g.covariance_type)
-            n_features = g.means_.shape[1]
-            tmp_gmm._set_covars(
-                distribute_covar_matrix_to_match_covariance_type(
-                    np.eye(n_features), g.covariance_type,
-                    g.n_components))
-            norm = tmp_gmm._do_mstep(obs, gmm_posteriors, params)
-
-            if np.any(np.isnan(tmp_gmm.covars_)):
-                raise ValueError
-
-            stats['norm'][state] += norm
-            if 'm' in params:
-                stats['means'][state] += tmp_gmm.means_ * norm[:, np.newaxis]
-            if 'c' in params:
-                if tmp_gmm.covariance_type == 'tied':
-                    stats['covars'][state] += tmp_gmm.covars_ * norm.sum()
-                else:
-                    cvnorm = np.copy(norm)
-                    shape = np.ones(tmp_gmm.covars_.ndim)
-                    shape[0] = np.shape(tmp_gmm.covars_)[0]
-                    cvnorm.shape = shape
-                    stats['covars'][state] += tmp_gmm.covars_ * cvnorm
-
-    def _do_mstep(self, stats, params):
-        super(GMMHMM, self)._do_mstep(stats, params)
-        # All that is left to do is to apply covars_prior to the
-        # parameters updated in _accumulate_sufficient_statistics.
-        for state, g in enumerate(self.gmms_):
-            n_features = g.means_.shape[1]
-            norm = stats['norm'][state]
-            if 'w' in params:
-                g.weights_ = normalize(norm)
-            if 'm' in params:
-                g.means_ = stats['means'][state] / norm[:, np.newaxis]
-            if 'c' in params:
-                if g.covariance_type == 'tied':
-                    g.covars_ = ((stats['covars'][state]
-                                 + self.covars_prior * np.eye(n_features))
-                                 / norm.sum())
-                else:
-                    cvnorm = np.copy(norm)
-                    shape = np.ones(g.covars_.ndim)
-                    shape[0] = np.shape(g.covars_)[0]
-                    cvnorm.shape = shape
-                    if (g.covariance_type in ['spherical', 'diag']):
-                        g.covars_ = (stats['covars'][state] +
-                                     self.covars_prior) / cvnorm
-                    elif g.covariance_type == 'full':
-                        eye = np.eye(n_features)
-                        g.covars_ = ((stats['covars'][state]
-                                     + self.covars_prior * eye[np.newaxis])
-                                     / cvnorm)
-
-    def _n_free_parameters(self):
-        n_pars = (self.n_states - 1) * (self.n_states + 1)
-        for g in self.gmms_:
-            n_components = g.means_.shape[0]
-            n_features = g.means_.shape[1]
-            n_pars += n_components - 1
-            n_pars += n_components * n_features
-            if g.covariance_type == 'spherical':
-                n_pars += n_components
-            elif g.covariance_type == 'tied':
-                n_pars += ((n_features + 1) * n_features) / 2
-            elif g.covariance_type == 'diag':
-                n_pars += n_components * n_features
-            elif g.covariance_type == 'full':
-                n_pars += n_components * ((n_features + 1) * n_features) / 2
-        return n_pars
+                 verbose=0, means_var=1.0,
+                 aggregation_depth=2, checkpoint=False,
+                 init_sample_budget=10000):
+        hmm.GMMHMM.__init__(self, n_states, n_mix, startprob, transmat,
+                            startprob_prior, transmat_prior, algorithm, gmms,
+                            covariance_type, covars_prior, random_state,
+                            n_iter, thresh, params, init_params, verbose,
+                            means_var)
+        self.aggregation_depth = aggregation_depth
+        self.checkpoint = checkpoint
+        self.init_sample_budget = init_sample_budget
@@ -7,13 +7,13 @@ The :mod:`hmmlearn.mixhmm` module implements mixtures of
 hidden Markov models.
 """
 
+import operator
 import string
+from functools import reduce
 import _pickle as cPickle
 
 import numpy as np
-import multiprocessing as mp
 
-from copy import deepcopy
 from sklearn.utils import check_random_state
 from sklearn.utils.extmath import logsumexp
 from sklearn.base import BaseEstimator
@@ -21,9 +21,15 @@ from sklearn.base import BaseEstimator
 from .hmm import (GaussianHMM, MultinomialHMM,
                   PoissonHMM, ExponentialHMM,
                   MultinomialExponentialHMM, VerboseReporter,
-                  randomize, normalize, log_normalize, batches)
+                  randomize, normalize, log_normalize, batches,
+                  fill_per_sequence, LatticeWorkspace, FrameStream,
+                  load_batch, iter_framelogprob, merge_estep_results,
+                  symbol_summary, summarize_symbols, merge_symbol_summaries,
+                  summarize_symbol_values, check_symbol_summary,
+                  unwrap_self_summarize_symbols, _TrainingScoreMixin)
 
 from . import _hmmc
+from .executors import SerialExecutor, executor_scope
 
 __all__ = ['MultinomialMixHMM']
 
@@ -41,7 +47,11 @@ def unwrap_self_score(arg, **kwarg):
     return _BaseMixHMM._score(*arg, **kwarg)
 
 
-class _BaseMixHMM(BaseEstimator):
+def unwrap_self_score_per_sequence(arg, **kwarg):
+    return _BaseMixHMM._score_per_sequence(*arg, **kwarg)
+
+
+class _BaseMixHMM(_TrainingScoreMixin, BaseEstimator):
     """Hidden Markov Model base class.
 
     Representation of a mixture of hidden Markov models.
@@ -102,12 +112,34 @@ class _BaseMixHMM(BaseEstimator):
         greater than 1 then it prints progress and performance for every
         iteration.
 
+    n_jobs : int, default: 1
+        Number of workers the batches of sequences are spread over.
+
+    backend : string or Executor, optional
+        Where the batches run, one of "serial", "thread" or "process", or
+        an executor from :mod:`hmmlearn.executors` (e.g. a SparkExecutor).
+        Defaults to serial when ``n_jobs == 1`` and processes otherwise.
+
+    prune_threshold : float, optional
+        Responsibility below which a component is skipped for a sequence
+        in the E-step: its forward pass is run to get the responsibility,
+        but not its backward pass nor its statistics. Defaults to None,
+        which runs every component on every sequence.
+
+    prune_refresh : int, default: 5
+        With ``prune_threshold`` set, every ``prune_refresh``-th iteration
+        (the first one included) runs a full E-step on all the components.
+
 
     See Also
     --------
     GMM : Gaussian mixture model
     """
 
+    # Names of the emission parameters of the component HMMs, used to
+    # detect tied emissions.
+    _emission_attrs = ()
+
     # This class implements the public interface to all HMMs that
     # derive from it, including all of the machinery for the
     # forward-backward and Viterbi algorithms.  Subclasses need only
@@ -124,7 +156,8 @@ class _BaseMixHMM(BaseEstimator):
                  random_state=None, n_iter=10, thresh=1e-2,
                  params=string.ascii_letters,
                  init_params=string.ascii_letters, verbose=0,
-                 tied=True, n_jobs=1, batch_size=1, memory_safe=False):
+                 tied=True, n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, prune_threshold=None, prune_refresh=5):
 
         self.n_components = n_components
         self.n_states = n_states
@@ -143,6 +176,12 @@ class _BaseMixHMM(BaseEstimator):
         self.n_jobs = n_jobs
         self.batch_size = batch_size
         self.memory_safe = memory_safe
+        self.backend = backend
+        self.prune_threshold = prune_threshold
+        self.prune_refresh = prune_refresh
+
+    def _executor_scope(self):
+        return executor_scope(self.backend, self.n_jobs)
 
     def score_samples(self, obs):
         """Return the per-sequence likelihood of the data under the model.
@@ -166,17 +205,7 @@ class _BaseMixHMM(BaseEstimator):
             Posterior probabilities of each mixture component for each
             observation.
         """
-        n_sequences = len(obs)
-        logprob = np.zeros(n_sequences)
-        responsibilities = np.zeros((n_sequences, self.n_components))
-        for i, seq in enumerate(obs):
-            framelogprob = self._compute_log_likelihood(seq)
-            posteriors = np.array([self.hmms[k]._do_forward_pass(
-                framelogprob[:, :, k])[0]
-                for k in range(self.n_components)])
-            posteriors += self._log_component_weights
-            logprob[i] = logsumexp(posteriors)
-            responsibilities[i, :] = log_normalize(posteriors, 0)
+        logprob, responsibilities = self._score_samples(obs)
         return sum(logprob), responsibilities
 
     def score(self, obs):
@@ -198,20 +227,51 @@ class _BaseMixHMM(BaseEstimator):
         score_samples : Compute the log probability under the model and
             posteriors
         """
-        n_batches = (len(obs) // self.batch_size) + \
-            (1 if len(obs) % self.batch_size else 0)
-        if self.n_jobs == 1:
-            logprob = 0
-            for obs_batch in batches(obs, self.batch_size):
-                logprob += self._score(obs_batch)
-        else:
-            pool = mp.Pool(processes=self.n_jobs)
-            results = pool.map(unwrap_self_score,
-                               zip([self] * n_batches,
-                                   batches(obs, self.batch_size)))
-            pool.terminate()
-            logprob = sum(results)
-        return logprob
+        with self._executor_scope() as executor:
+            return executor.aggregate_batches(unwrap_self_score, self, obs,
+                                              self.batch_size, 0,
+                                              operator.add)
+
+    def score_per_sequence(self, obs, out=None):
+        """Compute the log probability of each sequence under the model.
+
+        Parameters
+        ----------
+        obs : list (n_sequences)
+            List of sequences. Each sequence represents a hidden state
+            sequence from one of the mixture's HMM components.
+
+        out : array_like or string, optional
+            Preallocated float64 array (or ``np.memmap``) of length
+            ``len(obs)`` to write the log probabilities into. If a string
+            is given, the results are streamed into a new float64
+            ``np.memmap`` stored at that path. When ``memory_safe`` is
+            set, ``out`` must hold one entry per sequence of all the
+            pickled files.
+
+        Returns
+        -------
+        logprobs : array_like, shape (n_sequences,)
+            Log likelihood of each sequence in ``obs``.
+
+        See Also
+        --------
+        score : Compute the log probability under the model
+        """
+        if isinstance(out, str):
+            if self.memory_safe:
+                raise ValueError("The number of sequences is unknown when "
+                                 "memory safe, preallocate out instead.")
+            out = np.memmap(out, dtype=np.float64, mode='w+',
+                            shape=(len(obs),))
+        elif out is None and not self.memory_safe:
+            out = np.empty(len(obs))
+
+        with self._executor_scope() as executor:
+            return fill_per_sequence(
+                executor.imap(unwrap_self_score_per_sequence,
+                              ((self, obs_batch) for obs_batch
+                               in batches(obs, self.batch_size))), out)
 
     def aic(self, obs):
         """Computes the Aikaike Information Criterion of the model and
@@ -226,11 +286,16 @@ class _BaseMixHMM(BaseEstimator):
         -------
         aic_score : float
             The Aikaike Information Criterion.
+
+        Notes
+        -----
+        On the training set of the last fit, the log probability that fit
+        computed is reused instead of scoring the data again. The training
+        set is recognized by identity, pass a copy of sequences changed in
+        place since.
         """
-        logprob = self.score(obs)
-        n_pars = self._n_free_parameters()
-        aic_score = 2 * n_pars - 2 * logprob
-        return aic_score
+        logprob, _ = self._training_score(obs)
+        return self._aic(logprob)
 
     def bic(self, obs):
         """Computes the Aikaike Information Criterion of the model and
@@ -246,11 +311,16 @@ class _BaseMixHMM(BaseEstimator):
         bic_score : float
             The Aikaike Information Criterion.
         """
-        logprob = self.score(obs)
+        logprob, n_data = self._training_score(obs)
+        return self._bic(logprob, n_data)
+
+    def _aic(self, logprob):
         n_pars = self._n_free_parameters()
-        n_data = sum([len(seq) for seq in obs])
-        bic_score = n_pars * (np.log(n_data) - np.log(2 * np.pi)) - 2 * logprob
-        return bic_score
+        return 2 * n_pars - 2 * logprob
+
+    def _bic(self, logprob, n_data):
+        n_pars = self._n_free_parameters()
+        return n_pars * (np.log(n_data) - np.log(2 * np.pi)) - 2 * logprob
 
     def predict(self, obs):
         """Predict component label for observation sequences.
@@ -288,7 +358,8 @@ class _BaseMixHMM(BaseEstimator):
         logprob, responsibilities = self.score_samples(obs)
         return responsibilities
 
-    def sample(self, n_seq=1, n_min=10, n_max=20, random_state=None):
+    def sample(self, n_seq=1, n_min=10, n_max=20, random_state=None,
+               concatenate=False):
         """Generate random samples from the model.
 
         Parameters
@@ -296,18 +367,29 @@ class _BaseMixHMM(BaseEstimator):
         n_seq : int
             Number of sequences to generate.
 
-        n : int
-            Number of samples to generate.
+        n_min : int
+            Minimum number of observations for a sequence.
+
+        n_max : int
+            Maximum number of observations for a sequence.
 
         random_state: RandomState or an int seed (0 by default)
             A random number generator instance. If None is given, the
             object's random_state is used
 
+        concatenate : bool, optional
+            If True, return the observations and states as single
+            concatenated arrays together with the sequence offsets
+            instead of lists of arrays.
+
         Returns
         -------
-        (obs, states)
+        (components, obs, states) or (components, obs, states, offsets)
+        components : array_like, shape (`n_seq`,) Component of each sequence
         obs : array_like, length `n_seq` List of observations sequences
         states : array_like, length `n_seq` List of state sequences
+        offsets : array_like, shape (`n_seq` + 1,) Start of each sequence
+            in the concatenated arrays, only returned if ``concatenate``
         """
         if random_state is None:
             random_state = self.random_state
@@ -316,27 +398,39 @@ class _BaseMixHMM(BaseEstimator):
         component_weights_pdf = self.component_weights_
         component_weights_cdf = np.cumsum(component_weights_pdf)
 
-        components = []
-        obs = []
-        states = []
-        for _ in range(n_seq):
-            rand = random_state.rand()
-            currcomponent = (component_weights_cdf > rand).argmax()
-            components.append(currcomponent)
-
-            n = np.random.randint(n_min, n_max)
-            obs_seq, state_seq = self.hmms[currcomponent].sample(
-                n_seq=1,
-                n_min=n,
-                n_max=(n + 1),
+        # Draw all the component labels and lengths up front, then
+        # generate the sequences of each component in a single call.
+        rand = random_state.rand(n_seq)
+        components = (component_weights_cdf
+                      > rand[:, np.newaxis]).argmax(1)
+        lengths = random_state.randint(n_min, n_max, size=n_seq)
+
+        obs = [None] * n_seq
+        states = [None] * n_seq
+        for k in np.unique(components):
+            idx = np.flatnonzero(components == k)
+            obs_k, states_k = self.hmms[k].sample(
+                lengths=lengths[idx],
                 random_state=random_state)
-
-            obs.append(deepcopy(obs_seq[0]))
-            states.append(deepcopy(state_seq[0]))
-
-        return np.array(components), obs, states
-
-    def fit(self, obs, warm_start=False):
+            for i, obs_seq, state_seq in zip(idx, obs_k, states_k):
+                obs[i] = obs_seq
+                states[i] = state_seq
+
+        if concatenate:
+            offsets = np.zeros(n_seq + 1, dtype=int)
+            np.cumsum(lengths, out=offsets[1:])
+            if n_seq == 0:
+                # No sequence to concatenate; keep the emission dtype and
+                # feature shape of the components.
+                states = np.zeros(0, dtype=int)
+                return components, \
+                    self.hmms[0]._generate_samples_from_states(
+                        states, random_state=random_state), states, offsets
+            return components, np.concatenate(obs), np.concatenate(states), \
+                offsets
+        return components, obs, states
+
+    def fit(self, obs, warm_start=False, assignment="soft", anneal_iter=0):
         """Estimate model parameters.
 
         An initialization step is performed before entering the EM
@@ -350,6 +444,22 @@ class _BaseMixHMM(BaseEstimator):
             has shape (n_i, n_features), where n_i is the length of
             the i_th observation.
 
+        warm_start : bool, optional
+            Start from the current parameters instead of initializing
+            them.
+
+        assignment : string, one of "soft" or "hard"
+            How sequences are assigned to the components in the E-step.
+            "soft" weighs the statistics of every component by its
+            responsibility. "hard" (classification EM) gives each sequence
+            to its most likely component only, so that the other
+            components skip their backward pass.
+
+        anneal_iter : int, optional
+            With hard assignments, number of first iterations over which
+            the responsibilities are sharpened from soft to hard, by
+            lowering their temperature linearly from 1 to 0.
+
         Notes
         -----
         In general, `logprob` should be non-decreasing unless
@@ -358,14 +468,28 @@ class _BaseMixHMM(BaseEstimator):
         small).  You can fix this by getting more training data,
         or strengthening the appropriate subclass-specific regularization
         parameter.
+
+        With the serial backend the forward and backward lattices of all
+        the sequences share one workspace, sized to the longest sequence.
+        Its peak size in bytes is stored in ``workspace_nbytes_``.
+
+        With ``prune_threshold`` set, the responsibility mass left out of
+        the statistics of each iteration, summed over the sequences, is
+        stored in ``pruned_mass_``.
+
+        The log probability of each iteration is stored in ``logprob_``,
+        the number of observations in ``n_data_``, and ``converged_``
+        tells whether ``thresh`` was met. ``aic`` and ``bic`` then reuse
+        them on the training set.
         """
 
         if self.memory_safe and (not isinstance(obs[0], str)):
             raise ValueError("Filepath locations must be provided as \
                              observations to be memory safe.")
 
-        n_batches = (len(obs) // self.batch_size) + \
-            (1 if len(obs) % self.batch_size else 0)
+        if assignment not in ("soft", "hard"):
+            raise ValueError("assignment must be 'soft' or 'hard', got %r"
+                             % (assignment,))
 
         if not warm_start:
             self._init(obs, self.init_params)
@@ -374,40 +498,51 @@ class _BaseMixHMM(BaseEstimator):
             verbose_reporter = VerboseReporter(self.verbose)
             verbose_reporter.init()
 
+        # The serial E-step reuses one workspace for all the sequences of
+        # all the iterations, each worker makes its own per batch.
+        workspace = LatticeWorkspace(self.n_states * self.n_components)
         logprob = []
-        for i in range(self.n_iter):
-            # Expectation step
-            if self.n_jobs == 1:
-                stats = self._initialize_sufficient_statistics()
-                logprob.append(0)
-                for obs_batch in batches(obs, self.batch_size):
-                    local_stats, lpr = self._do_estep(obs_batch)
-                    stats = self._merge_sum(stats, local_stats)
-                    logprob[-1] += lpr
-            else:
-                pool = mp.Pool(processes=self.n_jobs)
-                results = pool.map(unwrap_self_estep,
-                                   zip([self] * n_batches,
-                                       batches(obs, self.batch_size)))
-                pool.terminate()
-                stats = reduce(self._merge_sum,
-                               [x[0] for x in results],
-                               self._initialize_sufficient_statistics())
-                logprob.append(sum([x[1] for x in results]))
-            if i > 0:
-                improvement = logprob[-1] - logprob[-2]
-            else:
-                improvement = np.inf
-            if self.verbose:
-                verbose_reporter.update(i, logprob[-1], improvement)
+        n_data = None
+        self.pruned_mass_ = []
+        self.converged_ = False
+        with self._executor_scope() as executor, executor.sharing(self):
+            batch_workspace = workspace
+            if not isinstance(executor, SerialExecutor):
+                batch_workspace = None
+            for i in range(self.n_iter):
+                # Expectation step, pruned but on the refresh iterations.
+                prune_threshold = self.prune_threshold
+                if i % max(self.prune_refresh, 1) == 0:
+                    prune_threshold = None
+                temperature = 1.0
+                if assignment == "hard":
+                    temperature = max(1.0 - float(i) / anneal_iter, 0.0) \
+                        if anneal_iter else 0.0
+                stats, curr_logprob = executor.aggregate_batches(
+                    unwrap_self_estep, self, obs, self.batch_size,
+                    (self._initialize_sufficient_statistics(), 0),
+                    merge_estep_results,
+                    (batch_workspace, prune_threshold, temperature))
+                logprob.append(curr_logprob)
+                n_data = stats['nframes']
+                self.pruned_mass_.append(stats['pruned_mass'])
+                if i > 0:
+                    improvement = logprob[-1] - logprob[-2]
+                else:
+                    improvement = np.inf
+                if self.verbose:
+                    verbose_reporter.update(i, logprob[-1], improvement)
 
-            # Check for convergence.
-            if i > 0 and abs(logprob[-1] - logprob[-2]) < self.thresh:
-                break
+                # Check for convergence.
+                if i > 0 and abs(logprob[-1] - logprob[-2]) < self.thresh:
+                    self.converged_ = True
+                    break
 
-            # Maximization step
-            self._do_mstep(stats, self.params)
+                # Maximization step
+                self._do_mstep(stats, self.params)
 
+            self._remember_training_set(obs, logprob, executor, n_data)
+        self.workspace_nbytes_ = workspace.peak_nbytes
         return self
 
     def _get_component_weights(self):
@@ -440,6 +575,72 @@ class _BaseMixHMM(BaseEstimator):
         return np.array([self.hmms[i]._compute_log_likelihood(obs).T
                          for i in range(self.n_components)]).T
 
+    def _has_tied_emissions(self):
+        """Whether all the components share their emission parameters."""
+        if not self.tied or self.hmms is None or not self._emission_attrs:
+            return False
+        first = self.hmms[0]
+        for hmm in self.hmms[1:]:
+            for attr in self._emission_attrs:
+                if not np.array_equal(getattr(hmm, attr),
+                                      getattr(first, attr)):
+                    return False
+        return True
+
+    def _compute_component_log_likelihoods(self, obs, tied=False):
+        """Frame log likelihood of obs under each component.
+
+        Returns a list of n_components arrays of shape (n, n_states). With
+        tied emissions, they are computed once and the same array is
+        shared by all the components.
+        """
+        if tied:
+            return [self.hmms[0]._compute_log_likelihood(obs)] * \
+                self.n_components
+        return [hmm._compute_log_likelihood(obs) for hmm in self.hmms]
+
+    def _compute_stacked_log_likelihood(self, obs, tied=False):
+        """Frame log likelihood of obs under each component, as a
+        contiguous array of shape (n, n_states, n_components)."""
+        return np.ascontiguousarray(np.stack(
+            self._compute_component_log_likelihoods(obs, tied), axis=-1))
+
+    def _stacked_params(self):
+        """Start and transition log probabilities of the components, with
+        the component as last axis, as the stacked kernels expect."""
+        log_startprob = np.ascontiguousarray(np.stack(
+            [hmm._log_startprob for hmm in self.hmms], axis=-1))
+        log_transmat = np.ascontiguousarray(np.stack(
+            [hmm._log_transmat for hmm in self.hmms], axis=-1))
+        return log_startprob, log_transmat
+
+    def _do_stacked_forward_pass(self, framelogprob, stacked_params,
+                                 out=None, work_buffer=None):
+        """Forward pass of all the components at once.
+
+        Returns the log likelihood of the sequence under each component
+        and the stacked forward lattice.
+        """
+        n_observations, n_states, n_components = framelogprob.shape
+        if out is None:
+            out = np.zeros(framelogprob.shape)
+        log_startprob, log_transmat = stacked_params
+        _hmmc._forward_stacked(n_observations, n_states, n_components,
+                               log_startprob, log_transmat, framelogprob,
+                               out, work_buffer)
+        return logsumexp(out[-1], axis=0), out
+
+    def _do_stacked_backward_pass(self, framelogprob, stacked_params,
+                                  out=None, work_buffer=None):
+        n_observations, n_states, n_components = framelogprob.shape
+        if out is None:
+            out = np.zeros(framelogprob.shape)
+        log_startprob, log_transmat = stacked_params
+        _hmmc._backward_stacked(n_observations, n_states, n_components,
+                                log_startprob, log_transmat, framelogprob,
+                                out, work_buffer)
+        return out
+
     def _generate_sample_from_state(self, component, state, random_state=None):
         pass
 
@@ -448,12 +649,19 @@ class _BaseMixHMM(BaseEstimator):
             self.component_weights_ = np.random.dirichlet(
                 self.component_weights_prior)
 
+    def _new_hmm(self, **params):
+        """Create a component HMM, of class ``_hmm_class``."""
+        return self._hmm_class(self.n_states, memory_safe=self.memory_safe,
+                               **params)
+
     # Methods used by self.fit()
 
     def _initialize_sufficient_statistics(self):
         stats = {'component_weights': np.zeros(self.n_components),
                  'hmm_stats': [hmm._initialize_sufficient_statistics()
-                               for hmm in self.hmms]}
+                               for hmm in self.hmms],
+                 'pruned_mass': 0.0,
+                 'nframes': 0}
         return stats
 
     def _initialize_inner_sufficient_statistics(self):
@@ -472,13 +680,14 @@ class _BaseMixHMM(BaseEstimator):
             stats['start'][k] += posteriors[0]
             n_observations, n_states = framelogprob.shape
             if n_observations > 1:
-                lneta = np.zeros((n_observations - 1, n_states, n_states))
-                lnP = logsumexp(fwdlattice[-1])
-                _hmmc._compute_lneta(n_observations, n_states, fwdlattice,
-                                     self.hmms[k]._log_transmat, bwdlattice,
-                                     framelogprob, lnP, lneta)
-                stats['trans'][k] += np.exp(np.minimum(logsumexp(lneta, 0),
-                                                       700))
+                log_xi_sum = np.empty((n_states, n_states))
+                lnP = _hmmc._logsum(fwdlattice[-1])
+                _hmmc._compute_log_xi_sum(n_observations, n_states,
+                                          fwdlattice,
+                                          self.hmms[k]._log_transmat,
+                                          bwdlattice, framelogprob, lnP,
+                                          log_xi_sum)
+                stats['trans'][k] += np.exp(np.minimum(log_xi_sum, 700))
 
     def _accumulate_sufficient_statistics(self, stats, inner_stats, params):
         component_weights = log_normalize(inner_stats['component_weights'], 0)
@@ -491,67 +700,128 @@ class _BaseMixHMM(BaseEstimator):
                 stats['hmm_stats'][k]['trans'] += component_weights[k] * \
                     inner_stats['trans'][k]
 
-    def _merge_sum(self, stats, additional_stats):
-        if 'p' in self.params:
-            stats['component_weights'] += additional_stats['component_weights']
-        if 'h' in self.params:
-            for k in range(self.n_components):
-                stats['hmm_stats'][k]['start'] += \
-                    additional_stats['hmm_stats'][k]['start']
-                stats['hmm_stats'][k]['trans'] += \
-                    additional_stats['hmm_stats'][k]['trans']
-        return stats
-
-    def _do_estep(self, obs_batch):
-        if self.memory_safe:
-            local_obs = reduce(lambda x, y: x + y,
-                               [cPickle.load(open(filename, 'r'))
-                                for filename in obs_batch],
-                               [])
-        else:
-            local_obs = obs_batch
+    def _do_estep(self, obs_batch, workspace=None, prune_threshold=None,
+                  temperature=1.0):
+        local_obs = load_batch(obs_batch, self.memory_safe)
+        if workspace is None:
+            workspace = LatticeWorkspace(self.n_states * self.n_components)
         local_stats = self._initialize_sufficient_statistics()
         local_logprob = 0
-        for n, seq in enumerate(local_obs):
-            curr_logprob = np.zeros(self.n_components)
+        tied = self._has_tied_emissions()
+        stacked_params = self._stacked_params()
+        for seq, framelogprob in iter_framelogprob(
+                local_obs,
+                lambda frames: self._compute_stacked_log_likelihood(frames,
+                                                                    tied)):
             local_inner_stats = self._initialize_inner_sufficient_statistics()
-            framelogprob = self._compute_log_likelihood(seq)
-            for k, hmm in enumerate(self.hmms):
-                lpr, fwdlattice = hmm._do_forward_pass(
-                    framelogprob[:, :, k])
-                bwdlattice = hmm._do_backward_pass(framelogprob[:, :, k])
-                gamma = fwdlattice + bwdlattice
-                posteriors = np.exp(gamma.T - logsumexp(gamma, axis=1)).T
-                curr_logprob[k] = lpr + self._log_component_weights[k]
+            # The workspace holds the lattices of all the components,
+            # component last.
+            n_observations, n_states, n_components = framelogprob.shape
+            local_stats['nframes'] += n_observations
+            fwdlattice = workspace.lattices(n_observations)[0].reshape(
+                framelogprob.shape)
+            lpr, _ = self._do_stacked_forward_pass(
+                framelogprob, stacked_params, fwdlattice,
+                workspace.work_buffer)
+            curr_logprob = lpr + self._log_component_weights
+            # Log-weights the responsibilities are normalized from, tempered
+            # or collapsed on the best component when annealing to hard
+            # assignments.
+            if temperature == 0:
+                weights = np.full(n_components, NEGINF)
+                weights[np.argmax(curr_logprob)] = 0.0
+                prune_threshold = 0.5
+            elif temperature != 1:
+                weights = curr_logprob / temperature
+            else:
+                weights = curr_logprob
+            active = np.arange(n_components)
+            if prune_threshold is not None:
+                responsibilities = log_normalize(weights, 0)
+                keep = responsibilities >= prune_threshold
+                keep[np.argmax(responsibilities)] = True
+                active = active[keep]
+                local_stats['pruned_mass'] += responsibilities[~keep].sum()
+                # Skipped components still weigh in the responsibilities.
+                local_inner_stats['component_weights'][~keep] += \
+                    weights[~keep]
+            if len(active) < n_components:
+                framelogprob = np.ascontiguousarray(
+                    framelogprob[:, :, active])
+                params = tuple(np.ascontiguousarray(p[..., active])
+                               for p in stacked_params)
+                fwdlattice = np.ascontiguousarray(fwdlattice[:, :, active])
+            else:
+                params = stacked_params
+            # The backward lattice and posteriors of the components kept,
+            # component last.
+            shape = framelogprob.shape
+            bwdlattice, posteriors = [
+                lattice.reshape(shape) for lattice in
+                workspace.lattices(n_observations, n_states * len(active))[1:]]
+            self._do_stacked_backward_pass(framelogprob, params,
+                                           bwdlattice, workspace.work_buffer)
+            _hmmc._compute_posteriors_stacked(
+                shape[0], shape[1], shape[2], fwdlattice, bwdlattice,
+                posteriors, workspace.work_buffer)
+            for j, k in enumerate(active):
                 self._accumulate_inner_sufficient_statistics(
-                    local_inner_stats, seq, framelogprob[:, :, k], posteriors,
-                    fwdlattice, bwdlattice, self.params, k,
-                    curr_logprob[k])
+                    local_inner_stats, seq, framelogprob[:, :, j],
+                    posteriors[:, :, j], fwdlattice[:, :, j],
+                    bwdlattice[:, :, j], self.params, k, weights[k])
             self._accumulate_sufficient_statistics(
                 local_stats, local_inner_stats, self.params)
             local_logprob += logsumexp(curr_logprob)
-        if self.memory_safe:
-            local_obs = None
         return local_stats, local_logprob
 
     def _score(self, obs_batch):
-        if self.memory_safe:
-            local_obs = reduce(lambda x, y: x + y,
-                               [cPickle.load(open(filename, 'r'))
-                                for filename in obs_batch],
-                               [])
-        else:
-            local_obs = obs_batch
-        logprob = 0
-        for seq in local_obs:
-            framelogprob = self._compute_log_likelihood(seq)
-            lpr = np.array([self.hmms[k]._do_forward_pass(
-                framelogprob[:, :, k])[0]
-                for k in range(self.n_components)])
+        return self._score_per_sequence(obs_batch).sum()
+
+    def _score_per_sequence(self, obs_batch):
+        return self._score_samples(obs_batch)[0]
+
+    def _score_samples(self, obs_batch):
+        """Log probability and responsibilities of each sequence."""
+        local_obs = load_batch(obs_batch, self.memory_safe)
+        logprobs = []
+        responsibilities = []
+        tied = self._has_tied_emissions()
+        stacked_params = self._stacked_params()
+        for seq, framelogprob in iter_framelogprob(
+                local_obs,
+                lambda frames: self._compute_stacked_log_likelihood(frames,
+                                                                    tied)):
+            lpr, _ = self._do_stacked_forward_pass(framelogprob,
+                                                   stacked_params)
             lpr += self._log_component_weights
-            logprob += logsumexp(lpr)
-        return logprob
-
+            logprobs.append(logsumexp(lpr))
+            responsibilities.append(log_normalize(lpr, 0))
+        return (np.array(logprobs, dtype=float),
+                np.array(responsibilities,
+                         dtype=float).reshape(-1, self.n_components))
+
+    def _count_frames(self, obs_batch):
+        return sum(len(seq) for seq
+                   in FrameStream(obs_batch, self.memory_safe))
+
+    def _symbol_summary(self, obs):
+        """Summarize the symbols of obs in a single pass, a batch per
+        task, see ``_summarize_symbols``."""
+        with self._executor_scope() as executor:
+            return executor.aggregate_batches(
+                unwrap_self_summarize_symbols, self, obs, self.batch_size,
+                summarize_symbols([]), merge_symbol_summaries)
+
+    def _get_param_pack(self):
+        """Return the parameters updated by fit, see
+        ``_BaseHMM._get_param_pack``."""
+        return {'log_component_weights': self._log_component_weights,
+                'hmms': [hmm._get_param_pack() for hmm in self.hmms]}
+
+    def _set_param_pack(self, pack):
+        self._log_component_weights = pack['log_component_weights']
+        for hmm, hmm_pack in zip(self.hmms, pack['hmms']):
+            hmm._set_param_pack(hmm_pack)
 
     def _do_mstep(self, stats, params):
         # Based on Huang, Acero, Hon, "Spoken Language Processing",
@@ -632,6 +902,8 @@ class MultinomialMixHMM(_BaseMixHMM):
     --------
     GaussianHMM : HMM with Gaussian emissions
     """
+    _emission_attrs = ('_log_emissionprob',)
+    _hmm_class = MultinomialHMM
 
     def __init__(self, n_components=1, n_states=1,
                  hmms=None, component_weights=None,
@@ -639,7 +911,8 @@ class MultinomialMixHMM(_BaseMixHMM):
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
                  verbose=0, emissionprob_prior=None, tied=True,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, prune_threshold=None, prune_refresh=5):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -659,7 +932,10 @@ class MultinomialMixHMM(_BaseMixHMM):
                              tied=tied,
                              n_jobs=n_jobs,
                              batch_size=batch_size,
-                             memory_safe=memory_safe)
+                             memory_safe=memory_safe,
+                             backend=backend,
+                             prune_threshold=prune_threshold,
+                             prune_refresh=prune_refresh)
         self.emissionprob_prior = emissionprob_prior
 
     def _init(self, obs, params='ph'):
@@ -667,10 +943,9 @@ class MultinomialMixHMM(_BaseMixHMM):
         self.random_state = check_random_state(self.random_state)
 
         if ('h' in params) and (self.hmms is None):
-            self.hmms = [MultinomialHMM(
-                self.n_states,
-                emissionprob_prior=self.emissionprob_prior,
-                memory_safe=self.memory_safe)
+            self.hmms = [self._new_hmm(
+                n_symbols=getattr(self, 'n_symbols', None),
+                emissionprob_prior=self.emissionprob_prior)
                 for _ in range(self.n_components)]
             self.hmms[0]._init(obs)
             emissionprob = self.hmms[0].emissionprob_
@@ -715,46 +990,15 @@ class MultinomialMixHMM(_BaseMixHMM):
                     stats['hmm_stats'][k]['obs'] += component_weights[k] * \
                         inner_stats['obs'][k]
 
-    def _merge_sum(self, stats, additional_stats):
-        stats = super(MultinomialMixHMM, self)._merge_sum(stats, additional_stats)
-        if 'h' in self.params:
-            for k in range(self.n_components):
-                stats['hmm_stats'][k]['obs'] += \
-                    additional_stats['hmm_stats'][k]['obs']
-        return stats
+    def _summarize_symbols(self, obs):
+        return symbol_summary(FrameStream(obs, self.memory_safe))
 
     def _check_input_symbols(self, obs):
         """check if input can be used for Multinomial.fit input must be both
         positive integer array and every element must be continuous.
         e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not
         """
-
-        if self.memory_safe:
-            symbols = []
-            for o in obs:
-                symbols += cPickle.load(open(o, 'r'))
-            symbols = np.concatenate(symbols)
-        else:
-            symbols = np.concatenate(obs)
-
-        if symbols.dtype.kind != 'i':
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        symbols.sort()
-        if np.any(np.diff(symbols) > 1):
-            # input is discontinous
-            return False
-
-        return True
+        return check_symbol_summary(self._symbol_summary(obs))
 
     def _n_free_parameters(self):
         n_pars = self.n_components - 1
@@ -783,8 +1027,12 @@ class MultinomialMixHMM(_BaseMixHMM):
                    "in all, every element must be continuous, but %s was "
                    "given.")
 
-        if not self._check_input_symbols(obs):
+        # Validation and symbol discovery share a single pass over obs.
+        summary = self._symbol_summary(obs)
+        if not check_symbol_summary(summary):
             raise ValueError(err_msg % obs)
+        if not hasattr(self, 'n_symbols'):
+            self.n_symbols = len(summary['symbols'])
 
         return super(MultinomialMixHMM, self).fit(obs, warm_start, **kwargs)
 
@@ -853,6 +1101,8 @@ class MultinomialExponentialMixHMM(_BaseMixHMM):
     --------
     GaussianHMM : HMM with Gaussian emissions
     """
+    _emission_attrs = ('_log_emissionprob', '_rates')
+    _hmm_class = MultinomialExponentialHMM
 
     def __init__(self, n_components=1, n_states=1,
                  hmms=None, component_weights=None,
@@ -861,7 +1111,8 @@ class MultinomialExponentialMixHMM(_BaseMixHMM):
                  init_params=string.ascii_letters,
                  verbose=0, emissionprob_prior=None,
                  rates_var=1.0, tied=True,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, prune_threshold=None, prune_refresh=5):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -881,7 +1132,10 @@ class MultinomialExponentialMixHMM(_BaseMixHMM):
                              tied=tied,
                              n_jobs=n_jobs,
                              batch_size=batch_size,
-                             memory_safe=memory_safe)
+                             memory_safe=memory_safe,
+                             backend=backend,
+                             prune_threshold=prune_threshold,
+                             prune_refresh=prune_refresh)
         self.emissionprob_prior = emissionprob_prior
         self.rates_var = rates_var
 
@@ -890,12 +1144,13 @@ class MultinomialExponentialMixHMM(_BaseMixHMM):
         self.random_state = check_random_state(self.random_state)
 
         if ('h' in params) and (self.hmms is None):
-            self.hmms = [MultinomialExponentialHMM(
-                self.n_states,
+            self.hmms = [self._new_hmm(
                 emissionprob_prior=self.emissionprob_prior,
-                rates_var=self.rates_var,
-                memory_safe=self.memory_safe)
+                rates_var=self.rates_var)
                 for _ in range(self.n_components)]
+            if hasattr(self, 'n_symbols'):
+                for hmm in self.hmms:
+                    hmm.n_symbols = self.n_symbols
             self.hmms[0]._init(obs)
             emissionprob = self.hmms[0].emissionprob_
             rates = self.hmms[0].rates_
@@ -960,51 +1215,19 @@ class MultinomialExponentialMixHMM(_BaseMixHMM):
                     stats['hmm_stats'][k]['expon_obs'] += component_weights[k] * \
                         inner_stats['expon_obs'][k]
 
-    def _merge_sum(self, stats, additional_stats):
-        stats = super(MultinomialExponentialMixHMM,
-                      self)._merge_sum(stats, additional_stats)
-        if 'h' in self.params:
-            for k in range(self.n_components):
-                stats['hmm_stats'][k]['obs'] += \
-                    additional_stats['hmm_stats'][k]['obs']
-                stats['hmm_stats'][k]['post'] += \
-                    additional_stats['hmm_stats'][k]['post']
-                stats['hmm_stats'][k]['expon_obs'] += \
-                    additional_stats['hmm_stats'][k]['expon_obs']
-        return stats
+    def _summarize_symbols(self, obs):
+        return reduce(merge_symbol_summaries,
+                      (summarize_symbol_values(seq) for seq
+                       in FrameStream(obs, self.memory_safe)),
+                      summarize_symbols([]))
 
     def _check_input_symbols(self, obs):
         """check if input can be used for Multinomial.fit input must be both
         positive integer array and every element must be continuous.
-        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not
+        e.g. x = [0, 0, 2, 1, 3, 1, 1] is OK and y = [0, 0, 3, 5, 10] not.
+        The exponential observations must be non-negative.
         """
-
-        if self.memory_safe:
-            symbols = []
-            for o in obs:
-                symbols += cPickle.load(open(o, 'r'))
-            symbols = np.concatenate(symbols)[:, 0]
-        else:
-            symbols = np.concatenate(obs)[:, 0]
-
-        if symbols.dtype.kind not in ('i', 'f'):
-            # input symbols must be integer
-            return False
-
-        if len(symbols) == 1:
-            # input too short
-            return False
-
-        if np.any(symbols < 0):
-            # input contains negative intiger
-            return False
-
-        symbols.sort()
-        if np.any(np.diff(symbols) > 1):
-            # input is discontinous
-            return False
-
-        return True
+        return check_symbol_summary(self._symbol_summary(obs))
 
     def _n_free_parameters(self):
         n_pars = self.n_components - 1
@@ -1034,12 +1257,15 @@ class MultinomialExponentialMixHMM(_BaseMixHMM):
                    "in all, every element must be continuous, but %s was "
                    "given.")
 
-        cleaned_obs = [np.array(seq) for seq in obs]
-
-        if not self._check_input_symbols(cleaned_obs):
+        # Validation and symbol discovery share a single pass over obs.
+        summary = self._symbol_summary(obs)
+        if not check_symbol_summary(summary):
             raise ValueError(err_msg % obs)
+        if not hasattr(self, 'n_symbols'):
+            self.n_symbols = len(summary['symbols'])
 
-        return super(MultinomialExponentialMixHMM, self).fit(cleaned_obs, warm_start, **kwargs)
+        return super(MultinomialExponentialMixHMM, self).fit(obs, warm_start,
+                                                             **kwargs)
 
 
 class PoissonMixHMM(_BaseMixHMM):
@@ -1100,6 +1326,8 @@ class PoissonMixHMM(_BaseMixHMM):
     --------
     GaussianHMM : HMM with Gaussian emissions
     """
+    _emission_attrs = ('_rates',)
+    _hmm_class = PoissonHMM
 
     def __init__(self, n_components=1, n_states=1,
                  hmms=None, component_weights=None,
@@ -1107,7 +1335,8 @@ class PoissonMixHMM(_BaseMixHMM):
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
                  verbose=0, rates_var=1.0, tied=True,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, prune_threshold=None, prune_refresh=5):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -1127,7 +1356,10 @@ class PoissonMixHMM(_BaseMixHMM):
                              tied=tied,
                              n_jobs=n_jobs,
                              batch_size=batch_size,
-                             memory_safe=memory_safe)
+                             memory_safe=memory_safe,
+                             backend=backend,
+                             prune_threshold=prune_threshold,
+                             prune_refresh=prune_refresh)
         self.rates_var = rates_var
 
     def _init(self, obs, params='ph'):
@@ -1135,9 +1367,7 @@ class PoissonMixHMM(_BaseMixHMM):
         self.random_state = check_random_state(self.random_state)
 
         if ('h' in params) and (self.hmms is None):
-            self.hmms = [PoissonHMM(self.n_states,
-                                    rates_var=self.rates_var,
-                                    memory_safe=self.memory_safe)
+            self.hmms = [self._new_hmm(rates_var=self.rates_var)
                          for _ in range(self.n_components)]
             self.hmms[0]._init(obs)
             rates = self.hmms[0].rates_
@@ -1188,16 +1418,6 @@ class PoissonMixHMM(_BaseMixHMM):
                     stats['hmm_stats'][k]['obs'] += component_weights[k] * \
                         inner_stats['obs'][k]
 
-    def _merge_sum(self, stats, additional_stats):
-        stats = super(PoissonMixHMM, self)._merge_sum(stats, additional_stats)
-        if 'h' in self.params:
-            for k in range(self.n_components):
-                stats['hmm_stats'][k]['post'] += \
-                    additional_stats['hmm_stats'][k]['post']
-                stats['hmm_stats'][k]['obs'] += \
-                    additional_stats['hmm_stats'][k]['obs']
-        return stats
-
     def _check_input_symbols(self, obs):
         """check if input can be used for PoissonMixHMM. Input must be a list
         of non-negative integers.
@@ -1323,6 +1543,8 @@ class ExponentialMixHMM(_BaseMixHMM):
     --------
     GaussianHMM : HMM with Gaussian emissions
     """
+    _emission_attrs = ('_rates',)
+    _hmm_class = ExponentialHMM
 
     def __init__(self, n_components=1, n_states=1,
                  hmms=None, component_weights=None,
@@ -1330,7 +1552,8 @@ class ExponentialMixHMM(_BaseMixHMM):
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
                  verbose=0, rates_var=1.0, tied=True,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, prune_threshold=None, prune_refresh=5):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -1350,7 +1573,10 @@ class ExponentialMixHMM(_BaseMixHMM):
                              tied=tied,
                              n_jobs=n_jobs,
                              batch_size=batch_size,
-                             memory_safe=memory_safe)
+                             memory_safe=memory_safe,
+                             backend=backend,
+                             prune_threshold=prune_threshold,
+                             prune_refresh=prune_refresh)
         self.rates_var = rates_var
 
     def _init(self, obs, params='ph'):
@@ -1358,9 +1584,7 @@ class ExponentialMixHMM(_BaseMixHMM):
         self.random_state = check_random_state(self.random_state)
 
         if ('h' in params) and (self.hmms is None):
-            self.hmms = [ExponentialHMM(self.n_states,
-                                        rates_var=self.rates_var,
-                                        memory_safe=self.memory_safe)
+            self.hmms = [self._new_hmm(rates_var=self.rates_var)
                          for _ in range(self.n_components)]
             self.hmms[0]._init(obs)
             rates = self.hmms[0].rates_
@@ -1411,16 +1635,6 @@ class ExponentialMixHMM(_BaseMixHMM):
                     stats['hmm_stats'][k]['obs'] += component_weights[k] * \
                         inner_stats['obs'][k]
 
-    def _merge_sum(self, stats, additional_stats):
-        stats = super(ExponentialMixHMM, self)._merge_sum(stats, additional_stats)
-        if 'h' in self.params:
-            for k in range(self.n_components):
-                stats['hmm_stats'][k]['post'] += \
-                    additional_stats['hmm_stats'][k]['post']
-                stats['hmm_stats'][k]['obs'] += \
-                    additional_stats['hmm_stats'][k]['obs']
-        return stats
-
     def _check_input_symbols(self, obs):
         """check if input can be used for ExponentialHMM. Input must be a list
         of non-negative reals.
@@ -1550,6 +1764,8 @@ class GaussianMixHMM(_BaseMixHMM):
     --------
     GaussianHMM : HMM with Gaussian emissions
     """
+    _emission_attrs = ('_means_', '_covars_')
+    _hmm_class = GaussianHMM
 
     def __init__(self, n_components=1, n_states=1, n_features=1,
                  hmms=None, component_weights=None,
@@ -1557,7 +1773,8 @@ class GaussianMixHMM(_BaseMixHMM):
                  params=string.ascii_letters,
                  init_params=string.ascii_letters,
                  verbose=0, means_var=1.0, tied=True,
-                 n_jobs=1, batch_size=1, memory_safe=False):
+                 n_jobs=1, batch_size=1, memory_safe=False,
+                 backend=None, prune_threshold=None, prune_refresh=5):
         """Create a hidden Markov model with multinomial emissions.
 
         Parameters
@@ -1577,7 +1794,10 @@ class GaussianMixHMM(_BaseMixHMM):
                              tied=tied,
                              n_jobs=n_jobs,
                              batch_size=batch_size,
-                             memory_safe=memory_safe)
+                             memory_safe=memory_safe,
+                             backend=backend,
+                             prune_threshold=prune_threshold,
+                             prune_refresh=prune_refresh)
         self.means_var = means_var
 
     def _init(self, obs, params='ph'):
@@ -1585,9 +1805,7 @@ class GaussianMixHMM(_BaseMixHMM):
         self.random_state = check_random_state(self.random_state)
 
         if ('h' in params) and (self.hmms is None):
-            self.hmms = [GaussianHMM(self.n_states,
-                                     means_var=self.means_var,
-                                     memory_safe=self.memory_safe)
+            self.hmms = [self._new_hmm(means_var=self.means_var)
                          for _ in range(self.n_components)]
             self.hmms[0]._init(obs)
             means = self.hmms[0].means_
@@ -1673,22 +1891,6 @@ class GaussianMixHMM(_BaseMixHMM):
                         stats['hmm_stats'][k]['obs*obs.T'] += \
                             component_weights[k] * inner_stats['obs*obs.T'][k]
 
-    def _merge_sum(self, stats, additional_stats):
-        stats = super(GaussianMixHMM, self)._merge_sum(stats, additional_stats)
-        if 'h' in self.params:
-            for k in range(self.n_components):
-                stats['hmm_stats'][k]['post'] += \
-                    additional_stats['hmm_stats'][k]['post']
-                stats['hmm_stats'][k]['obs'] += \
-                    additional_stats['hmm_stats'][k]['obs']
-                if self.hmms[k]._covariance_type in ('spherical', 'diag'):
-                    stats['hmm_stats'][k]['obs**2'] += \
-                        additional_stats['hmm_stats'][k]['obs**2']
-                elif self.hmms[k]._covariance_type in ('tied', 'full'):
-                    stats['hmm_stats'][k]['obs*obs.T'] += \
-                        additional_stats['hmm_stats'][k]['obs*obs.T']
-        return stats
-
     def fit(self, obs, warm_start=False, **kwargs):
         """Estimate model parameters.
 
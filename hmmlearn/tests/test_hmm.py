@@ -1,7 +1,13 @@
 from __future__ import print_function
+import os
+import copy
+import pickle
+import tempfile
+
 import numpy as np
 
-from numpy.testing import assert_array_equal, assert_array_almost_equal
+from numpy.testing import (assert_array_equal, assert_array_almost_equal,
+                           assert_allclose)
 from unittest import TestCase
 
 from sklearn.datasets.samples_generator import make_spd_matrix
@@ -11,7 +17,7 @@ from sklearn.utils import check_random_state
 
 from nose import SkipTest
 
-from hmmlearn import hmm
+from hmmlearn import hmm, _hmmc, executors
 
 rng = np.random.RandomState(0)
 np.seterr(all='warn')
@@ -124,6 +130,78 @@ class TestBaseHMM(TestCase):
                                   [0.8673, 0.1327]])
         assert_array_almost_equal(posteriors, refposteriors, decimal=4)
 
+    def test_score_samples_with_buffer(self):
+        h, framelogprob = self.setup_example_hmm()
+        nobs = len(framelogprob)
+
+        out = np.zeros((2 * nobs, 2))
+        # The stub ignores the frames, but out is checked against them.
+        obs = [np.zeros(nobs), np.zeros(nobs)]
+        logprob, posteriors = h.score_samples(obs, out=out)
+
+        reflogprob = -3.3725
+        self.assertAlmostEqual(logprob, 2 * reflogprob, places=4)
+
+        refposteriors = np.array([[0.8673, 0.1327],
+                                  [0.8204, 0.1796],
+                                  [0.3075, 0.6925],
+                                  [0.8204, 0.1796],
+                                  [0.8673, 0.1327]])
+        self.assertEqual(len(posteriors), 2)
+        for post in posteriors:
+            assert_array_almost_equal(post, refposteriors, decimal=4)
+        assert_array_almost_equal(out, np.vstack([refposteriors] * 2),
+                                  decimal=4)
+
+    def test_compute_posteriors(self):
+        h, framelogprob = self.setup_example_hmm()
+        _, fwdlattice = h._do_forward_pass(framelogprob)
+        bwdlattice = h._do_backward_pass(framelogprob)
+        gamma = fwdlattice + bwdlattice
+        refposteriors = np.exp(gamma - logsumexp(gamma, axis=1)[:, np.newaxis])
+
+        assert_array_almost_equal(
+            h._compute_posteriors(fwdlattice, bwdlattice), refposteriors)
+        # The posteriors can be written over the forward lattice.
+        posteriors = h._compute_posteriors(fwdlattice, bwdlattice,
+                                           out=fwdlattice)
+        self.assertTrue(posteriors is fwdlattice)
+        assert_array_almost_equal(posteriors, refposteriors)
+
+    def test_compute_log_xi_sum(self):
+        h, framelogprob = self.setup_example_hmm()
+        lpr, fwdlattice = h._do_forward_pass(framelogprob)
+        bwdlattice = h._do_backward_pass(framelogprob)
+        n_observations, n_states = framelogprob.shape
+        lneta = np.zeros((n_observations - 1, n_states, n_states))
+        _hmmc._compute_lneta(n_observations, n_states, fwdlattice,
+                             h._log_transmat, bwdlattice, framelogprob,
+                             lpr, lneta)
+        log_xi_sum = np.empty((n_states, n_states))
+        _hmmc._compute_log_xi_sum(n_observations, n_states, fwdlattice,
+                                  h._log_transmat, bwdlattice, framelogprob,
+                                  lpr, log_xi_sum)
+        assert_array_almost_equal(log_xi_sum, logsumexp(lneta, 0))
+
+    def test_lattice_workspace(self):
+        h, framelogprob = self.setup_example_hmm()
+        reflogprob, reffwdlattice = h._do_forward_pass(framelogprob)
+        workspace = hmm.LatticeWorkspace(h.n_states)
+        fwdlattice, bwdlattice, _ = workspace.lattices(len(framelogprob))
+        logprob, lattice = h._do_forward_pass(framelogprob, fwdlattice,
+                                              workspace.work_buffer)
+        self.assertTrue(lattice is fwdlattice)
+        self.assertAlmostEqual(logprob, reflogprob)
+        assert_array_almost_equal(fwdlattice, reffwdlattice)
+
+        # Shorter sequences reuse the same memory.
+        peak_nbytes = workspace.peak_nbytes
+        fwdlattice, _, _ = workspace.lattices(2)
+        self.assertEqual(fwdlattice.shape, (2, h.n_states))
+        self.assertEqual(workspace.peak_nbytes, peak_nbytes)
+        workspace.lattices(2 * len(framelogprob))
+        self.assertTrue(workspace.peak_nbytes > peak_nbytes)
+
     def test_hmm_score_samples_consistent_with_gmm(self):
         n_components = 8
         nobs = 10
@@ -263,6 +341,27 @@ class GaussianHMMBaseTester(object):
         viterbi_ll, stateseq = h.decode(obs)
         assert_array_equal(stateseq, gaussidx)
 
+    def test_accumulate_path_statistics(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.means_ = self.means
+        h.covars_ = self.covars[self.covariance_type]
+        obs = self.prng.randn(40, self.n_features)
+        state_sequence = self.prng.randint(self.n_components, size=40)
+        # Viterbi statistics are those of posteriors that are one-hot.
+        posteriors = np.eye(self.n_components)[state_sequence]
+
+        stats = h._initialize_sufficient_statistics()
+        h._accumulate_path_statistics(stats, obs, state_sequence, 'stmc')
+        refstats = h._initialize_sufficient_statistics()
+        h._accumulate_sufficient_statistics(refstats, obs, None, posteriors,
+                                            None, None, 'smc')
+        reftrans = np.dot(posteriors[:-1].T, posteriors[1:])
+        assert_array_almost_equal(stats['trans'], reftrans)
+        self.assertEqual(stats['nobs'], refstats['nobs'])
+        for key in refstats:
+            if key not in ('nobs', 'trans'):
+                assert_array_almost_equal(stats[key], refstats[key])
+
     def test_sample(self, n=1000):
         h = hmm.GaussianHMM(self.n_components, self.covariance_type)
         # Make sure the means are far apart so posteriors.argmax()
@@ -274,6 +373,20 @@ class GaussianHMMBaseTester(object):
         samples = h.sample(n)[0]
         self.assertEqual(samples.shape, (n, self.n_features))
 
+    def test_generate_samples_from_states(self, n=20000):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.means_ = self.means
+        h.covars_ = self.covars[self.covariance_type]
+        states = np.repeat(np.arange(self.n_components), n)
+        samples = h._generate_samples_from_states(states, random_state=0)
+        self.assertEqual(samples.shape, (len(states), self.n_features))
+        for state in range(self.n_components):
+            frames = samples[states == state]
+            assert_array_almost_equal(frames.mean(0), self.means[state],
+                                      decimal=0)
+            cov = self.expanded_covars[self.covariance_type][state]
+            assert_allclose(np.cov(frames.T), cov, rtol=0.1, atol=0.1)
+
     def test_fit(self, params='stmc', n_iter=5, verbose=False, **kwargs):
         h = hmm.GaussianHMM(self.n_components, self.covariance_type)
         h.startprob_ = self.startprob
@@ -313,6 +426,63 @@ class GaussianHMMBaseTester(object):
         # ValueError: setting an array element with a sequence.
         h.fit(obs)
 
+    def test_squarem(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = 2 * self.means
+        h.covars_ = self.covars[self.covariance_type]
+        obs = h.sample(lengths=[40, 60, 30, 50], random_state=self.prng)[0]
+
+        em_params = h._get_em_params(h.params)
+        # Covariance matrices are not extrapolated.
+        self.assertEqual('covars' in em_params,
+                         self.covariance_type in ('spherical', 'diag'))
+        restored = copy.deepcopy(h)
+        restored._set_em_params(em_params)
+        assert_array_almost_equal(restored.means_, h.means_)
+        assert_array_almost_equal(restored._covars_, h._covars_)
+
+        # Both fits start from the same parameters.
+        start = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                random_state=1, n_iter=0).fit(obs)
+        fitted = {}
+        for acceleration in (None, "squarem"):
+            f = copy.deepcopy(start)
+            f.n_iter = 30
+            f.thresh = 1e-6
+            fitted[acceleration] = f.fit(obs, warm_start=True,
+                                         acceleration=acceleration)
+            self.assertTrue(np.all(np.isfinite(f.means_)))
+            if self.covariance_type in ('spherical', 'diag'):
+                self.assertTrue(np.all(f._covars_ > 0))
+            else:
+                self.assertTrue(np.all(np.linalg.eigvalsh(f._covars_) > 0))
+        self.assertTrue(fitted["squarem"].score(obs) >=
+                        fitted[None].score(obs) - 1e-3)
+
+    def test_fit_restarts_seeds(self):
+        h = hmm.GaussianHMM(self.n_components, self.covariance_type)
+        h.startprob_ = self.startprob
+        h.transmat_ = self.transmat
+        h.means_ = 20 * self.means
+        h.covars_ = self.covars[self.covariance_type]
+        obs = h.sample(lengths=[40, 60, 30, 50], random_state=self.prng)[0]
+
+        traces = []
+        for _ in range(2):
+            h = hmm.GaussianHMM(self.n_components, self.covariance_type,
+                                random_state=0, n_iter=1, backend="thread",
+                                n_jobs=2)
+            h.fit(obs, n_init=3)
+            self.assertEqual(h.random_state, 0)
+            traces.append(h.restart_logprobs_)
+        # The restarts start from initializations of their own, drawn
+        # again from the same seed.
+        starts = [trace[0] for trace in traces[0]]
+        self.assertEqual(len(set(starts)), 3)
+        self.assertEqual(traces[0], traces[1])
+
     def test_fit_with_length_one_signal(self):
         obs = [self.prng.rand(10, self.n_features),
                self.prng.rand(8, self.n_features),
@@ -500,6 +670,372 @@ class MultinomialHMMTestCase(TestCase):
         self.assertEqual(len(samples), n)
         self.assertEqual(len(np.unique(samples)), self.n_symbols)
 
+    def test_score_per_sequence(self):
+        obs = [self.prng.randint(self.n_symbols, size=n) for n in (3, 5, 8)]
+        logprobs = self.h.score_per_sequence(obs)
+        self.assertEqual(logprobs.shape, (3,))
+        for seq, logprob in zip(obs, logprobs):
+            self.assertAlmostEqual(logprob, self.h.score([seq]))
+        self.assertAlmostEqual(logprobs.sum(), self.h.score(obs))
+
+        out = np.zeros(3)
+        self.h.batch_size = 2
+        self.assertTrue(self.h.score_per_sequence(obs, out=out) is out)
+        assert_array_almost_equal(out, logprobs)
+
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            out = self.h.score_per_sequence(obs, out=path)
+            self.assertTrue(isinstance(out, np.memmap))
+            assert_array_almost_equal(out, logprobs)
+        finally:
+            del out
+            os.remove(path)
+
+    def test_infer(self):
+        obs = [self.prng.randint(self.n_symbols, size=n) for n in (3, 5, 8)]
+        results = self.h.infer(obs)
+        assert_array_almost_equal(results["logprob"],
+                                  self.h.score_per_sequence(obs))
+        viterbi_logprobs, state_sequences = self.h.decode(obs)
+        assert_array_almost_equal(results["viterbi_logprob"],
+                                  viterbi_logprobs)
+        for posteriors, path, state_sequence in zip(
+                results["posteriors"], results["viterbi"], state_sequences):
+            assert_array_almost_equal(posteriors.sum(axis=1),
+                                      np.ones(len(posteriors)))
+            assert_array_equal(path, state_sequence)
+
+        results = self.h.infer(obs, outputs=("logprob",))
+        self.assertEqual(list(results), ["logprob"])
+        self.assertRaises(ValueError, self.h.infer, obs, outputs=("foo",))
+
+    def test_infer_out(self):
+        obs = [self.prng.randint(self.n_symbols, size=n) for n in (3, 5, 8)]
+        expected = self.h.infer(obs, ("posteriors",))["posteriors"]
+        for backend in ("serial", "thread"):
+            self.h.backend = backend
+            out = np.zeros((16, self.n_components))
+            posteriors = self.h.infer(obs, ("posteriors",),
+                                      out=out)["posteriors"]
+            for post, expected_post in zip(posteriors, expected):
+                self.assertTrue(np.shares_memory(post, out))
+                assert_array_almost_equal(post, expected_post)
+            for bad in (np.zeros((10, self.n_components)),
+                        np.zeros((20, self.n_components)),
+                        np.zeros((16, self.n_components + 1)),
+                        np.zeros((16, self.n_components), dtype=np.float32),
+                        np.zeros((self.n_components, 16)).T):
+                self.assertRaises(ValueError, self.h.infer, obs,
+                                  ("posteriors",), out=bad)
+
+    def test_infer_empty(self):
+        results = self.h.infer([])
+        self.assertEqual(results["logprob"].shape, (0,))
+        self.assertEqual(results["viterbi_logprob"].shape, (0,))
+        self.assertEqual(results["posteriors"], [])
+        self.assertEqual(results["viterbi"], [])
+        logprob, posteriors = self.h.score_samples([])
+        self.assertEqual((logprob, posteriors), (0, []))
+        self.assertEqual(self.h.predict([]), [])
+        self.assertEqual(self.h.predict([], algorithm="map"), [])
+        self.assertEqual(self.h.predict_proba([]), [])
+
+    def test_infer_memory_safe_in_memory(self):
+        obs = [self.prng.randint(self.n_symbols, size=n) for n in (3, 5, 8)]
+        logprob, posteriors = self.h.score_samples(obs)
+        state_sequences = self.h.predict(obs)
+        self.h.memory_safe = True
+        memory_safe_logprob, memory_safe_posteriors = \
+            self.h.score_samples(obs)
+        self.assertAlmostEqual(memory_safe_logprob, logprob)
+        for post, memory_safe_post in zip(posteriors,
+                                          memory_safe_posteriors):
+            assert_array_almost_equal(memory_safe_post, post)
+        for path, state_sequence in zip(self.h.predict(obs),
+                                        state_sequences):
+            assert_array_equal(path, state_sequence)
+        self.assertEqual(len(self.h.predict_proba(obs)), len(obs))
+
+    def test_backends(self):
+        obs = [self.prng.randint(self.n_symbols, size=n)
+               for n in (3, 5, 8, 4, 6)]
+        logprobs = self.h.score_per_sequence(obs)
+        posteriors = self.h.infer(obs)["posteriors"]
+        self.h.batch_size = 2
+        for backend in ("thread",
+                        executors.SparkExecutor(executors.LocalContext())):
+            self.h.backend = backend
+            self.h.n_jobs = 2
+            self.assertAlmostEqual(self.h.score(obs), logprobs.sum())
+            assert_array_almost_equal(self.h.score_per_sequence(obs),
+                                      logprobs)
+            out = np.zeros((sum(len(seq) for seq in obs), self.n_components))
+            results = self.h.infer(obs, outputs=("posteriors",), out=out)
+            assert_array_almost_equal(out, np.vstack(posteriors))
+            self.assertTrue(results["posteriors"][1].base is out)
+
+        fitted = {}
+        for backend in ("serial", "thread"):
+            self.h.backend = backend
+            h = copy.deepcopy(self.h)
+            h.n_iter = 3
+            fitted[backend] = h.fit(obs, warm_start=True)
+        assert_array_almost_equal(fitted["serial"].transmat_,
+                                  fitted["thread"].transmat_)
+        assert_array_almost_equal(fitted["serial"].emissionprob_,
+                                  fitted["thread"].emissionprob_)
+        self.assertRaises(ValueError, executors.get_executor, "foo")
+
+    def test_caller_executor_left_open(self):
+        obs = [self.prng.randint(self.n_symbols, size=n) for n in (3, 5, 8)]
+        logprob = self.h.score(obs)
+        with executors.ThreadExecutor(2) as executor:
+            self.h.backend = executor
+            self.h.batch_size = 1
+            self.assertAlmostEqual(self.h.score(obs), logprob)
+            pool = executor._pool
+            self.assertTrue(pool is not None)
+            self.h.infer(obs)
+            self.h.n_iter = 2
+            self.h.fit(obs, warm_start=True)
+            self.assertTrue(executor._pool is pool)
+        self.assertTrue(executor._pool is None)
+
+    def test_viterbi_training(self):
+        obs = [self.prng.randint(self.n_symbols, size=n)
+               for n in (3, 5, 8, 4, 6)]
+        stats, logprob = self.h._do_viterbi_estep(obs)
+        refstats = self.h._initialize_sufficient_statistics()
+        logprobs, state_sequences = self.h.decode(obs)
+        for seq, state_sequence in zip(obs, state_sequences):
+            posteriors = np.eye(self.n_components)[state_sequence]
+            for t in range(len(seq) - 1):
+                refstats['trans'][state_sequence[t],
+                                  state_sequence[t + 1]] += 1
+            refstats['start'] += posteriors[0]
+            for t, symbol in enumerate(seq):
+                refstats['obs'][:, symbol] += posteriors[t]
+        self.assertAlmostEqual(logprob, np.sum(logprobs))
+        for key in ('start', 'trans', 'obs'):
+            assert_array_almost_equal(stats[key], refstats[key])
+
+        h = copy.deepcopy(self.h)
+        h.n_iter = 5
+        h.fit(obs, warm_start=True, algorithm="viterbi")
+        self.assertTrue(np.all(np.isfinite(h.emissionprob_)))
+        self.assertRaises(ValueError, h.fit, obs, algorithm="foo")
+
+    def test_squarem(self):
+        obs = [self.prng.randint(self.n_symbols, size=n)
+               for n in (30, 50, 80, 40, 60)]
+        em_params = self.h._get_em_params(self.h.params)
+        h = copy.deepcopy(self.h)
+        h._set_em_params(em_params)
+        assert_array_almost_equal(h.transmat_, self.h.transmat_)
+        assert_array_almost_equal(h.emissionprob_, self.h.emissionprob_)
+
+        fitted = {}
+        for acceleration in (None, "squarem"):
+            h = copy.deepcopy(self.h)
+            h.n_iter = 20
+            h.thresh = 1e-6
+            fitted[acceleration] = h.fit(obs, warm_start=True,
+                                         acceleration=acceleration)
+            assert_array_almost_equal(h.transmat_.sum(axis=1), 1)
+            assert_array_almost_equal(h.emissionprob_.sum(axis=1), 1)
+        self.assertTrue(fitted["squarem"].score(obs) >=
+                        fitted[None].score(obs) - 1e-3)
+        self.assertRaises(ValueError, h.fit, obs, acceleration="foo")
+
+        # The first extrapolation would come after the second M-step, the
+        # last one: it is skipped, as no E-step would check it.
+        for acceleration in (None, "squarem"):
+            h = copy.deepcopy(self.h)
+            h.n_iter = 2
+            h.thresh = -1
+            fitted[acceleration] = h.fit(obs, warm_start=True,
+                                         acceleration=acceleration)
+        assert_array_almost_equal(fitted["squarem"].transmat_,
+                                  fitted[None].transmat_)
+        assert_array_almost_equal(fitted["squarem"].emissionprob_,
+                                  fitted[None].emissionprob_)
+
+    def test_fit_restarts(self):
+        obs = [self.prng.randint(self.n_symbols, size=n)
+               for n in (30, 50, 80, 40, 60)]
+        h = copy.deepcopy(self.h)
+        h.n_iter = 6
+        h.thresh = 1e-10
+        h.backend = "thread"
+        h.n_jobs = 2
+        h.fit(obs, n_init=4, abandon_after=3, abandon_tol=0)
+        self.assertEqual(len(h.restart_logprobs_), 4)
+        self.assertEqual(h.backend, "thread")
+        finals = [trace[-1] for trace in h.restart_logprobs_]
+        self.assertEqual(h.logprob_[-1], max(finals))
+        self.assertEqual(h.logprob_, h.restart_logprobs_[h.best_restart_])
+        # Only the leader after 3 iterations goes on to the end.
+        self.assertEqual(sorted(len(trace) for trace in h.restart_logprobs_),
+                         [3, 3, 3, 6])
+        self.assertRaises(ValueError, h.fit, obs, n_init=0)
+
+    def test_select_n_states(self):
+        obs = self.h.sample(20, 50, 60, random_state=self.prng)[0]
+        estimator = hmm.MultinomialHMM(1, n_iter=20)
+        candidates = [3, 1, 2]
+        for split_states in (False, True):
+            best, scores = hmm.select_n_states(estimator, obs, candidates,
+                                               split_states=split_states)
+            self.assertEqual(scores.shape, (3,))
+            self.assertEqual(best.n_states, candidates[np.argmin(scores)])
+            self.assertAlmostEqual(scores.min(), best.bic(obs))
+        best, scores = hmm.select_n_states(estimator, obs, candidates,
+                                           criterion="aic")
+        self.assertAlmostEqual(scores.min(), best.aic(obs))
+        self.assertRaises(ValueError, hmm.select_n_states, estimator, obs,
+                          candidates, criterion="foo")
+
+    def test_select_n_states_memory_safe(self):
+        obs = self.h.sample(20, 50, 60, random_state=self.prng)[0]
+        estimator = hmm.MultinomialHMM(1, n_iter=20)
+        candidates = [3, 1, 2]
+        paths = []
+        try:
+            for batch in (obs[:12], obs[12:]):
+                fd, path = tempfile.mkstemp()
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(batch, f)
+                paths.append(path)
+            estimator.memory_safe = True
+            self.assertEqual(estimator._count_sequences(paths), 20)
+            # The criterion counts the frames in the files, not the paths.
+            n_data = sum(len(seq) for seq in obs)
+            for split_states in (False, True):
+                best, scores = hmm.select_n_states(estimator, paths,
+                                                   candidates,
+                                                   split_states=split_states)
+                self.assertEqual(best.n_data_, n_data)
+                self.assertAlmostEqual(scores.min(),
+                                       best._bic(best.score(obs), n_data))
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    def test_training_score(self):
+        obs = [self.prng.randint(self.n_symbols, size=n)
+               for n in (30, 50, 80, 40, 60)]
+        h = copy.deepcopy(self.h)
+        h.n_iter = 50
+        h.fit(obs, warm_start=True)
+        self.assertTrue(h.converged_)
+        self.assertEqual(h.n_data_, 260)
+        aic, bic = h.aic(obs), h.bic(obs)
+        self.assertEqual(aic, h._aic(h.logprob_[-1]))
+        self.assertAlmostEqual(aic, h._aic(h.score(obs)))
+        self.assertAlmostEqual(bic, h._bic(h.score(obs), 260))
+
+        # Other data, or parameters changed after the fit, are scored.
+        self.assertAlmostEqual(h.aic(obs[1:]), h._aic(h.score(obs[1:])))
+        h.transmat_ = self.transmat
+        self.assertAlmostEqual(h.aic(obs), h._aic(h.score(obs)))
+
+        # The training set is recognized without a pass over it, a copy
+        # of it is scored.
+        h.fit(obs, warm_start=True)
+        score = h.score
+        h.score = None
+        self.assertEqual(h.aic(obs), h._aic(h.logprob_[-1]))
+        h.score = score
+        changed = [seq.copy() for seq in obs]
+        changed[2][40] = (changed[2][40] + 1) % self.n_symbols
+        self.assertAlmostEqual(h.aic(changed), h._aic(h.score(changed)))
+
+    def test_training_score_memory_safe(self):
+        obs = [self.prng.randint(self.n_symbols, size=n)
+               for n in (30, 50, 80, 40)]
+        paths = []
+        try:
+            for batch in (obs[:2], obs[2:]):
+                fd, path = tempfile.mkstemp()
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(batch, f)
+                paths.append(path)
+            h = copy.deepcopy(self.h)
+            h.memory_safe = True
+            # The frames are counted by the E-step, and not again for the
+            # training set.
+            h._count_frames = None
+            h.fit(paths, warm_start=True)
+            self.assertEqual(h.n_data_, 200)
+            self.assertEqual(h._training_score(paths)[1], 200)
+            del h._count_frames
+
+            # Other files are counted.
+            with open(paths[1], 'wb') as f:
+                pickle.dump(obs[3:], f)
+            self.assertEqual(h._training_score(paths[1:])[1], 40)
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    def test_symbol_summary(self):
+        obs = [np.array([0, 2, 2]), np.array([1, 0]), np.array([4, 3, 1])]
+        summary = hmm.symbol_summary(obs)
+        self.assertEqual(summary['count'], 8)
+        self.assertEqual((summary['min'], summary['max']), (0, 4))
+        self.assertTrue(hmm.check_symbol_summary(summary))
+        self.assertFalse(hmm.check_symbol_summary(summary, n_symbols=4))
+        self.assertFalse(hmm.check_symbol_summary(
+            hmm.symbol_summary([[0, 1, 3]])))
+        self.assertFalse(hmm.check_symbol_summary(
+            hmm.symbol_summary([[0, 1], [-1]])))
+        self.assertFalse(hmm.check_symbol_summary(
+            hmm.symbol_summary([[0., 1.]])))
+        # A chunk may leave gaps that the others fill, but a range wider
+        # than all the frames is never listed densely.
+        self.assertTrue(hmm.check_symbol_summary(
+            hmm.symbol_summary([[0, 3, 3], [1, 2]])))
+        summary = hmm.symbol_summary([[0, 10 ** 12], [1, 1]])
+        assert_array_equal(summary['symbols'], [0, 1, 10 ** 12])
+        self.assertFalse(hmm.check_symbol_summary(summary))
+
+        # The batches are summarized by the executor and merged.
+        h = hmm.MultinomialHMM(self.n_components, batch_size=2,
+                               backend="thread", n_jobs=2)
+        h.fit(obs)
+        self.assertEqual(h.n_symbols, 5)
+        self.assertEqual(h.emissionprob_.shape, (self.n_components, 5))
+        self.assertRaises(ValueError, hmm.MultinomialHMM().fit, [[0, 1, 3]])
+
+        # A declared vocabulary skips the discovery and the contiguity.
+        h = hmm.MultinomialHMM(self.n_components, n_symbols=6)
+        h.fit([[0, 1, 3], [5, 0]])
+        self.assertEqual(h.emissionprob_.shape, (self.n_components, 6))
+        self.assertRaises(ValueError, h.fit, [[0, 1, 6]])
+
+    def test_local_rdd(self):
+        sc = executors.LocalContext(executors.ThreadExecutor(2))
+        rdd = sc.parallelize(range(10), 3)
+        self.assertEqual(rdd.getNumPartitions(), 3)
+        self.assertEqual(rdd.map(lambda x: x * x).sum(), 285)
+        self.assertEqual(rdd.mapPartitions(lambda it: [sum(it)]).collect(),
+                         [6, 15, 24])
+        self.assertEqual(rdd.treeAggregate([], lambda acc, x: acc + [x],
+                                           lambda a, b: a + b),
+                         list(range(10)))
+        self.assertEqual(sorted(rdd.takeSample(False, 10, 0)),
+                         list(range(10)))
+
+    def test_sample_with_lengths(self):
+        obs, states = self.h.sample(lengths=[3, 7, 5], random_state=0)
+        self.assertEqual([len(o) for o in obs], [3, 7, 5])
+        self.assertEqual([len(s) for s in states], [3, 7, 5])
+        for obs_seq, state_seq in zip(obs, states):
+            self.assertTrue(np.all(obs_seq < self.n_symbols))
+        self.assertEqual(self.h.sample(lengths=[]), ([], []))
+
     def test_fit(self, params='ste', n_iter=5, verbose=False, **kwargs):
         h = self.h
 
@@ -707,3 +1243,88 @@ def test_normalize_3D():
     for axis in range(3):
         Anorm = hmm.normalize(A, axis)
         assert np.all(np.allclose(Anorm.sum(axis), 1.0))
+
+
+def test_poisson_squarem():
+    h = hmm.PoissonHMM(2)
+    h.startprob_ = [0.5, 0.5]
+    h.transmat_ = [[0.9, 0.1], [0.2, 0.8]]
+    h.rates_ = [2., 10.]
+    obs = h.sample(lengths=[40, 60, 30, 50], random_state=0)[0]
+
+    restored = copy.deepcopy(h)
+    restored._set_em_params(h._get_em_params(h.params))
+    assert_array_almost_equal(restored.rates_, h.rates_)
+
+    start = hmm.PoissonHMM(2, random_state=0, n_iter=0).fit(obs)
+    fitted = {}
+    for acceleration in (None, "squarem"):
+        fitted[acceleration] = copy.deepcopy(start)
+        fitted[acceleration].n_iter = 30
+        fitted[acceleration].thresh = 1e-6
+        fitted[acceleration].fit(obs, warm_start=True,
+                                 acceleration=acceleration)
+        assert np.all(fitted[acceleration].rates_ > 0)
+    assert fitted["squarem"].score(obs) >= fitted[None].score(obs) - 1e-3
+    assert_array_almost_equal(np.sort(fitted["squarem"].rates_),
+                              np.sort(fitted[None].rates_), 3)
+
+
+def test_streaming_init_helpers():
+    obs = [rng.randn(n, 3) for n in (5, 40, 1, 17)]
+    concat_obs = np.vstack(obs)
+    mean, cov = hmm.streaming_mean_cov(obs)
+    assert_array_almost_equal(mean, concat_obs.mean(axis=0))
+    assert_array_almost_equal(cov, np.cov(concat_obs.T))
+
+    sample = hmm.reservoir_sample(obs, 20, random_state=0)
+    assert sample.shape == (20, 3)
+    rows = set(map(tuple, concat_obs))
+    assert all(tuple(row) in rows for row in sample)
+    assert_array_equal(hmm.reservoir_sample(obs, 100), concat_obs)
+
+    batches = list(hmm._rebatch(obs, 10))
+    assert [len(batch) for batch in batches] == [10] * 6 + [3]
+    assert_array_equal(np.vstack(batches), concat_obs)
+
+    for strategy in hmm.init_strategies:
+        h = hmm.GaussianHMM(2, init_strategy=strategy, init_sample_size=10)
+        h._init(obs, 'stmc')
+        assert h.means_.shape == (2, 3)
+        assert_array_almost_equal(h._covars_[0], np.diag(cov))
+
+    # With memory_safe every file is read, one at a time.
+    paths = []
+    try:
+        for batch in (obs[:2], obs[2:]):
+            fd, path = tempfile.mkstemp()
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(batch, f)
+            paths.append(path)
+        for strategy in hmm.init_strategies:
+            h = hmm.GaussianHMM(2, init_strategy=strategy,
+                                init_sample_size=10, memory_safe=True)
+            h._init(paths, 'stmc')
+            assert_array_almost_equal(h._covars_[0], np.diag(cov))
+    finally:
+        for path in paths:
+            os.remove(path)
+
+    # The "full" strategy streams the corpus too, and only KMeans gathers
+    # it: a single sequence is clustered as it is.
+    frames = hmm.init_frames(obs[1:2], "full")
+    assert isinstance(frames, hmm.FrameStream)
+    fitted = []
+    KMeans = hmm.cluster.KMeans
+
+    class RecordingKMeans(KMeans):
+        def fit(self, X, *args, **kwargs):
+            fitted.append(X)
+            return KMeans.fit(self, X, *args, **kwargs)
+
+    hmm.cluster.KMeans = RecordingKMeans
+    try:
+        hmm.init_cluster_centers(frames, 2, "full", random_state=0)
+    finally:
+        hmm.cluster.KMeans = KMeans
+    assert np.shares_memory(fitted[0], obs[1])
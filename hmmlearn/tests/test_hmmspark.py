@@ -0,0 +1,445 @@
+from __future__ import print_function
+
+import numpy as np
+
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from unittest import TestCase
+
+from hmmlearn import hmm, hmmspark, mixhmm, mixhmmspark, executors
+
+
+class RecordingContext(executors.LocalContext):
+    """LocalContext keeping track of the broadcasts made through it."""
+
+    def __init__(self, executor=None):
+        super(RecordingContext, self).__init__(executor)
+        self.broadcasts = []
+        self.types = []
+        self.max_live = 0
+
+    def broadcast(self, value):
+        broadcast = super(RecordingContext, self).broadcast(value)
+        self.broadcasts.append(broadcast)
+        self.types.append(type(value))
+        self.max_live = max(self.max_live, len(self.live_broadcasts()))
+        return broadcast
+
+    def live_broadcasts(self):
+        return [b for b in self.broadcasts if b.value is not None]
+
+
+def gaussian_hmm(cls=hmmspark.GaussianHMM, **kwargs):
+    h = cls(3, covariance_type='diag', **kwargs)
+    h.startprob_ = [0.6, 0.3, 0.1]
+    h.transmat_ = [[0.8, 0.1, 0.1], [0.2, 0.7, 0.1], [0.1, 0.2, 0.7]]
+    h.means_ = [[0., 0.], [3., 3.], [-3., 3.]]
+    h.covars_ = [[1., 1.], [0.5, 2.], [2., 0.5]]
+    return h
+
+
+def gaussian_obs(prng, lengths=(7, 12, 3, 20, 9, 15)):
+    h = gaussian_hmm(hmm.GaussianHMM)
+    return h.sample(lengths=list(lengths), random_state=prng)[0]
+
+
+def gaussian_mixhmm(module=mixhmmspark, hmm_cls=hmmspark.GaussianHMM,
+                    **kwargs):
+    m = module.GaussianMixHMM(2, 3, n_features=2, **kwargs)
+    m.hmms = [gaussian_hmm(hmm_cls), gaussian_hmm(hmm_cls)]
+    m.hmms[1].means_ = m.hmms[1].means_ + 1.
+    m.component_weights_ = [0.4, 0.6]
+    return m
+
+
+class TestSparkInference(TestCase):
+
+    def setUp(self):
+        self.prng = np.random.RandomState(0)
+        self.sc = RecordingContext()
+        self.obs = gaussian_obs(self.prng)
+        self.h = gaussian_hmm()
+        self.local = gaussian_hmm(hmm.GaussianHMM)
+
+    def test_score_samples_rdd(self):
+        pairs = self.sc.parallelize(list(enumerate(self.obs)), 3)
+        results = dict(self.h.score_samples_rdd(self.sc, pairs).collect())
+        logprobs = self.local.score_per_sequence(self.obs)
+        _, posteriors = self.local.score_samples(self.obs)
+        self.assertEqual(sorted(results), list(range(len(self.obs))))
+        for i in range(len(self.obs)):
+            self.assertAlmostEqual(results[i][0], logprobs[i])
+            assert_array_almost_equal(results[i][1], posteriors[i])
+
+    def test_decode_rdd(self):
+        pairs = self.sc.parallelize(list(enumerate(self.obs)), 3)
+        for algorithm in hmm.decoder_algorithms:
+            self.h.algorithm = algorithm
+            self.local.algorithm = algorithm
+            results = dict(self.h.decode_rdd(self.sc, pairs).collect())
+            states = dict(self.h.predict_rdd(self.sc, pairs).collect())
+            for i, seq in enumerate(self.obs):
+                logprob, state_sequence = self.local.decode([seq])
+                self.assertAlmostEqual(results[i][0], logprob[0])
+                assert_array_equal(results[i][1], state_sequence[0])
+                assert_array_equal(states[i], state_sequence[0])
+
+    def test_packed_rdd_is_keyed_by_ids(self):
+        pairs = self.sc.parallelize(list(enumerate(self.obs)), 2)
+        packed = hmmspark.pack_sequences(pairs, keyed=True)
+        results = dict(self.h.predict_proba_rdd(self.sc, packed).collect())
+        _, posteriors = self.local.score_samples(self.obs)
+        for i in range(len(self.obs)):
+            assert_array_almost_equal(results[i], posteriors[i])
+
+    def test_rdd_result_ignores_later_changes(self):
+        pairs = self.sc.parallelize(list(enumerate(self.obs)), 3)
+        results = self.h.score_samples_rdd(self.sc, pairs)
+        self.h.means_ = self.h.means_ + 10.
+        logprobs = self.local.score_per_sequence(self.obs)
+        for i, (logprob, _) in results.collect():
+            self.assertAlmostEqual(logprob, logprobs[i])
+
+    def test_no_broadcast_left_alive(self):
+        data = self.sc.parallelize(self.obs, 3)
+        pairs = self.sc.parallelize(list(enumerate(self.obs)), 3)
+        self.assertAlmostEqual(self.h.score(self.sc, data),
+                               self.local.score(self.obs))
+        self.h.score_samples_rdd(self.sc, pairs).collect()
+        self.h.decode_rdd(self.sc, pairs).collect()
+        self.h.predict_proba_rdd(self.sc, pairs).collect()
+        self.assertEqual(self.sc.live_broadcasts(), [])
+        # The inference jobs ship the model in their closure.
+        self.assertEqual(len(self.sc.broadcasts), 1)
+        self.assertTrue(self.h.backend is None)
+
+    def test_mixture_rdd(self):
+        m = gaussian_mixhmm()
+        pairs = self.sc.parallelize(list(enumerate(self.obs)), 3)
+        results = dict(m.score_samples_rdd(self.sc, pairs).collect())
+        labels = dict(m.predict_rdd(self.sc, pairs).collect())
+        logprobs, responsibilities = m._score_samples(self.obs)
+        for i in range(len(self.obs)):
+            self.assertAlmostEqual(results[i][0], logprobs[i])
+            assert_array_almost_equal(results[i][1], responsibilities[i])
+            self.assertEqual(labels[i], responsibilities[i].argmax())
+        self.assertAlmostEqual(m.score(self.sc, self.sc.parallelize(
+            self.obs, 2)), logprobs.sum())
+        self.assertEqual(self.sc.live_broadcasts(), [])
+
+
+class TestSparkFit(TestCase):
+
+    def setUp(self):
+        self.prng = np.random.RandomState(0)
+        self.sc = RecordingContext()
+        self.obs = gaussian_obs(self.prng)
+
+    def test_fit_matches_local(self):
+        local = gaussian_hmm(hmm.GaussianHMM, n_iter=5, thresh=-1)
+        local.fit(self.obs, warm_start=True)
+        h = gaussian_hmm(n_iter=5, thresh=-1)
+        h.fit(self.sc, self.sc.parallelize(self.obs, 3), warm_start=True)
+        assert_array_almost_equal(h.logprob_, local.logprob_)
+        assert_array_almost_equal(h.startprob_, local.startprob_)
+        assert_array_almost_equal(h.transmat_, local.transmat_)
+        assert_array_almost_equal(h.means_, local.means_)
+        assert_array_almost_equal(h.covars_, local.covars_)
+        self.assertEqual(h.n_data_, local.n_data_)
+        self.assertTrue(h.backend is None)
+
+    def test_fit_broadcasts(self):
+        h = gaussian_hmm(n_iter=4, thresh=-1)
+        h.fit(self.sc, self.sc.parallelize(self.obs, 3), warm_start=True)
+        # The model goes out once, then only its parameters, for each
+        # E-step, which also counts the frames.
+        n_packs = len(h.logprob_)
+        self.assertEqual(self.sc.types,
+                         [hmmspark.GaussianHMM] + [dict] * n_packs)
+        self.assertEqual(self.sc.max_live, 2)
+        self.assertEqual(self.sc.live_broadcasts(), [])
+
+        # Without warm start the initialization runs on the RDD too, and
+        # leaves nothing behind either.
+        h = hmmspark.GaussianHMM(3, n_iter=2, random_state=0,
+                                 init_sample_budget=50)
+        h.fit(self.sc, self.sc.parallelize(self.obs, 3))
+        self.assertEqual(self.sc.live_broadcasts(), [])
+        self.assertTrue(h.backend is None)
+
+    def test_select_n_states(self):
+        data = self.sc.parallelize(self.obs, 3)
+        n_data = sum(len(seq) for seq in self.obs)
+        estimator = hmmspark.GaussianHMM(1, n_iter=3, random_state=0,
+                                         init_sample_budget=50)
+        for split_states in (False, True):
+            best, scores = hmmspark.select_n_states(
+                self.sc, estimator, data, [2, 1, 3],
+                split_states=split_states)
+            self.assertEqual(scores.shape, (3,))
+            self.assertEqual(best.n_data_, n_data)
+            self.assertAlmostEqual(scores.min(), best.bic(self.sc, data))
+            self.assertTrue(best.backend is None)
+            self.assertEqual(self.sc.live_broadcasts(), [])
+
+    def test_mixture_fit_matches_local(self):
+        local = gaussian_mixhmm(mixhmm, hmm.GaussianHMM, n_iter=4,
+                                thresh=-1, init_params='')
+        local.fit(self.obs, warm_start=True)
+        m = gaussian_mixhmm(n_iter=4, thresh=-1, init_params='')
+        m.fit(self.sc, self.sc.parallelize(self.obs, 3), warm_start=True)
+        assert_array_almost_equal(m.logprob_, local.logprob_)
+        assert_array_almost_equal(m.component_weights_,
+                                  local.component_weights_)
+        for component, local_component in zip(m.hmms, local.hmms):
+            assert_array_almost_equal(component.transmat_,
+                                      local_component.transmat_)
+            assert_array_almost_equal(component.means_,
+                                      local_component.means_)
+
+    def test_fit_ignores_layout(self):
+        reference = gaussian_hmm(n_iter=4, thresh=-1)
+        reference.fit(self.sc, self.sc.parallelize(self.obs, 1),
+                      warm_start=True)
+        layouts = [self.sc.parallelize(self.obs, n_partitions)
+                   for n_partitions in (2, 5, 6)]
+        layouts.append(hmmspark.pack_sequences(self.sc.parallelize(
+            list(enumerate(self.obs)), 3), keyed=True))
+        layouts.append(hmmspark.balance_partitions(layouts[0], 4))
+        for data in layouts:
+            for depth in (1, 2, 3):
+                h = gaussian_hmm(n_iter=4, thresh=-1,
+                                 aggregation_depth=depth)
+                h.fit(self.sc, data, warm_start=True)
+                assert_array_almost_equal(h.logprob_, reference.logprob_)
+                assert_array_almost_equal(h.transmat_, reference.transmat_)
+                assert_array_almost_equal(h.means_, reference.means_)
+                assert_array_almost_equal(h.covars_, reference.covars_)
+                self.assertAlmostEqual(h.score(self.sc, data),
+                                       reference.score(self.sc, data))
+
+
+class LocalDataFrame(object):
+    """The part of a DataFrame that pack_dataframe uses, without Arrow."""
+
+    def __init__(self, sc, rows, n_partitions=1):
+        self.sc = sc
+        self.partitions = [list(rows)] + [[] for _ in range(n_partitions - 1)]
+
+    def _new(self, partitions):
+        df = LocalDataFrame(self.sc, [])
+        df.partitions = partitions
+        return df
+
+    def select(self, *cols):
+        return self._new([[dict((c, row[c]) for c in cols) for row in part]
+                          for part in self.partitions])
+
+    def repartition(self, n, *cols):
+        if not isinstance(n, int):
+            n, cols = self.sc.defaultParallelism, (n,) + cols
+        partitions = [[] for _ in range(n)]
+        for part in self.partitions:
+            for row in part:
+                key = tuple(row[c] for c in cols)
+                partitions[hash(key) % n].append(row)
+        return self._new(partitions)
+
+    def sortWithinPartitions(self, *cols):
+        return self._new([sorted(part, key=lambda row: [row[c] for c in cols])
+                          for part in self.partitions])
+
+    @property
+    def rdd(self):
+        return executors.LocalRDD(self.sc, self.partitions)
+
+
+class TestPackDataFrame(TestCase):
+
+    def setUp(self):
+        self.prng = np.random.RandomState(0)
+        self.sc = executors.LocalContext()
+        self.obs = gaussian_obs(self.prng, (7, 12, 3, 20, 9, 15, 1, 4))
+        rows = [{"sequence_id": i, "frame_index": t,
+                 "x": float(seq[t, 0]), "y": float(seq[t, 1])}
+                for i, seq in enumerate(self.obs) for t in range(len(seq))]
+        self.prng.shuffle(rows)
+        self.df = LocalDataFrame(self.sc, rows, 2)
+
+    def test_blocks_are_bounded(self):
+        packed = hmmspark.pack_dataframe(self.df, ["x", "y"], n_partitions=3,
+                                         block_frames=16).collect()
+        seqs = {}
+        for block in packed:
+            self.assertTrue(isinstance(block, hmm.PackedSequences))
+            self.assertTrue(len(block.frames) <= 16 or len(block) == 1)
+            seqs.update(zip(block.ids, block))
+        self.assertTrue(len(packed) > 3)
+        self.assertEqual(sorted(seqs), list(range(len(self.obs))))
+        for i, seq in enumerate(self.obs):
+            assert_array_equal(seqs[i], seq)
+
+    def test_packed_blocks_fit_like_sequences(self):
+        packed = hmmspark.pack_dataframe(self.df, ["x", "y"],
+                                         block_frames=10)
+        h = gaussian_hmm()
+        self.assertAlmostEqual(h.score(self.sc, packed),
+                               gaussian_hmm(hmm.GaussianHMM).score(self.obs))
+
+    def test_single_feature_fit(self):
+        packed = hmmspark.pack_dataframe(self.df, ["x"], block_frames=10)
+        for block in packed.collect():
+            self.assertEqual(block.frames.shape[1], 1)
+
+        def one_feature_hmm(cls):
+            h = cls(2, covariance_type='diag', n_iter=3, thresh=-1)
+            h.startprob_ = [0.6, 0.4]
+            h.transmat_ = [[0.8, 0.2], [0.3, 0.7]]
+            h.means_ = [[0.], [3.]]
+            h.covars_ = [[1.], [2.]]
+            return h
+
+        local = one_feature_hmm(hmm.GaussianHMM)
+        local.fit([seq[:, :1] for seq in self.obs], warm_start=True)
+        h = one_feature_hmm(hmmspark.GaussianHMM)
+        h.fit(self.sc, packed, warm_start=True)
+        assert_array_almost_equal(h.logprob_, local.logprob_)
+        assert_array_almost_equal(h.means_, local.means_)
+        assert_array_almost_equal(h.covars_, local.covars_)
+
+        # The distributed initialization takes the 2-D frames as well.
+        h = hmmspark.GaussianHMM(2, n_iter=2, random_state=0,
+                                 init_sample_budget=50)
+        h.fit(self.sc, packed)
+        self.assertEqual(h.means_.shape, (2, 1))
+
+
+class CountingRDD(executors.LocalRDD):
+    """LocalRDD counting the passes over its partitions."""
+    n_passes = 0
+
+    def _run(self, func, tasks):
+        self.n_passes += 1
+        return super(CountingRDD, self)._run(func, tasks)
+
+
+class TestSparkInit(TestCase):
+
+    def setUp(self):
+        self.prng = np.random.RandomState(0)
+        self.sc = executors.LocalContext()
+
+    def test_balance_partitions(self):
+        lengths = list(self.prng.randint(1, 40, size=60)) + [200, 150]
+        obs = [np.full(n, float(i)) for i, n in enumerate(lengths)]
+        # Skewed input: the long sequences all sit in one partition.
+        data = self.sc.parallelize(obs[::-1], 5)
+        balanced = hmmspark.balance_partitions(data, 4)
+        self.assertEqual(balanced.getNumPartitions(), 4)
+        loads = [sum(len(seq) for seq in part)
+                 for part in balanced.partitions]
+        self.assertEqual(sum(loads), sum(lengths))
+        self.assertTrue(max(loads) <= sum(lengths) / 4. + 200)
+        self.assertEqual(sorted(seq[0] for seq in balanced.collect()),
+                         list(range(len(obs))))
+
+        chunked = hmmspark.balance_partitions(data, 4, max_frames=50)
+        loads = [sum(len(seq) for seq in part)
+                 for part in chunked.partitions]
+        self.assertTrue(max(len(seq) for seq in chunked.collect()) <= 50)
+        self.assertTrue(max(loads) <= sum(lengths) / 4. + 50)
+
+    def test_frame_moments_far_from_origin(self):
+        obs = [1e8 + self.prng.randn(n, 2) for n in (5, 1, 12, 30)]
+        n_frames, mean, cv = hmmspark.frame_moments(
+            self.sc.parallelize(obs, 3))
+        frames = np.vstack(obs)
+        self.assertEqual(n_frames, len(frames))
+        assert_array_almost_equal(mean, frames.mean(0))
+        assert_array_almost_equal(cv, np.cov(frames.T))
+        self.assertRaises(ValueError, hmmspark.frame_moments,
+                          self.sc.parallelize([], 2))
+
+    def test_kmeans_parallel(self):
+        means = np.array([[0., 0.], [10., 10.], [-10., 10.]])
+        obs = [means[i % 3] + 0.1 * self.prng.randn(20, 2)
+               for i in range(12)]
+        data = CountingRDD(self.sc, self.sc.parallelize(obs, 4).partitions)
+        centers = hmmspark.kmeans_parallel(data, 3, seed=1, sample_budget=60)
+        order = np.lexsort(centers.T[::-1])
+        assert_array_almost_equal(centers[order], means[[2, 0, 1]], 1)
+        self.assertTrue(data.n_passes <= 5 + 5 + 3)
+        assert_array_equal(
+            hmmspark.kmeans_parallel(data, 3, seed=1, sample_budget=60),
+            centers)
+
+    def test_no_frames(self):
+        empty = self.sc.parallelize([np.zeros((0, 2))], 2)
+        self.assertRaises(ValueError, hmmspark.kmeans_parallel, empty, 2)
+        self.assertRaises(ValueError, hmmspark.GMMHMM(2)._init_gmm_frames,
+                          empty)
+
+    def test_seeded_init(self):
+        obs = gaussian_obs(self.prng)
+        data = self.sc.parallelize(obs, 3)
+        inits = []
+        for _ in range(2):
+            h = hmmspark.GaussianHMM(3, random_state=7, init_sample_budget=50)
+            h._init(data, 'mc')
+            inits.append(h.means_)
+            local = hmm.PoissonHMM(3, random_state=7)
+            local._init([np.abs(seq[:, 0]).astype(int) for seq in obs], 'r')
+            inits.append(local.rates_)
+        assert_array_equal(inits[0], inits[2])
+        assert_array_equal(inits[1], inits[3])
+
+
+class TestSparkSymbols(TestCase):
+
+    def setUp(self):
+        self.prng = np.random.RandomState(0)
+        self.sc = executors.LocalContext()
+        self.obs = [self.prng.randint(4, size=n) for n in (10, 20, 15, 7)]
+
+    def check(self, h, obs):
+        with h._spark_backend(self.sc):
+            return h._check_input_symbols(self.sc.parallelize(obs, 2))
+
+    def test_multinomial_symbols(self):
+        h = hmmspark.MultinomialHMM(2, n_iter=3, random_state=0)
+        h.fit(self.sc, self.sc.parallelize(self.obs, 3))
+        self.assertEqual(h.n_symbols, 4)
+        self.assertEqual(h.emissionprob_.shape, (2, 4))
+
+        self.assertTrue(self.check(hmmspark.MultinomialHMM(2), self.obs))
+        # The partitions fill each other's gaps.
+        self.assertTrue(self.check(hmmspark.MultinomialHMM(2),
+                                   [np.array([0, 3, 3]), np.array([1, 2])]))
+        self.assertFalse(self.check(hmmspark.MultinomialHMM(2),
+                                    [np.array([0, 1, 5]), np.array([2])]))
+        self.assertFalse(self.check(hmmspark.MultinomialHMM(2, n_symbols=3),
+                                    self.obs))
+        self.assertRaises(ValueError, hmmspark.MultinomialHMM(2).fit,
+                          self.sc, self.sc.parallelize(
+                              [np.array([0, 1, 5]), np.array([2, 3])], 2))
+
+    def test_count_and_duration_symbols(self):
+        negative = [np.array([1, 2]), np.array([3, -1])]
+        self.assertTrue(self.check(hmmspark.PoissonHMM(2), self.obs))
+        self.assertFalse(self.check(hmmspark.PoissonHMM(2), negative))
+        self.assertRaises(ValueError, hmmspark.PoissonHMM(2).fit,
+                          self.sc, self.sc.parallelize(negative, 2))
+        self.assertTrue(self.check(hmmspark.ExponentialHMM(2),
+                                   [np.array([1., 2.]), np.array([0.5])]))
+        self.assertFalse(self.check(hmmspark.ExponentialHMM(2),
+                                    [np.array([1., 2.]), np.array([-1.])]))
+        self.assertFalse(self.check(hmmspark.ExponentialHMM(2),
+                                    [np.array([1.]), np.zeros(0)]))
+        # The partitions are summarized, each frame once, and only the
+        # merged count is held to at least two frames.
+        for h in (hmmspark.PoissonHMM(2), hmmspark.ExponentialHMM(2)):
+            self.assertTrue(self.check(h, [np.array([3]), np.array([4])]))
+            summary = h._summarize_symbols(self.obs)
+            self.assertEqual(summary['count'], sum(map(len, self.obs)))
+            self.assertTrue(summary['valid'])
+        self.assertFalse(hmmspark.PoissonHMM(2)._summarize_symbols(
+            [np.array([1., 2.])])['valid'])
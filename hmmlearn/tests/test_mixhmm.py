@@ -0,0 +1,170 @@
+from __future__ import print_function
+import copy
+
+import numpy as np
+
+from numpy.testing import assert_array_equal, assert_array_almost_equal
+from unittest import TestCase
+
+from hmmlearn import hmm, mixhmm
+
+
+class MultinomialMixHMMTestCase(TestCase):
+
+    def setUp(self):
+        self.prng = np.random.RandomState(9)
+        self.n_components = 2
+        self.n_states = 2
+        self.emissionprobs = [[[0.1, 0.4, 0.5], [0.6, 0.3, 0.1]],
+                              [[0.8, 0.1, 0.1], [0.1, 0.1, 0.8]]]
+        self.startprob = [0.6, 0.4]
+        self.transmat = [[0.7, 0.3], [0.4, 0.6]]
+
+        hmms = []
+        for emissionprob in self.emissionprobs:
+            h = hmm.MultinomialHMM(self.n_states,
+                                   startprob=self.startprob,
+                                   transmat=self.transmat)
+            h.emissionprob_ = emissionprob
+            hmms.append(h)
+        self.h = mixhmm.MultinomialMixHMM(self.n_components, self.n_states,
+                                          hmms=hmms,
+                                          component_weights=[0.3, 0.7],
+                                          tied=False)
+
+    def test_sample(self):
+        components, obs, states = self.h.sample(20, random_state=self.prng)
+        self.assertEqual(components.shape, (20,))
+        self.assertEqual(len(obs), 20)
+        for obs_seq, state_seq in zip(obs, states):
+            self.assertEqual(len(obs_seq), len(state_seq))
+            self.assertTrue(10 <= len(obs_seq) < 20)
+
+    def test_sample_concatenate(self):
+        components, obs, states = self.h.sample(20, random_state=0)
+        components_c, obs_c, states_c, offsets = self.h.sample(
+            20, random_state=0, concatenate=True)
+        assert_array_equal(components, components_c)
+        self.assertEqual(offsets[-1], len(obs_c))
+        for i in range(20):
+            assert_array_equal(obs[i], obs_c[offsets[i]:offsets[i + 1]])
+            assert_array_equal(states[i], states_c[offsets[i]:offsets[i + 1]])
+
+    def test_sample_concatenate_empty(self):
+        components, obs, states, offsets = self.h.sample(
+            0, random_state=0, concatenate=True)
+        self.assertEqual(components.shape, (0,))
+        self.assertEqual(obs.shape, (0,))
+        self.assertEqual(states.shape, (0,))
+        assert_array_equal(offsets, [0])
+
+    def test_score_per_sequence(self):
+        obs = [self.prng.randint(3, size=n) for n in (3, 5, 8)]
+        logprobs = self.h.score_per_sequence(obs)
+        self.assertEqual(logprobs.shape, (3,))
+        self.assertAlmostEqual(logprobs.sum(), self.h.score(obs))
+        self.assertAlmostEqual(logprobs.sum(), self.h.score_samples(obs)[0])
+
+    def test_tied_emissions(self):
+        obs = [self.prng.randint(3, size=n) for n in (3, 5, 8)]
+        self.assertFalse(self.h._has_tied_emissions())
+        self.h.tied = True
+        self.assertFalse(self.h._has_tied_emissions())
+        logprobs = self.h.score_per_sequence(obs)
+
+        self.h.hmms[1].emissionprob_ = self.emissionprobs[0]
+        self.assertTrue(self.h._has_tied_emissions())
+        framelogprobs = self.h._compute_component_log_likelihoods(obs[0],
+                                                                  True)
+        self.assertTrue(framelogprobs[0] is framelogprobs[1])
+        tied_logprobs = self.h.score_per_sequence(obs)
+        self.h.tied = False
+        assert_array_almost_equal(tied_logprobs,
+                                  self.h.score_per_sequence(obs))
+        self.assertFalse(np.allclose(tied_logprobs, logprobs))
+
+    def test_stacked_passes(self):
+        seq = self.prng.randint(3, size=10)
+        framelogprob = self.h._compute_stacked_log_likelihood(seq)
+        stacked_params = self.h._stacked_params()
+        logprobs, fwdlattice = self.h._do_stacked_forward_pass(
+            framelogprob, stacked_params)
+        bwdlattice = self.h._do_stacked_backward_pass(framelogprob,
+                                                      stacked_params)
+        for k, h in enumerate(self.h.hmms):
+            lpr, reffwdlattice = h._do_forward_pass(framelogprob[:, :, k])
+            self.assertAlmostEqual(logprobs[k], lpr)
+            assert_array_almost_equal(fwdlattice[:, :, k], reffwdlattice)
+            assert_array_almost_equal(
+                bwdlattice[:, :, k], h._do_backward_pass(framelogprob[:, :, k]))
+
+    def test_pruned_estep(self):
+        obs = [self.prng.randint(3, size=n) for n in (3, 5, 8)]
+        self.h.params = 'ph'
+        stats, lpr = self.h._do_estep(obs)
+        self.assertEqual(stats['pruned_mass'], 0.0)
+        pruned_stats, pruned_lpr = self.h._do_estep(obs, prune_threshold=0.0)
+        assert_array_almost_equal(pruned_stats['hmm_stats'][0]['trans'],
+                                  stats['hmm_stats'][0]['trans'])
+
+        # Only the most responsible component of each sequence is kept.
+        responsibilities = self.h.score_samples(obs)[1]
+        pruned_stats, pruned_lpr = self.h._do_estep(obs, prune_threshold=1.0)
+        self.assertAlmostEqual(pruned_lpr, lpr)
+        assert_array_almost_equal(pruned_stats['component_weights'],
+                                  stats['component_weights'])
+        self.assertAlmostEqual(pruned_stats['pruned_mass'],
+                               (1 - responsibilities.max(axis=1)).sum())
+
+        self.h.prune_threshold = 1e-6
+        self.h.prune_refresh = 2
+        self.h.n_iter = 4
+        self.h.fit(obs, warm_start=True)
+        self.assertEqual(len(self.h.pruned_mass_), 4)
+        self.assertEqual(self.h.pruned_mass_[0], 0.0)
+
+    def test_hard_assignment(self):
+        obs = [self.prng.randint(3, size=n) for n in (3, 5, 8)]
+        self.h.params = 'ph'
+        responsibilities = self.h.score_samples(obs)[1]
+        stats, _ = self.h._do_estep(obs, temperature=0)
+        assert_array_almost_equal(
+            stats['component_weights'],
+            np.bincount(responsibilities.argmax(axis=1), minlength=2))
+        tempered_stats, _ = self.h._do_estep(obs, temperature=0.5)
+        soft_stats, _ = self.h._do_estep(obs)
+        self.assertTrue(np.all(np.abs(tempered_stats['component_weights'] -
+                                      stats['component_weights']) <
+                               np.abs(soft_stats['component_weights'] -
+                                      stats['component_weights'])))
+
+        # The temperature reaches 0 on the third iteration, whose M-step
+        # weighs the components by the counts of their best sequences.
+        annealed = copy.deepcopy(self.h)
+        annealed.n_iter = 2
+        annealed.thresh = -1
+        annealed.fit(obs, warm_start=True, assignment="hard", anneal_iter=2)
+        counts = np.bincount(annealed.score_samples(obs)[1].argmax(axis=1),
+                             minlength=2)
+        self.h.n_iter = 3
+        self.h.thresh = -1
+        self.h.fit(obs, warm_start=True, assignment="hard", anneal_iter=2)
+        self.assertEqual(len(self.h.logprob_), 3)
+        assert_array_almost_equal(self.h.component_weights_,
+                                  hmm.normalize(np.maximum(counts, 1e-20)))
+        self.assertRaises(ValueError, self.h.fit, obs, warm_start=True,
+                          assignment="viterbi")
+
+    def test_training_score(self):
+        obs = [self.prng.randint(3, size=n) for n in (30, 50, 80)]
+        self.h.n_iter = 50
+        self.h.thresh = 1.0
+        self.h.fit(obs, warm_start=True)
+        self.assertTrue(self.h.converged_)
+        self.assertEqual(self.h.n_data_, 160)
+        self.assertEqual(self.h._training_score(obs),
+                         (self.h.logprob_[-1], 160))
+        self.assertAlmostEqual(self.h.logprob_[-1], self.h.score(obs))
+        self.h.hmms[0].transmat_ = [[0.5, 0.5], [0.5, 0.5]]
+        self.assertAlmostEqual(self.h._training_score(obs)[0],
+                               self.h.score(obs))